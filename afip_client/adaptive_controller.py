@@ -0,0 +1,255 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, NamedTuple, Optional
+
+from logger import logger
+
+# Defaults for the controller thresholds
+DEFAULT_TARGET_LATENCY = 5.0
+DEFAULT_WINDOW = 5
+DEFAULT_MAX_ERROR_RATE = 0.2
+DECREASE_FACTOR = 0.5
+# Default chunk size bounds: the initial size divided / multiplied by this factor
+DEFAULT_CHUNK_RANGE = 5
+
+
+class QueryResult(NamedTuple):
+    """
+    Outcome of a single request to an AFIP service.
+
+    data holds the decoded records keyed by person ID (a dict, as returned by
+    decode_response), or None if the request failed; status_code and
+    retry_after (seconds) come from the HTTP response, when there was one.
+    """
+
+    data: Optional[Dict[str, Any]]
+    status_code: Optional[int] = None
+    retry_after: Optional[float] = None
+
+
+def is_throttled(status_code: Optional[int]) -> bool:
+    """Returns True for the responses that signal an overloaded service (429/5xx)."""
+    return status_code is not None and (status_code == 429 or status_code >= 500)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a Retry-After header, given either as seconds or as an HTTP date.
+
+    Returns:
+        Optional[float]: Seconds to wait (never negative), or None if the header
+        is missing or cannot be parsed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class AdaptiveController:
+    """
+    AIMD (additive increase, multiplicative decrease) controller for the chunk
+    size and the number of chunks in flight.
+
+    Every completed request reports its latency and status. After each window
+    of requests without throttling, with an error rate and a mean latency below
+    their thresholds, the chunk size grows by a fixed step and the concurrency
+    by one. A 429/5xx response, or a window that exceeds the thresholds, halves
+    both. Signals from requests started before the last decrease are not
+    counted again, so a burst of in-flight failures only shrinks once. Both
+    values always stay within the configured bounds; equal bounds keep them
+    fixed.
+
+    A Retry-After received by any request pauses every worker until it expires.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int,
+        concurrency: int,
+        min_chunk_size: Optional[int] = None,
+        max_chunk_size: Optional[int] = None,
+        min_concurrency: int = 1,
+        max_concurrency: Optional[int] = None,
+        target_latency: float = DEFAULT_TARGET_LATENCY,
+        window: int = DEFAULT_WINDOW,
+        max_error_rate: float = DEFAULT_MAX_ERROR_RATE,
+    ) -> None:
+        """
+        Parameters:
+            chunk_size (int): Initial chunk size.
+            concurrency (int): Initial number of chunks in flight.
+            min_chunk_size (int): Lower bound of the chunk size (defaults to
+                chunk_size // DEFAULT_CHUNK_RANGE).
+            max_chunk_size (int): Upper bound of the chunk size (defaults to
+                chunk_size * DEFAULT_CHUNK_RANGE).
+            min_concurrency (int): Lower bound of the concurrency.
+            max_concurrency (int): Upper bound of the concurrency (defaults to concurrency).
+            target_latency (float): Mean seconds per request above which the load is reduced.
+            window (int): Number of requests evaluated together before increasing.
+            max_error_rate (float): Fraction of failed requests in a window above which
+                the load is reduced.
+        """
+        if max_chunk_size is None:
+            max_chunk_size = chunk_size * DEFAULT_CHUNK_RANGE
+        if min_chunk_size is None:
+            min_chunk_size = chunk_size // DEFAULT_CHUNK_RANGE
+        self.max_chunk_size = max(1, max_chunk_size)
+        self.min_chunk_size = min(max(1, min_chunk_size), self.max_chunk_size)
+        self.max_concurrency = max(1, max_concurrency or concurrency)
+        self.min_concurrency = min(max(1, min_concurrency), self.max_concurrency)
+        self._chunk_size = self._clamp(
+            chunk_size, self.min_chunk_size, self.max_chunk_size
+        )
+        self._concurrency = self._clamp(
+            concurrency, self.min_concurrency, self.max_concurrency
+        )
+        self.chunk_step = max(1, (self.max_chunk_size - self.min_chunk_size) // 10)
+        self.target_latency = target_latency
+        self.window = max(1, window)
+        self.max_error_rate = max_error_rate
+
+        self._latencies = []
+        self._errors = 0
+        self._last_decrease_at = float("-inf")
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    @staticmethod
+    def _clamp(value: int, lower: int, upper: int) -> int:
+        return max(lower, min(upper, value))
+
+    @property
+    def chunk_size(self) -> int:
+        """Chunk size to use for the next chunk."""
+        return self._chunk_size
+
+    @property
+    def concurrency(self) -> int:
+        """Number of chunks allowed in flight."""
+        return self._concurrency
+
+    def try_acquire_slot(self) -> bool:
+        """Takes an in-flight slot if the current concurrency allows it."""
+        with self._condition:
+            if self._in_flight < self._concurrency:
+                self._in_flight += 1
+                return True
+            return False
+
+    def acquire_slot(self) -> None:
+        """Blocks until an in-flight slot is available and takes it."""
+        with self._condition:
+            while self._in_flight >= self._concurrency:
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release_slot(self) -> None:
+        """Returns an in-flight slot taken with acquire_slot or try_acquire_slot."""
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def pause(self, seconds: float) -> None:
+        """Pauses every request for the given seconds (Retry-After)."""
+        with self._condition:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning("AFIP asked to retry after %.1f seconds; pausing.", seconds)
+
+    def pause_remaining(self) -> float:
+        """Seconds left in the current Retry-After pause (0 if not paused)."""
+        return max(0.0, self._paused_until - time.monotonic())
+
+    def wait_if_paused(self) -> None:
+        """Blocks while a Retry-After pause is active."""
+        wait = self.pause_remaining()
+        while wait > 0:
+            time.sleep(wait)
+            wait = self.pause_remaining()
+
+    def record(
+        self,
+        started_at: float,
+        latency: float,
+        success: bool,
+        status_code: Optional[int] = None,
+    ) -> None:
+        """
+        Reports a completed request and adjusts the chunk size and concurrency.
+
+        Parameters:
+            started_at (float): time.monotonic() when the request was sent.
+            latency (float): Seconds the request took.
+            success (bool): Whether the request returned usable data.
+            status_code (int): HTTP status of the response, if any.
+        """
+        with self._condition:
+            # Already accounted for by the last decrease
+            if started_at < self._last_decrease_at:
+                return
+            if is_throttled(status_code):
+                self._decrease(f"HTTP {status_code}")
+                return
+
+            self._latencies.append(latency)
+            if not success:
+                self._errors += 1
+            if len(self._latencies) < self.window:
+                return
+
+            error_rate = self._errors / len(self._latencies)
+            mean_latency = sum(self._latencies) / len(self._latencies)
+            if error_rate > self.max_error_rate:
+                self._decrease(f"error rate {error_rate:.0%}")
+            elif mean_latency > self.target_latency:
+                self._decrease(f"mean latency {mean_latency:.2f}s")
+            else:
+                self._increase()
+
+    def _reset_window(self) -> None:
+        self._latencies = []
+        self._errors = 0
+
+    def _increase(self) -> None:
+        self._reset_window()
+        self._update(
+            self._chunk_size + self.chunk_step, self._concurrency + 1, "healthy window"
+        )
+
+    def _decrease(self, reason: str) -> None:
+        self._reset_window()
+        self._last_decrease_at = time.monotonic()
+        self._update(
+            int(self._chunk_size * DECREASE_FACTOR),
+            int(self._concurrency * DECREASE_FACTOR),
+            reason,
+        )
+
+    def _update(self, chunk_size: int, concurrency: int, reason: str) -> None:
+        chunk_size = self._clamp(chunk_size, self.min_chunk_size, self.max_chunk_size)
+        concurrency = self._clamp(
+            concurrency, self.min_concurrency, self.max_concurrency
+        )
+        if (chunk_size, concurrency) == (self._chunk_size, self._concurrency):
+            return
+        logger.info(
+            "Adaptive AFIP load (%s): chunk size %d -> %d, concurrency %d -> %d.",
+            reason,
+            self._chunk_size,
+            chunk_size,
+            self._concurrency,
+            concurrency,
+        )
+        self._chunk_size = chunk_size
+        self._concurrency = concurrency
+        self._condition.notify_all()
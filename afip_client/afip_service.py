@@ -1,8 +1,25 @@
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 import requests
-
+from requests.adapters import HTTPAdapter
+
+from afip_client.adaptive_controller import (
+    DEFAULT_TARGET_LATENCY,
+    AdaptiveController,
+    QueryResult,
+    parse_retry_after,
+)
+from afip_client.checkpoint import CheckpointJournal
+from afip_client.rate_limiter import TokenBucket
+from afip_client.response_cache import ResponseCache
+from afip_client.response_decoder import (
+    ERROR_KEYS_BY_SERVICE,
+    clean_response,
+    decode_response,
+)
 from logger import logger
 
 
@@ -18,6 +35,13 @@ class AFIPService:
         max_retries: int,
         retry_delay: int,
         services_available: Optional[List[str]] = None,
+        cache: Optional[ResponseCache] = None,
+        max_workers: int = 4,
+        min_chunk_size: Optional[int] = None,
+        max_chunk_size: Optional[int] = None,
+        min_workers: int = 1,
+        target_latency: float = DEFAULT_TARGET_LATENCY,
+        full_clean: bool = False,
     ) -> None:
         """
         Initializes the AFIPService instance with credentials and configuration parameters.
@@ -26,12 +50,21 @@ class AFIPService:
             username (str): Username for authentication.
             password (str): Password.
             base_url (str): Base URL of the API.
-            chunk_size (int): Size of chunks for splitting the requests.
-            max_calls (int): Maximum number of consecutive calls before pausing.
-            pause_duration (int): Pause time in seconds after reaching max_calls.
+            chunk_size (int): Initial size of chunks for splitting the requests.
+            max_calls (int): Maximum number of calls in a burst (token bucket capacity).
+            pause_duration (int): Seconds over which max_calls calls are allowed (bucket refill time).
             max_retries (int): Maximum number of retry attempts in case of failure.
             retry_delay (int): Base wait time in seconds between retries (will be multiplied exponentially).
             services_available (List[str]): List of available services. Defaults to ["inscription", "padron"] if None.
+            cache (ResponseCache): Optional persistent cache checked before querying the services.
+            max_workers (int): Maximum number of chunk requests kept in flight; the
+                adaptive controller starts at half of it.
+            min_chunk_size (int): Lower bound for the adaptive chunk size (defaults to chunk_size // 5).
+            max_chunk_size (int): Upper bound for the adaptive chunk size (defaults to chunk_size * 5).
+            min_workers (int): Lower bound for the adaptive number of requests in flight.
+            target_latency (float): Mean seconds per request above which the load is reduced.
+            full_clean (bool): Keep the full cleaned records of every service, instead of
+                only the error keys of the inscription records (for debugging).
         """
         self.username = username
         self.password = password
@@ -46,9 +79,31 @@ class AFIPService:
             if services_available is not None
             else ["inscription", "padron"]
         )
+        self.cache = cache
+        self.max_workers = max(1, max_workers)
+        self.full_clean = full_clean
+        self.rate_limiter = TokenBucket(max_calls, pause_duration)
+        # Chunk size and concurrency adapt to the observed latency and errors
+        self.controller = AdaptiveController(
+            chunk_size,
+            # Starts halfway so that healthy windows can still add workers
+            max(min_workers, self.max_workers // 2),
+            min_chunk_size=min_chunk_size,
+            max_chunk_size=max_chunk_size,
+            min_concurrency=min_workers,
+            max_concurrency=self.max_workers,
+            target_latency=target_latency,
+        )
 
-        # Use a persistent session for all requests
+        # Use a persistent session for all requests, with one pooled
+        # connection per worker
         self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Serializes token refreshes triggered by concurrent 401 responses
+        self._token_lock = threading.Lock()
 
         # Retrieve the authentication token
         self.token = self._get_token()
@@ -76,19 +131,29 @@ class AFIPService:
             logger.error("Exception during token acquisition: %s", e)
             return None
 
-    def _refresh_token(self) -> bool:
+    def _refresh_token(self, stale_token: Optional[str] = None) -> bool:
         """
         Refreshes the authentication token.
 
+        When several workers receive a 401 for the same token, only the first
+        one refreshes it; the others reuse the new token.
+
+        Parameters:
+            stale_token (Optional[str]): The token that was rejected. If the current
+                token is already different, it is not refreshed again.
+
         Returns:
-            bool: True if the token was refreshed successfully, False otherwise.
+            bool: True if a valid token is available, False otherwise.
         """
-        logger.info("Refreshing authentication token...")
-        new_token = self._get_token()
-        if new_token:
-            self.token = new_token
-            return True
-        return False
+        with self._token_lock:
+            if stale_token is not None and self.token and self.token != stale_token:
+                return True
+            logger.info("Refreshing authentication token...")
+            new_token = self._get_token()
+            if new_token:
+                self.token = new_token
+                return True
+            return False
 
     def _check_instance(self, service_name: str) -> bool:
         """
@@ -108,9 +173,7 @@ class AFIPService:
             return False
         return True
 
-    def _query_once(
-        self, service_name: str, person_ids: List[Any]
-    ) -> Optional[List[Dict[str, Any]]]:
+    def _query_once(self, service_name: str, person_ids: List[Any]) -> QueryResult:
         """
         Queries the specified service by sending a JSON payload with a list of person IDs.
 
@@ -123,17 +186,19 @@ class AFIPService:
             person_ids (List[Any]): List of person IDs to query.
 
         Returns:
-            Optional[List[Dict[str, Any]]]: A list of cleaned response dictionaries if the
-            request is successful; None if any error occurs.
+            QueryResult: The decoded records keyed by person ID if the request is
+            successful (None if any error occurs), with the HTTP status and the
+            Retry-After delay of the response.
         """
         # Validate if the service instance is available and the token is valid
         if not self._check_instance(service_name):
             logger.error("Invalid service instance for '%s'.", service_name)
-            return None
+            return QueryResult(None)
 
         url = f"{self.base_url}/{service_name}"
+        token = self.token
         headers = {
-            "Authorization": f"Bearer {self.token}",
+            "Authorization": f"Bearer {token}",
             "Content-Type": "application/json",
         }
         payload = {"persona_ids": person_ids}
@@ -146,66 +211,105 @@ class AFIPService:
                     "Received 401 Unauthorized for service '%s'. Attempting token refresh...",
                     service_name,
                 )
-                if self._refresh_token():
+                if self._refresh_token(token):
                     # Update header with the new token
                     headers["Authorization"] = f"Bearer {self.token}"
                     response = self.session.post(url, json=payload, headers=headers)
                 else:
                     logger.error("Token refresh failed for service '%s'.", service_name)
-                    return None
+                    return QueryResult(None, response.status_code)
 
             if response.ok:
                 # Extract the 'data' field from the JSON response (default to
                 # empty list if missing)
                 response_data = response.json().get("data", [])
-                # Clean each dictionary in the response data using the static
-                # method clean_response_dict
-                cleaned_data = [
-                    AFIPService.clean_response_dict(item) for item in response_data
-                ]
-                return cleaned_data
+                return QueryResult(
+                    self._decode(service_name, response_data), response.status_code
+                )
             else:
                 sent_body = getattr(response.request, "body", "<no body>")
                 logger.debug("BODY enviado realmente:\n%s", sent_body)
                 logger.error(
                     "Error querying service '%s': %s", service_name, response.text
                 )
-                return None
+                return QueryResult(
+                    None,
+                    response.status_code,
+                    parse_retry_after(response.headers.get("Retry-After")),
+                )
 
         except requests.exceptions.RequestException as req_err:
             logger.error(
                 "Request error while querying service '%s': %s", service_name, req_err
             )
-            return None
+            return QueryResult(None)
+
+    def _decode(
+        self, service_name: str, response_data: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Decodes the "data" list of a response into records keyed by person ID.
+
+        Services listed in ERROR_KEYS_BY_SERVICE are reduced to their error keys
+        in a single pass, unless full_clean is set.
+        """
+        error_keys = (
+            None if self.full_clean else ERROR_KEYS_BY_SERVICE.get(service_name)
+        )
+        return decode_response(response_data, error_keys)
 
     def _query_with_retry(
         self, service_name: str, fragment: List[Any]
-    ) -> Optional[List[Dict[str, Any]]]:
+    ) -> Optional[Dict[str, Any]]:
         """
         Attempts to query the specified service with retries using exponential backoff.
 
         The method calls the query_service function for the provided chunk (fragment) of IDs.
-        If the response is empty or invalid, it waits for an exponentially increasing delay
-        before retrying, up to the maximum number of retries.
+        Each attempt takes a token from the rate limiter and reports its latency and status to
+        the adaptive controller. If the response is empty or invalid, it waits for an
+        exponentially increasing delay before retrying, up to the maximum number of retries.
+        The wait only blocks the worker handling this chunk, unless the service sent a
+        Retry-After header: then every worker waits that long instead.
+
+        Each attempt holds an in-flight slot of the adaptive controller: the first one uses
+        the slot taken by the dispatcher and each retry takes a new one, so retries also
+        respect a concurrency that was reduced after the chunk was dispatched.
 
         Parameters:
             service_name (str): The service to query.
             fragment (List[Any]): A chunk of person IDs to query.
 
         Returns:
-            Optional[List[Dict[str, Any]]]: The service response if successful; None if all retries fail.
+            Optional[Dict[str, Any]]: The decoded records if successful; None if all retries fail.
         """
         for attempt in range(1, self.max_retries + 1):
-            response = self._query_once(service_name, fragment)
-            if response:
-                return response
+            if attempt > 1:
+                self.controller.acquire_slot()
+            try:
+                self.controller.wait_if_paused()
+                self.rate_limiter.acquire()
+                started_at = time.monotonic()
+                result = self._query_once(service_name, fragment)
+                self.controller.record(
+                    started_at,
+                    time.monotonic() - started_at,
+                    bool(result.data),
+                    result.status_code,
+                )
+            finally:
+                self.controller.release_slot()
+            if result.data:
+                return result.data
             else:
                 logger.warning(
                     "Attempt %d for service '%s' failed: empty or invalid response.",
                     attempt,
                     service_name,
                 )
-                if attempt < self.max_retries:
+                if result.retry_after is not None:
+                    # Honored by every worker before its next attempt
+                    self.controller.pause(result.retry_after)
+                elif attempt < self.max_retries:
                     # Calculate the delay using exponential backoff
                     backoff_delay = self.retry_delay * (2 ** (attempt - 1))
                     logger.info("Retrying in %d seconds...", backoff_delay)
@@ -217,67 +321,152 @@ class AFIPService:
         )
         return None
 
+    def _query_chunk(
+        self,
+        service_name: str,
+        chunk: List[Any],
+        journal: Optional[CheckpointJournal] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Queries one chunk with retries and records it in the checkpoint journal
+        as soon as it succeeds.
+
+        Returns:
+            Optional[Dict[str, Any]]: The decoded records of the chunk, or None
+            if all retries failed.
+        """
+        chunk_data = self._query_with_retry(service_name, chunk)
+        if not chunk_data:
+            return None
+        if journal is not None:
+            journal.record_chunk(service_name, chunk, chunk_data)
+        return chunk_data
+
     def fetch_service_data(
-        self, service_name: str, person_ids: List[Any]
-    ) -> Optional[List[Dict[str, Any]]]:
+        self,
+        service_name: str,
+        person_ids: List[Any],
+        journal: Optional[CheckpointJournal] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Fetches and aggregates data from the specified service. See
+        fetch_service_data_with_failures; this variant only returns the data.
         """
-        Fetches and aggregates data from the specified service by splitting person IDs into chunks,
-        applying retries with exponential backoff, and pausing after a set number of consecutive calls.
+        result = self.fetch_service_data_with_failures(
+            service_name, person_ids, journal
+        )
+        return None if result is None else result[0]
 
-        This method first checks if the service instance and token are valid. Then, if the list of
-        person IDs exceeds the defined chunk size, it divides them into smaller chunks. For each chunk,
-        it uses the retry mechanism to query the service and aggregates the cleaned responses.
+    def fetch_service_data_with_failures(
+        self,
+        service_name: str,
+        person_ids: List[Any],
+        journal: Optional[CheckpointJournal] = None,
+    ) -> Optional[Tuple[Dict[str, Any], List[Any]]]:
+        """
+        Fetches and aggregates data from the specified service by splitting person IDs into chunks
+        and querying several chunks concurrently, with a token bucket limiting the call rate and
+        retries with exponential backoff applied per chunk.
+
+        This method first checks if the service instance and token are valid. Then it cuts the
+        person IDs into chunks as they are dispatched: the size of each chunk and the number of
+        chunks in flight are taken from the adaptive controller at that moment, so they follow
+        the latency and errors observed so far. Each chunk is queried with the retry mechanism
+        and the cleaned responses are aggregated in order.
+        If a cache is configured, only the IDs missing from it are sent to the service, and the
+        new responses are stored in it. If a checkpoint journal is given, the IDs it already holds
+        are not queried again and every chunk that succeeds is appended to it.
 
         Parameters:
             service_name (str): The service to query.
             person_ids (List[Any]): Complete list of person IDs to process.
+            journal (CheckpointJournal): Optional journal to resume from and record to.
 
         Returns:
-            Optional[List[Dict[str, Any]]]: A list of aggregated cleaned response data from all chunks,
-            or None if an error occurs.
+            Optional[Tuple[Dict[str, Any], List[Any]]]: The aggregated response keyed by
+            person ID and the IDs of the chunks that never succeeded, or None if the
+            service instance check fails.
         """
         # Verify if the service is available and the token is valid
         if not self._check_instance(service_name):
             logger.error("Service instance check failed for '%s'.", service_name)
             return None
 
-        # Split person IDs into chunks if they exceed the predefined chunk
-        # size.
-        if len(person_ids) > self.chunk_size:
-            person_ids = [
-                person_ids[i : i + self.chunk_size]
-                for i in range(0, len(person_ids), self.chunk_size)
-            ]
-            logger.info("Split person IDs into %d chunks.", len(person_ids))
-        else:
-            person_ids = [person_ids]
-            logger.info("Using a single chunk for person IDs.")
-
-        total_data: List[Dict[str, Any]] = []
-
-        for index, chunk in enumerate(person_ids):
-            # Pause execution after reaching the maximum allowed consecutive
-            # calls
-            if index == self.max_calls:
+        # Reuse the chunks completed by a previous, interrupted run
+        recorded_data: Dict[str, Any] = {}
+        if journal is not None:
+            recorded_data, person_ids = journal.split(service_name, person_ids)
+            if recorded_data:
                 logger.info(
-                    "Reached maximum consecutive calls (%d). Pausing for %d seconds...",
-                    self.max_calls,
-                    self.pause_duration,
-                )
-                time.sleep(self.pause_duration)
-                logger.debug(f"List of nits for request: {chunk}")
-            response = self._query_with_retry(service_name, chunk)
-            if response:
-                logger.debug(response)
-                total_data.extend(response)
-            else:
-                logger.error(
-                    "Failed to retrieve data for chunk %d of service '%s'.",
-                    index + 1,
+                    "Checkpoint for '%s': %d IDs already done, %d pending.",
                     service_name,
+                    len(recorded_data),
+                    len(person_ids),
                 )
 
-        return AFIPService.format_response(total_data)
+        # Serve what we can from the cache and query only the misses
+        cached_data: Dict[str, Any] = {}
+        if self.cache is not None and person_ids:
+            cached_data, person_ids = self.cache.get_many(service_name, person_ids)
+            logger.info(
+                "AFIP cache for '%s': %d hits, %d misses (session: %d hits, %d misses).",
+                service_name,
+                len(cached_data),
+                len(person_ids),
+                self.cache.hits,
+                self.cache.misses,
+            )
+        cached_data.update(recorded_data)
+        if not person_ids:
+            return cached_data, []
+
+        fetched_data: Dict[str, Any] = {}
+        failed_ids: List[Any] = []
+        chunks: List[Tuple[List[Any], Any]] = []
+
+        # A chunk is only dispatched when a thread can run it right away: a
+        # queued chunk holding a slot could starve the retries of running ones
+        free_workers = threading.Semaphore(self.max_workers)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            position = 0
+            while position < len(person_ids):
+                # Wait for a free thread and slot, then cut the next chunk at
+                # the current size
+                free_workers.acquire()
+                self.controller.acquire_slot()
+                chunk = person_ids[position : position + self.controller.chunk_size]
+                position += len(chunk)
+                future = executor.submit(
+                    self._query_chunk, service_name, chunk, journal
+                )
+                future.add_done_callback(lambda _: free_workers.release())
+                chunks.append((chunk, future))
+            logger.info("Dispatched %d IDs in %d chunks.", position, len(chunks))
+
+            for index, (chunk, future) in enumerate(chunks):
+                chunk_data = future.result()
+                if chunk_data is not None:
+                    logger.debug(chunk_data)
+                    fetched_data.update(chunk_data)
+                else:
+                    failed_ids.extend(chunk)
+                    logger.error(
+                        "Failed to retrieve data for chunk %d of service '%s'.",
+                        index + 1,
+                        service_name,
+                    )
+
+        if self.cache is not None:
+            self.cache.store_many(service_name, fetched_data)
+        fetched_data.update(cached_data)
+        if failed_ids:
+            logger.warning(
+                "%d IDs of service '%s' could not be verified.",
+                len(failed_ids),
+                service_name,
+            )
+        return fetched_data, failed_ids
 
     def check_health(self, service_name: str) -> Optional[Tuple[int, str]]:
         """
@@ -315,24 +504,9 @@ class AFIPService:
     ) -> Union[Dict[Any, Any], List[Any]]:
         """
         Recursively removes keys with None values or empty lists from a dictionary.
-        Also cleans nested dictionaries and lists.
-
-        Parameters:
-            data (Union[dict, list]): Data to be cleaned.
-
-        Returns:
-            Union[dict, list]: Cleaned data.
-        """
-        if isinstance(data, dict):
-            return {
-                key: AFIPService.clean_response_dict(value)
-                for key, value in data.items()
-                if value not in [None, []]
-            }
-        elif isinstance(data, list):
-            return [AFIPService.clean_response_dict(item) for item in data]
-        else:
-            return data
+        Also cleans nested dictionaries and lists. See response_decoder.clean_response.
+        """
+        return clean_response(data)
 
     # Esto hasta que se mejore o cambie el formato de respuesta
     @staticmethod
@@ -0,0 +1,508 @@
+import asyncio
+import inspect
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from afip_client.adaptive_controller import (
+    DEFAULT_TARGET_LATENCY,
+    AdaptiveController,
+    QueryResult,
+    parse_retry_after,
+)
+from afip_client.afip_service import AFIPService
+from afip_client.checkpoint import CheckpointJournal
+from afip_client.rate_limiter import TokenBucket
+from afip_client.response_cache import ResponseCache
+from logger import logger
+
+try:
+    import httpx
+except ImportError:  # httpx is optional: only the async client needs it
+    httpx = None
+
+
+class AsyncAFIPService:
+    """
+    asyncio counterpart of AFIPService, built on a pooled httpx.AsyncClient
+    with HTTP keep-alive.
+
+    It exposes the same surface (token acquisition, fetch_service_data,
+    check_health and the static cleaning helpers). Chunks are queried
+    concurrently, with the same adaptive chunk size and concurrency and the same
+    token bucket as the blocking client, and concurrent 401 responses share a
+    single token refresh.
+
+    Usage:
+        async with AsyncAFIPService(...) as service:
+            data = await service.fetch_service_data("inscription", person_ids)
+    """
+
+    # The response helpers do not depend on the transport
+    clean_response_dict = staticmethod(AFIPService.clean_response_dict)
+    format_response = staticmethod(AFIPService.format_response)
+    extract_error_details = staticmethod(AFIPService.extract_error_details)
+    accumulate_errors_in_data = staticmethod(AFIPService.accumulate_errors_in_data)
+    _decode = AFIPService._decode
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        base_url: str,
+        chunk_size: int,
+        max_calls: int,
+        pause_duration: int,
+        max_retries: int,
+        retry_delay: int,
+        services_available: Optional[List[str]] = None,
+        cache: Optional[ResponseCache] = None,
+        max_workers: int = 4,
+        min_chunk_size: Optional[int] = None,
+        max_chunk_size: Optional[int] = None,
+        min_workers: int = 1,
+        target_latency: float = DEFAULT_TARGET_LATENCY,
+        full_clean: bool = False,
+        timeout: float = 30.0,
+        transport: Optional["httpx.AsyncBaseTransport"] = None,
+    ) -> None:
+        """
+        Initializes the client. The HTTP client is opened and the token acquired
+        when entering the async context (or by calling open()).
+
+        Parameters:
+            username (str): Username for authentication.
+            password (str): Password.
+            base_url (str): Base URL of the API.
+            chunk_size (int): Initial size of chunks for splitting the requests.
+            max_calls (int): Maximum number of calls in a burst (token bucket capacity).
+            pause_duration (int): Seconds over which max_calls calls are allowed (bucket refill time).
+            max_retries (int): Maximum number of retry attempts in case of failure.
+            retry_delay (int): Base wait time in seconds between retries (will be multiplied exponentially).
+            services_available (List[str]): List of available services. Defaults to ["inscription", "padron"] if None.
+            cache (ResponseCache): Optional persistent cache checked before querying the services.
+            max_workers (int): Maximum number of chunk requests kept in flight; the
+                adaptive controller starts at half of it.
+            min_chunk_size (int): Lower bound for the adaptive chunk size (defaults to chunk_size // 5).
+            max_chunk_size (int): Upper bound for the adaptive chunk size (defaults to chunk_size * 5).
+            min_workers (int): Lower bound for the adaptive number of requests in flight.
+            target_latency (float): Mean seconds per request above which the load is reduced.
+            full_clean (bool): Keep the full cleaned records of every service, instead of
+                only the error keys of the inscription records (for debugging).
+            timeout (float): Timeout in seconds for each HTTP request.
+            transport (httpx.AsyncBaseTransport): Optional transport for the HTTP client
+                (e.g. httpx.MockTransport to answer without network).
+        """
+        if httpx is None:
+            error_msg = (
+                "AsyncAFIPService requires httpx. Install it with: pip install httpx"
+            )
+            logger.error(error_msg)
+            raise ImportError(error_msg)
+
+        self.username = username
+        self.password = password
+        self.base_url = base_url
+        self.chunk_size = chunk_size
+        self.max_calls = max_calls
+        self.pause_duration = pause_duration
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.services_available = (
+            services_available
+            if services_available is not None
+            else ["inscription", "padron"]
+        )
+        self.cache = cache
+        self.max_workers = max(1, max_workers)
+        self.full_clean = full_clean
+        self.timeout = timeout
+        self.transport = transport
+        self.rate_limiter = TokenBucket(max_calls, pause_duration)
+        self.controller = AdaptiveController(
+            chunk_size,
+            # Starts halfway so that healthy windows can still add workers
+            max(min_workers, self.max_workers // 2),
+            min_chunk_size=min_chunk_size,
+            max_chunk_size=max_chunk_size,
+            min_concurrency=min_workers,
+            max_concurrency=self.max_workers,
+            target_latency=target_latency,
+        )
+
+        self.client: Optional["httpx.AsyncClient"] = None
+        self.token: Optional[str] = None
+        self._token_lock = asyncio.Lock()
+        # Set whenever an in-flight slot of the controller is released
+        self._slot_released = asyncio.Event()
+
+    async def open(self) -> None:
+        """Opens the pooled HTTP client and acquires the authentication token."""
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_workers,
+                    max_keepalive_connections=self.max_workers,
+                ),
+                transport=self.transport,
+            )
+        if not self.token:
+            self.token = await self._get_token()
+
+    async def aclose(self) -> None:
+        """Closes the HTTP client."""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def __aenter__(self) -> "AsyncAFIPService":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def _get_token(self) -> Optional[str]:
+        """
+        Retrieves the authentication token from the API.
+
+        Returns:
+            Optional[str]: JWT access token if successful, None otherwise.
+        """
+        data = {"username": self.username, "password": self.password}
+        token_url = f"{self.base_url}/token"
+        try:
+            response = await self.client.post(token_url, data=data)
+            if response.status_code == 200:
+                token = response.json().get("access_token")
+                logger.info("Token acquired successfully.")
+                return token
+            else:
+                logger.error("Error acquiring token: %s", response.text)
+                return None
+        except Exception as e:
+            logger.error("Exception during token acquisition: %s", e)
+            return None
+
+    async def _refresh_token(self, stale_token: Optional[str] = None) -> bool:
+        """
+        Refreshes the authentication token. Concurrent callers that were rejected
+        with the same token wait for a single refresh and reuse its result.
+
+        Parameters:
+            stale_token (Optional[str]): The token that was rejected.
+
+        Returns:
+            bool: True if a valid token is available, False otherwise.
+        """
+        async with self._token_lock:
+            if stale_token is not None and self.token and self.token != stale_token:
+                return True
+            logger.info("Refreshing authentication token...")
+            new_token = await self._get_token()
+            if new_token:
+                self.token = new_token
+                return True
+            return False
+
+    def _check_instance(self, service_name: str) -> bool:
+        """
+        Checks if the requested service is available and if a valid token exists.
+        """
+        if service_name not in self.services_available:
+            logger.error("Unknown service: %s", service_name)
+            return False
+        if not self.token:
+            logger.error("No valid token available.")
+            return False
+        return True
+
+    async def _query_once(
+        self, service_name: str, person_ids: List[Any]
+    ) -> QueryResult:
+        """
+        Queries the specified service with a list of person IDs, refreshing the
+        token once on HTTP 401.
+
+        Returns:
+            QueryResult: The decoded records keyed by person ID if the request is
+            successful (None if any error occurs), with the HTTP status and the
+            Retry-After delay of the response.
+        """
+        if not self._check_instance(service_name):
+            logger.error("Invalid service instance for '%s'.", service_name)
+            return QueryResult(None)
+
+        url = f"{self.base_url}/{service_name}"
+        payload = {"persona_ids": person_ids}
+        token = self.token
+
+        try:
+            response = await self.client.post(
+                url, json=payload, headers={"Authorization": f"Bearer {token}"}
+            )
+            if response.status_code == 401:
+                logger.warning(
+                    "Received 401 Unauthorized for service '%s'. Attempting token refresh...",
+                    service_name,
+                )
+                if await self._refresh_token(token):
+                    response = await self.client.post(
+                        url,
+                        json=payload,
+                        headers={"Authorization": f"Bearer {self.token}"},
+                    )
+                else:
+                    logger.error("Token refresh failed for service '%s'.", service_name)
+                    return QueryResult(None, response.status_code)
+
+            if response.is_success:
+                response_data = response.json().get("data", [])
+                return QueryResult(
+                    self._decode(service_name, response_data), response.status_code
+                )
+            else:
+                logger.error(
+                    "Error querying service '%s': %s", service_name, response.text
+                )
+                return QueryResult(
+                    None,
+                    response.status_code,
+                    parse_retry_after(response.headers.get("Retry-After")),
+                )
+
+        except httpx.HTTPError as req_err:
+            logger.error(
+                "Request error while querying service '%s': %s", service_name, req_err
+            )
+            return QueryResult(None)
+
+    async def _acquire_slot(self) -> None:
+        """Waits until the adaptive controller allows another request in flight."""
+        while not self.controller.try_acquire_slot():
+            self._slot_released.clear()
+            await self._slot_released.wait()
+
+    def _release_slot(self) -> None:
+        self.controller.release_slot()
+        self._slot_released.set()
+
+    async def _query_with_retry(
+        self, service_name: str, fragment: List[Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Queries one chunk with retries and exponential backoff. Each attempt
+        takes a token from the rate limiter and reports its latency and status
+        to the adaptive controller; waits only suspend this chunk, except a
+        Retry-After pause, which every chunk honors. As in AFIPService, the first
+        attempt uses the in-flight slot taken by the dispatcher and each retry
+        takes a new one.
+        """
+        for attempt in range(1, self.max_retries + 1):
+            if attempt > 1:
+                await self._acquire_slot()
+            try:
+                wait = self.controller.pause_remaining()
+                while wait > 0:
+                    await asyncio.sleep(wait)
+                    wait = self.controller.pause_remaining()
+                wait = self.rate_limiter.try_acquire()
+                while wait > 0:
+                    await asyncio.sleep(wait)
+                    wait = self.rate_limiter.try_acquire()
+
+                started_at = time.monotonic()
+                result = await self._query_once(service_name, fragment)
+                self.controller.record(
+                    started_at,
+                    time.monotonic() - started_at,
+                    bool(result.data),
+                    result.status_code,
+                )
+            finally:
+                self._release_slot()
+            if result.data:
+                return result.data
+            logger.warning(
+                "Attempt %d for service '%s' failed: empty or invalid response.",
+                attempt,
+                service_name,
+            )
+            if result.retry_after is not None:
+                self.controller.pause(result.retry_after)
+            elif attempt < self.max_retries:
+                backoff_delay = self.retry_delay * (2 ** (attempt - 1))
+                logger.info("Retrying in %d seconds...", backoff_delay)
+                await asyncio.sleep(backoff_delay)
+        logger.error(
+            "All %d retry attempts failed for service '%s'.",
+            self.max_retries,
+            service_name,
+        )
+        return None
+
+    async def _query_chunk(
+        self,
+        service_name: str,
+        chunk: List[Any],
+        journal: Optional[CheckpointJournal] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Queries one chunk with retries and records it in the checkpoint journal
+        as soon as it succeeds.
+        """
+        chunk_data = await self._query_with_retry(service_name, chunk)
+        if not chunk_data:
+            return None
+        if journal is not None:
+            await asyncio.to_thread(
+                journal.record_chunk, service_name, chunk, chunk_data
+            )
+        return chunk_data
+
+    async def _cancel_pending(self, tasks: List["asyncio.Task"]) -> None:
+        """Cancels the chunk tasks that are still running and waits for them."""
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            # A task cancelled before its first step never releases the slot
+            # taken for it by the dispatcher
+            if inspect.getcoroutinestate(task.get_coro()) == inspect.CORO_CREATED:
+                self._release_slot()
+            task.cancel()
+        if pending:
+            logger.warning("Cancelling %d pending chunks.", len(pending))
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def fetch_service_data(
+        self,
+        service_name: str,
+        person_ids: List[Any],
+        journal: Optional[CheckpointJournal] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Fetches and aggregates data from the specified service. See
+        fetch_service_data_with_failures; this variant only returns the data.
+        """
+        result = await self.fetch_service_data_with_failures(
+            service_name, person_ids, journal
+        )
+        return None if result is None else result[0]
+
+    async def fetch_service_data_with_failures(
+        self,
+        service_name: str,
+        person_ids: List[Any],
+        journal: Optional[CheckpointJournal] = None,
+    ) -> Optional[Tuple[Dict[str, Any], List[Any]]]:
+        """
+        Fetches and aggregates data from the specified service, querying several
+        chunks concurrently with the adaptive chunk size and concurrency. See
+        AFIPService.fetch_service_data_with_failures.
+
+        Parameters:
+            service_name (str): The service to query.
+            person_ids (List[Any]): Complete list of person IDs to process.
+            journal (CheckpointJournal): Optional journal to resume from and record to.
+
+        Returns:
+            Optional[Tuple[Dict[str, Any], List[Any]]]: The response keyed by person ID
+            and the IDs of the chunks that never succeeded, or None if the service
+            instance check fails.
+        """
+        if not self._check_instance(service_name):
+            logger.error("Service instance check failed for '%s'.", service_name)
+            return None
+
+        recorded_data: Dict[str, Any] = {}
+        if journal is not None:
+            recorded_data, person_ids = journal.split(service_name, person_ids)
+
+        cached_data: Dict[str, Any] = {}
+        if self.cache is not None and person_ids:
+            cached_data, person_ids = await asyncio.to_thread(
+                self.cache.get_many, service_name, person_ids
+            )
+            logger.info(
+                "AFIP cache for '%s': %d hits, %d misses (session: %d hits, %d misses).",
+                service_name,
+                len(cached_data),
+                len(person_ids),
+                self.cache.hits,
+                self.cache.misses,
+            )
+        cached_data.update(recorded_data)
+        if not person_ids:
+            return cached_data, []
+
+        chunks: List[List[Any]] = []
+        tasks: List["asyncio.Task"] = []
+        try:
+            position = 0
+            while position < len(person_ids):
+                # Wait for a free slot, then cut the next chunk at the current size
+                await self._acquire_slot()
+                chunk = person_ids[position : position + self.controller.chunk_size]
+                position += len(chunk)
+                chunks.append(chunk)
+                tasks.append(
+                    asyncio.create_task(self._query_chunk(service_name, chunk, journal))
+                )
+            logger.info("Dispatched %d IDs in %d chunks.", position, len(chunks))
+
+            responses = await asyncio.gather(*tasks)
+        finally:
+            # If a chunk raised or the caller was cancelled, no chunk keeps
+            # running after this call returns
+            await self._cancel_pending(tasks)
+
+        fetched_data: Dict[str, Any] = {}
+        failed_ids: List[Any] = []
+        for index, (chunk, chunk_data) in enumerate(zip(chunks, responses)):
+            if chunk_data is not None:
+                fetched_data.update(chunk_data)
+            else:
+                failed_ids.extend(chunk)
+                logger.error(
+                    "Failed to retrieve data for chunk %d of service '%s'.",
+                    index + 1,
+                    service_name,
+                )
+
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.store_many, service_name, fetched_data)
+        fetched_data.update(cached_data)
+        if failed_ids:
+            logger.warning(
+                "%d IDs of service '%s' could not be verified.",
+                len(failed_ids),
+                service_name,
+            )
+        return fetched_data, failed_ids
+
+    async def check_health(self, service_name: str) -> Optional[Tuple[int, str]]:
+        """
+        Checks the health status of the specified service.
+
+        Returns:
+            Optional[Tuple[int, str]]: (HTTP status code, response text) or None in case of errors.
+        """
+        if not self._check_instance(service_name):
+            return None
+
+        url = f"{self.base_url}/{service_name}/health"
+        try:
+            response = await self.client.get(
+                url, headers={"Authorization": f"Bearer {self.token}"}
+            )
+            return response.status_code, response.text
+        except Exception as e:
+            logger.error(
+                "Exception checking health for service '%s': %s", service_name, e
+            )
+            return None
+
+    def get_services_available(self) -> List[str]:
+        """
+        Returns the list of available services.
+        """
+        return self.services_available
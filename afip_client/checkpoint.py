@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from afip_client.error_utils import classify_record
+from afip_client.response_cache import (
+    DEFAULT_TTL_ERROR,
+    DEFAULT_TTL_NOT_FOUND,
+    DEFAULT_TTL_VALID,
+)
+from logger import logger
+
+
+class CheckpointJournal:
+    """
+    Append-only journal (JSON Lines) of the AFIP chunks completed during a run.
+
+    Each line holds the service name, the person IDs of a chunk that was
+    answered successfully, its cleaned response and the time it was written.
+    When a run is interrupted or some chunks fail, a new run over the same
+    journal only queries the IDs that are not recorded yet. Recorded answers
+    older than the time-to-live of their outcome (as in ResponseCache) are
+    queried again. Used as a context manager, the file is closed (and kept)
+    when the block exits.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_valid: int = DEFAULT_TTL_VALID,
+        ttl_not_found: int = DEFAULT_TTL_NOT_FOUND,
+        ttl_error: int = DEFAULT_TTL_ERROR,
+    ) -> None:
+        """
+        Opens the journal, loading the unexpired chunks recorded by a previous run.
+
+        Parameters:
+            path (str): Path to the journal file. Its folder is created if needed.
+            ttl_valid (int): Seconds to reuse records without errors.
+            ttl_not_found (int): Seconds to reuse "person not found" records.
+            ttl_error (int): Seconds to reuse records with any other error.
+        """
+        self.path = path
+        self.ttls = {
+            "valid": ttl_valid,
+            "not_found": ttl_not_found,
+            "error": ttl_error,
+        }
+        self._completed: Dict[str, Dict[str, Any]] = {}
+        self._done_ids: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            self._load()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        # Start on a new line if the previous run left a truncated one
+        if self._file.tell() and not self._ends_with_newline():
+            self._file.write("\n")
+
+    def __enter__(self) -> "CheckpointJournal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        # On error the journal is kept, so a new run resumes from it
+        self.close()
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as journal_file:
+            journal_file.seek(-1, os.SEEK_END)
+            return journal_file.read(1) == b"\n"
+
+    def _load(self) -> None:
+        now = time.time()
+        chunks = 0
+        expired = 0
+        with open(self.path, encoding="utf-8") as journal_file:
+            for line in journal_file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A run killed while writing leaves a truncated last line
+                    logger.warning(
+                        "Ignoring truncated checkpoint line in %s", self.path
+                    )
+                    continue
+                # Lines without a write time come from an older format
+                age = now - entry.get("written_at", float("-inf"))
+                done_ids = self._done_ids.setdefault(entry["service"], set())
+                completed = self._completed.setdefault(entry["service"], {})
+                for key in entry["person_ids"]:
+                    record = entry["data"].get(key)
+                    if age >= self.ttls[classify_record(record or {})]:
+                        expired += 1
+                        continue
+                    done_ids.add(key)
+                    if record is not None:
+                        completed[key] = record
+                chunks += 1
+        logger.info(
+            "Resuming from checkpoint %s (%d chunks done, %d expired answers).",
+            self.path,
+            chunks,
+            expired,
+        )
+
+    def split(
+        self, service_name: str, person_ids: List[Any]
+    ) -> Tuple[Dict[str, Any], List[Any]]:
+        """
+        Separates the IDs already answered in the journal from the pending ones.
+
+        Parameters:
+            service_name (str): The service being queried.
+            person_ids (List[Any]): IDs requested by the caller.
+
+        Returns:
+            Tuple[Dict[str, Any], List[Any]]: The recorded responses for the done
+            IDs, keyed by person ID as a string, and the pending IDs in order.
+        """
+        done_ids = self._done_ids.get(service_name, set())
+        completed = self._completed.get(service_name, {})
+        recorded: Dict[str, Any] = {}
+        pending = []
+        for person_id in person_ids:
+            key = str(person_id)
+            if key in done_ids:
+                if key in completed:
+                    recorded[key] = completed[key]
+            else:
+                pending.append(person_id)
+        return recorded, pending
+
+    def record_chunk(
+        self, service_name: str, person_ids: List[Any], data: Dict[str, Any]
+    ) -> None:
+        """
+        Appends a successfully answered chunk to the journal.
+
+        Parameters:
+            service_name (str): The service that was queried.
+            person_ids (List[Any]): IDs of the chunk.
+            data (Dict[str, Any]): Cleaned response keyed by person ID.
+        """
+        keys = [str(person_id) for person_id in person_ids]
+        line = json.dumps(
+            {
+                "service": service_name,
+                "person_ids": keys,
+                "data": data,
+                "written_at": time.time(),
+            },
+            ensure_ascii=False,
+        )
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self._done_ids.setdefault(service_name, set()).update(keys)
+            self._completed.setdefault(service_name, {}).update(data)
+
+    def close(self) -> None:
+        """Closes the journal file, keeping it for a later resume."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def discard(self) -> None:
+        """Closes and deletes the journal once the run has completed."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+            logger.debug("Checkpoint %s removed.", self.path)
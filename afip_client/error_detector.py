@@ -1,77 +1,248 @@
 import os
+import sqlite3
+from typing import Dict, Optional, Tuple
 
 from dotenv import load_dotenv
 
+from afip_client.adaptive_controller import DEFAULT_TARGET_LATENCY
 from afip_client.afip_service import AFIPService
-from afip_client.error_utils import INSCRIPTION_ERROR_KEYS, find_keys_with_error_msgs
+from afip_client.async_afip_service import AsyncAFIPService
+from afip_client.checkpoint import CheckpointJournal
+from afip_client.error_utils import (
+    INSCRIPTION_ERROR_KEYS,
+    INVALID_DOCUMENT_ERROR_MSGS,
+    find_invalid_ids,
+)
+from afip_client.response_cache import (
+    DEFAULT_TTL_ERROR,
+    DEFAULT_TTL_NOT_FOUND,
+    DEFAULT_TTL_VALID,
+    ResponseCache,
+)
 from logger import logger
 
 # Load environment variables from the .env file
 load_dotenv()
 
+DEFAULT_CACHE_PATH = os.path.join("cache", "afip_cache.sqlite3")
 
-def detect_invalid_documents(nit_list) -> list:
+
+def read_cache_ttls() -> Dict[str, int]:
+    """
+    Reads the time-to-live in seconds of each cached outcome from
+    AFIP_CACHE_TTL_VALID / AFIP_CACHE_TTL_NOT_FOUND / AFIP_CACHE_TTL_ERROR.
+
+    Returns:
+        The ResponseCache keyword arguments (ttl_valid, ttl_not_found, ttl_error).
+    """
+    return {
+        "ttl_valid": int(os.getenv("AFIP_CACHE_TTL_VALID", DEFAULT_TTL_VALID)),
+        "ttl_not_found": int(
+            os.getenv("AFIP_CACHE_TTL_NOT_FOUND", DEFAULT_TTL_NOT_FOUND)
+        ),
+        "ttl_error": int(os.getenv("AFIP_CACHE_TTL_ERROR", DEFAULT_TTL_ERROR)),
+    }
+
+
+def create_response_cache() -> Optional[ResponseCache]:
+    """
+    Creates the persistent AFIP response cache from the environment variables.
+
+    AFIP_CACHE_PATH sets the SQLite file (an empty value disables the cache) and
+    the AFIP_CACHE_TTL_* variables the time-to-live of each outcome (see
+    read_cache_ttls). Returns None if the cache is disabled or cannot be opened.
+    """
+    path = os.getenv("AFIP_CACHE_PATH", DEFAULT_CACHE_PATH)
+    if not path:
+        logger.info("AFIP response cache disabled.")
+        return None
+    try:
+        return ResponseCache(path, **read_cache_ttls())
+    except sqlite3.Error as e:
+        logger.error("Could not open AFIP response cache at '%s': %s", path, e)
+        return None
+
+
+def _optional_int(name: str) -> Optional[int]:
+    """Reads an optional integer environment variable (None if unset or empty)."""
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def _read_service_config() -> dict:
+    """
+    Reads the AFIP client configuration from the environment variables.
+
+    AFIP_CHUNK_SIZE is the initial chunk size; AFIP_MIN_CHUNK_SIZE /
+    AFIP_MAX_CHUNK_SIZE and AFIP_MIN_WORKERS / AFIP_MAX_WORKERS bound how far
+    the adaptive controller may move the chunk size and concurrency, and
+    AFIP_TARGET_LATENCY is the mean seconds per request above which it backs off.
+    """
+    return {
+        "username": os.getenv("AFIP_USERNAME"),
+        "password": os.getenv("AFIP_PASSWORD"),
+        "base_url": os.getenv("AFIP_BASE_URL"),
+        "chunk_size": int(os.getenv("AFIP_CHUNK_SIZE")),
+        "max_calls": int(os.getenv("AFIP_MAX_CALLS")),
+        "pause_duration": int(os.getenv("AFIP_PAUSE_DURATION")),
+        "max_retries": int(os.getenv("AFIP_MAX_RETRIES")),
+        "retry_delay": int(os.getenv("AFIP_RETRY_DELAY")),
+        "services_available": os.getenv("AFIP_SERVICES_AVAILABLE", "").split(","),
+        "max_workers": int(os.getenv("AFIP_MAX_WORKERS", "4")),
+        "min_chunk_size": _optional_int("AFIP_MIN_CHUNK_SIZE"),
+        "max_chunk_size": _optional_int("AFIP_MAX_CHUNK_SIZE"),
+        "min_workers": int(os.getenv("AFIP_MIN_WORKERS", "1")),
+        "target_latency": float(
+            os.getenv("AFIP_TARGET_LATENCY", str(DEFAULT_TARGET_LATENCY))
+        ),
+        "full_clean": os.getenv("AFIP_FULL_CLEAN", "").lower() in ("1", "true"),
+    }
+
+
+def create_afip_service() -> AFIPService:
+    """
+    Creates an AFIPService configured from the environment variables.
+
+    A single instance can be shared across several calls to
+    detect_invalid_documents() to avoid acquiring a new token each time.
+    """
+    return AFIPService(**_read_service_config(), cache=create_response_cache())
+
+
+def create_async_afip_service() -> AsyncAFIPService:
+    """
+    Creates an AsyncAFIPService configured from the environment variables.
+
+    The client must be opened before use, e.g. with
+    `async with create_async_afip_service() as service:`.
+    """
+    return AsyncAFIPService(**_read_service_config(), cache=create_response_cache())
+
+
+def _filter_invalid_documents(fetched_data: dict) -> list:
+    """
+    Returns the IDs of the fetched records whose errors include one of the
+    invalid-document messages, in a single pass over the records.
+    """
+    logger.info("Data fetched: %d records", len(fetched_data))
+
+    key_with_error_msg = find_invalid_ids(
+        fetched_data, INSCRIPTION_ERROR_KEYS, INVALID_DOCUMENT_ERROR_MSGS
+    )
+
+    logger.debug("Records with error messages: %s", key_with_error_msg)
+    logger.info("Records with errors messages: %d", len(key_with_error_msg))
+    logger.info("Process completed AFIP Client.")
+    return key_with_error_msg
+
+
+def detect_invalid_documents(nit_list, service: Optional[AFIPService] = None) -> list:
     """
     Main function that reads configuration, processes the data from AFIPService,
     accumulates errors, filters successful records, and returns a list of document IDs with errors.
+
+    Args:
+        nit_list: Document IDs to check.
+        service: Optional AFIPService to reuse. If None, a new one is created from
+            the environment variables.
+    """
+    return detect_invalid_documents_with_status(nit_list, service)[0]
+
+
+def detect_invalid_documents_with_status(
+    nit_list,
+    service: Optional[AFIPService] = None,
+    journal: Optional[CheckpointJournal] = None,
+) -> Tuple[list, list]:
+    """
+    Same as detect_invalid_documents, but also reports which documents could not
+    be verified (their chunk never succeeded, or the whole lookup failed), so
+    they are not silently treated as valid.
+
+    Args:
+        nit_list: Document IDs to check.
+        service: Optional AFIPService to reuse. If None, a new one is created from
+            the environment variables.
+        journal: Optional checkpoint journal to resume from and record to.
+
+    Returns:
+        Tuple (document IDs with errors, document IDs not verified).
     """
     if not nit_list:
         logger.warning("Empty document list received. Skipping error check.")
-        return []
+        return [], []
 
     try:
-        # Read parameters from environment variables (or use default values if needed)
-        username = os.getenv("AFIP_USERNAME")
-        password = os.getenv("AFIP_PASSWORD")
-        base_url = os.getenv("AFIP_BASE_URL")
-        chunk_size = int(os.getenv("AFIP_CHUNK_SIZE"))
-        max_calls = int(os.getenv("AFIP_MAX_CALLS"))
-        pause_duration = int(os.getenv("AFIP_PAUSE_DURATION"))
-        max_retries = int(os.getenv("AFIP_MAX_RETRIES"))
-        retry_delay = int(os.getenv("AFIP_RETRY_DELAY"))
-        services_available = os.getenv("AFIP_SERVICES_AVAILABLE", "").split(",")
-
         logger.info("Total NITs to consult: %d", len(nit_list))
 
         # Create AFIP service
-        service = AFIPService(
-            username=username,
-            password=password,
-            base_url=base_url,
-            chunk_size=chunk_size,
-            max_calls=max_calls,
-            pause_duration=pause_duration,
-            max_retries=max_retries,
-            retry_delay=retry_delay,
-            services_available=services_available,
-        )
+        if service is None:
+            service = create_afip_service()
 
         # Fetch data
-        fetched_data = service.fetch_service_data("inscription", nit_list)
+        result = service.fetch_service_data_with_failures(
+            "inscription", nit_list, journal
+        )
+        if result is None:
+            logger.warning("No data fetched from AFIP.")
+            return [], list(nit_list)
+
+        fetched_data, failed_ids = result
         if not fetched_data:
             logger.warning("No data fetched from AFIP.")
-            return []
+            return [], failed_ids
 
-        logger.info("Data fetched: %d records", len(fetched_data))
+        return _filter_invalid_documents(fetched_data), failed_ids
 
-        # Accumulate and filter errors
-        data_with_error = service.accumulate_errors_in_data(
-            fetched_data, INSCRIPTION_ERROR_KEYS
-        )
-        logger.debug("Records with errors: %d", len(data_with_error))
+    except Exception as e:
+        logger.error("Error during document error identification: %s", str(e))
+        return [], list(nit_list)
+
+
+async def detect_invalid_documents_async(
+    nit_list,
+    service: Optional[AsyncAFIPService] = None,
+    journal: Optional[CheckpointJournal] = None,
+) -> Tuple[list, list]:
+    """
+    asyncio version of detect_invalid_documents_with_status.
+
+    Args:
+        nit_list: Document IDs to check.
+        service: Optional opened AsyncAFIPService to reuse. If None, a new one is
+            created from the environment variables and closed afterwards.
+        journal: Optional checkpoint journal to resume from and record to.
+
+    Returns:
+        Tuple (document IDs with errors, document IDs not verified).
+    """
+    if not nit_list:
+        logger.warning("Empty document list received. Skipping error check.")
+        return [], []
+
+    try:
+        logger.info("Total NITs to consult: %d", len(nit_list))
 
-        error_messages = [
-            "No existe persona con ese Id",
-            "La clave se encuentra inactiva",
-        ]
-        key_with_error_msg = find_keys_with_error_msgs(data_with_error, error_messages)
+        if service is None:
+            async with create_async_afip_service() as own_service:
+                result = await own_service.fetch_service_data_with_failures(
+                    "inscription", nit_list, journal
+                )
+        else:
+            result = await service.fetch_service_data_with_failures(
+                "inscription", nit_list, journal
+            )
+        if result is None:
+            logger.warning("No data fetched from AFIP.")
+            return [], list(nit_list)
 
-        logger.debug("Records with error messages: %s", key_with_error_msg)
-        logger.info("Records with errors messages: %d", len(key_with_error_msg))
-        logger.info("Process completed AFIP Client.")
+        fetched_data, failed_ids = result
+        if not fetched_data:
+            logger.warning("No data fetched from AFIP.")
+            return [], failed_ids
 
-        return key_with_error_msg
+        return _filter_invalid_documents(fetched_data), failed_ids
 
     except Exception as e:
         logger.error("Error during document error identification: %s", str(e))
-        return []
+        return [], list(nit_list)
@@ -33,3 +33,81 @@ def find_keys_with_error_msgs(dictionary, error_msgs):
                     break  # Stop checking further messages for this key
 
     return keys_with_error
+
+
+NOT_FOUND_ERROR_MSG = "No existe persona con ese Id"
+
+# Messages that mark a document as invalid (to be replaced)
+INVALID_DOCUMENT_ERROR_MSGS = [
+    NOT_FOUND_ERROR_MSG,
+    "La clave se encuentra inactiva",
+]
+
+
+def extract_record_errors(record, error_keys=INSCRIPTION_ERROR_KEYS):
+    """
+    Collects the error messages of a single record.
+
+    Works both on full cleaned records and on the records reduced to their
+    error keys by the response decoder.
+
+    Args:
+        record (dict): The record returned by the service for one person ID.
+        error_keys (list): Keys that may hold errors.
+
+    Returns:
+        list: The errors found under the error keys, in order.
+    """
+    errors = []
+    if not isinstance(record, dict):
+        return errors
+    for key in error_keys:
+        error_info = record.get(key)
+        if isinstance(error_info, dict):
+            error_info = error_info.get("error")
+        if isinstance(error_info, list):
+            errors.extend(error_info)
+        elif error_info:
+            errors.append(error_info)
+    return errors
+
+
+def find_invalid_ids(records, error_keys, error_msgs):
+    """
+    Single-pass equivalent of accumulating the errors of every record and then
+    calling find_keys_with_error_msgs on them.
+
+    Args:
+        records (dict): Records keyed by person ID.
+        error_keys (list): Keys that may hold errors.
+        error_msgs (list): Messages that mark a record as invalid.
+
+    Returns:
+        list: The person IDs whose errors contain one of the messages, in order.
+    """
+    invalid = []
+    for person_id, record in records.items():
+        for error in extract_record_errors(record, error_keys):
+            if isinstance(error, str) and any(msg in error for msg in error_msgs):
+                invalid.append(person_id)
+                break
+    return invalid
+
+
+def classify_record(record):
+    """
+    Classifies a single inscription record by the errors it carries.
+
+    Args:
+        record (dict): The cleaned record returned by the service for one person ID.
+
+    Returns:
+        str: "not_found" if AFIP reports that the person does not exist, "error"
+        if any other error is present, or "valid" otherwise.
+    """
+    errors = extract_record_errors(record)
+    if any(NOT_FOUND_ERROR_MSG in str(error) for error in errors):
+        return "not_found"
+    if errors:
+        return "error"
+    return "valid"
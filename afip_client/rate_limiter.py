@@ -0,0 +1,57 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Allows bursts of up to `capacity` calls and then refills at
+    `capacity / period` tokens per second, so that on average no more than
+    `capacity` calls are made every `period` seconds.
+    """
+
+    def __init__(self, capacity: int, period: float) -> None:
+        """
+        Parameters:
+            capacity (int): Maximum number of calls in a burst (AFIP_MAX_CALLS).
+            period (float): Seconds needed to refill the whole bucket
+                (AFIP_PAUSE_DURATION). A value <= 0 disables the limit.
+        """
+        self.capacity = max(1, capacity)
+        self.period = period
+        self.rate = self.capacity / period if period > 0 else None
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def try_acquire(self) -> float:
+        """
+        Takes a token if one is available.
+
+        Returns:
+            float: 0 if a token was taken, otherwise the seconds to wait until
+            the next token is available.
+        """
+        if self.rate is None:
+            return 0.0
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self) -> None:
+        """Blocks until a token is available and takes it."""
+        wait = self.try_acquire()
+        while wait > 0:
+            time.sleep(wait)
+            wait = self.try_acquire()
@@ -0,0 +1,160 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from afip_client.error_utils import classify_record
+from logger import logger
+
+# Default time-to-live, in seconds, for each kind of cached outcome
+DEFAULT_TTL_VALID = 30 * 24 * 3600
+DEFAULT_TTL_NOT_FOUND = 24 * 3600
+DEFAULT_TTL_ERROR = 6 * 3600
+
+# SQLite limits the number of bound parameters per statement
+_MAX_QUERY_PARAMS = 900
+
+
+class ResponseCache:
+    """
+    Persistent SQLite cache of AFIP service responses, keyed by service name and
+    person ID.
+
+    Each record is stored with an expiration time that depends on its outcome
+    (see classify_record), so valid CUITs can be kept longer than "No existe
+    persona con ese Id" answers. Hit and miss counters are kept for the lifetime
+    of the instance.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_valid: int = DEFAULT_TTL_VALID,
+        ttl_not_found: int = DEFAULT_TTL_NOT_FOUND,
+        ttl_error: int = DEFAULT_TTL_ERROR,
+    ) -> None:
+        """
+        Opens (or creates) the cache database.
+
+        Parameters:
+            path (str): Path to the SQLite file. Its folder is created if needed.
+            ttl_valid (int): Seconds to keep records without errors.
+            ttl_not_found (int): Seconds to keep "person not found" records.
+            ttl_error (int): Seconds to keep records with any other error.
+        """
+        self.path = path
+        self.ttls = {
+            "valid": ttl_valid,
+            "not_found": ttl_not_found,
+            "error": ttl_error,
+        }
+        self.hits = 0
+        self.misses = 0
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        # The same connection may be used from the dispatcher threads
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    service TEXT NOT NULL,
+                    person_id TEXT NOT NULL,
+                    outcome TEXT NOT NULL,
+                    record TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (service, person_id)
+                )
+                """)
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        with self._lock:
+            self._connection.close()
+
+    def get_many(
+        self, service_name: str, person_ids: List[Any]
+    ) -> Tuple[Dict[str, Any], List[Any]]:
+        """
+        Looks up several person IDs at once.
+
+        Parameters:
+            service_name (str): The service the records belong to.
+            person_ids (List[Any]): Person IDs to look up.
+
+        Returns:
+            Tuple[Dict[str, Any], List[Any]]: The unexpired cached records, keyed
+            by person ID as a string, and the IDs that must be queried (misses),
+            in their original order.
+        """
+        now = time.time()
+        keys = [str(person_id) for person_id in person_ids]
+        found: Dict[str, Any] = {}
+        with self._lock:
+            for start in range(0, len(keys), _MAX_QUERY_PARAMS):
+                batch = keys[start : start + _MAX_QUERY_PARAMS]
+                placeholders = ", ".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT person_id, record FROM responses "
+                    f"WHERE service = ? AND expires_at > ? "
+                    f"AND person_id IN ({placeholders})",
+                    [service_name, now, *batch],
+                )
+                for person_id, record in rows:
+                    found[person_id] = json.loads(record)
+
+        misses = [
+            person_id for person_id, key in zip(person_ids, keys) if key not in found
+        ]
+        self.hits += len(person_ids) - len(misses)
+        self.misses += len(misses)
+        return found, misses
+
+    def store_many(self, service_name: str, records: Dict[str, Any]) -> None:
+        """
+        Stores the records returned by a service, each with the TTL of its outcome.
+
+        Parameters:
+            service_name (str): The service the records belong to.
+            records (Dict[str, Any]): Records keyed by person ID, as returned by
+                AFIPService.format_response.
+        """
+        now = time.time()
+        rows = []
+        for person_id, record in records.items():
+            outcome = classify_record(record)
+            rows.append(
+                (
+                    service_name,
+                    str(person_id),
+                    outcome,
+                    json.dumps(record, ensure_ascii=False),
+                    now + self.ttls[outcome],
+                )
+            )
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO responses "
+                "(service, person_id, outcome, record, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def purge_expired(self) -> int:
+        """
+        Deletes the expired records.
+
+        Returns:
+            int: Number of records deleted.
+        """
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM responses WHERE expires_at <= ?", (time.time(),)
+            )
+        logger.debug("Purged %d expired cache records.", cursor.rowcount)
+        return cursor.rowcount
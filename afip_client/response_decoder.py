@@ -0,0 +1,92 @@
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from afip_client.error_utils import INSCRIPTION_ERROR_KEYS
+
+# Services whose responses are reduced to their error keys when decoded. The
+# other services keep their full (cleaned) records.
+ERROR_KEYS_BY_SERVICE = {"inscription": INSCRIPTION_ERROR_KEYS}
+
+
+def clean_response(
+    data: Union[Dict[Any, Any], List[Any]],
+) -> Union[Dict[Any, Any], List[Any]]:
+    """
+    Recursively removes keys with None values or empty lists from a dictionary.
+    Also cleans nested dictionaries and lists.
+
+    Parameters:
+        data (Union[dict, list]): Data to be cleaned.
+
+    Returns:
+        Union[dict, list]: Cleaned data.
+    """
+    if isinstance(data, dict):
+        return {
+            key: clean_response(value)
+            for key, value in data.items()
+            if value is not None and not (isinstance(value, list) and not value)
+        }
+    elif isinstance(data, list):
+        return [clean_response(item) for item in data]
+    else:
+        return data
+
+
+def extract_error_record(record: Any, error_keys: List[str]) -> Dict[str, Any]:
+    """
+    Reduces a service record to its error keys.
+
+    Only the keys in error_keys are kept, and from the dictionaries under them
+    only their "error" entry, which holds the messages. Missing, None and
+    empty values are dropped, so a record without errors becomes {}.
+
+    Parameters:
+        record (Any): The record returned by the service for one person ID.
+        error_keys (List[str]): Keys that may hold errors.
+
+    Returns:
+        Dict[str, Any]: The error keys of the record, in the same shape as in the
+        cleaned record (e.g. {"errorConstancia": {"error": [...]}}).
+    """
+    errors: Dict[str, Any] = {}
+    if not isinstance(record, dict):
+        return errors
+    for key in error_keys:
+        value = record.get(key)
+        if isinstance(value, dict):
+            value = value.get("error")
+            if value is not None and value != []:
+                errors[key] = {"error": clean_response(value)}
+        elif value is not None and value != []:
+            errors[key] = clean_response(value)
+    return errors
+
+
+def decode_response(
+    items: Iterable[Dict[str, Any]], error_keys: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Decodes the "data" list of a service response into a dictionary keyed by
+    person ID, in a single pass over the items.
+
+    Parameters:
+        items (Iterable[Dict[str, Any]]): The response items, each one a dict
+            {person_id: record}.
+        error_keys (List[str]): If given, each record is reduced to these keys
+            with extract_error_record; if None, the full record is cleaned with
+            clean_response (slower, for debugging).
+
+    Returns:
+        Dict[str, Any]: The decoded records keyed by person ID.
+    """
+    records: Dict[str, Any] = {}
+    for item in items:
+        for person_id, record in item.items():
+            # Like clean_response, drop the IDs that came back empty
+            if record is None or record == []:
+                continue
+            if error_keys is None:
+                records[person_id] = clean_response(record)
+            else:
+                records[person_id] = extract_error_record(record, error_keys)
+    return records
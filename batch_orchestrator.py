@@ -0,0 +1,502 @@
+"""
+Modo lote: procesa todos los pares de libros IVA de un árbol de carpetas en una
+sola invocación.
+
+Busca archivos `ventas_cbte_YYYYMM.txt` / `ventas_alicuota_YYYYMM.txt` (y sus
+equivalentes de compras) bajo una carpeta raíz; cada subcarpeta es un cliente.
+Todos los pares comparten un único cliente AFIP (un solo token, un solo
+limitador y control adaptativo) y una única caché de respuestas. Por defecto el
+lote se procesa en dos fases: se parsean todos los libros en un pool de
+procesos, la unión de sus documentos se consulta en AFIP una sola vez y el
+resultado se vuelca a cada par en un pool de hilos, de modo que un CUIT
+presente en los libros de varios clientes se consulta una vez. Al terminar se
+escribe un resumen consolidado en JSON.
+
+Uso (desde la raíz del proyecto):
+    python batch_orchestrator.py <carpeta_libros> <carpeta_salida> [--workers N]
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from itertools import repeat
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from afip_client.checkpoint import CheckpointJournal
+from afip_client.error_detector import create_afip_service, read_cache_ttls
+from afip_client.response_cache import ResponseCache
+from core.error_document_mapper import lookup_plan_documents
+from core.exceptions import ProcessingError
+from logger import logger
+from orchestrator import (
+    CHECKPOINT_SUFFIX,
+    PreparedComparison,
+    finish_book_comparison,
+    prepare_book_comparison,
+    run_book_comparison,
+    run_book_comparison_incremental,
+    run_book_comparison_streaming,
+)
+
+DEFAULT_BATCH_WORKERS = 4
+ENGINES = ("python", "numpy", "parallel", "streaming", "incremental")
+# Nombre del checkpoint de la consulta global, en la carpeta de salida del lote
+BATCH_CHECKPOINT_NAME = "batch"
+
+# ventas_cbte_202401.txt, compras_alicuota_202401.txt, ...
+BOOK_FILE_PATTERN = re.compile(
+    r"^(ventas|compras)_(cbte|alicuota)_(\d{6})\.txt$", re.IGNORECASE
+)
+
+
+class BookPair(NamedTuple):
+    """Par de libros (comprobantes y alícuotas) de un cliente y período."""
+
+    client: str
+    period: str
+    book: str
+    cbte_path: str
+    alicuota_path: str
+
+    @property
+    def cbte_key(self) -> str:
+        return f"libro_iva_digital_{self.book}_cbte"
+
+    @property
+    def alicuota_key(self) -> str:
+        return f"libro_iva_digital_{self.book}_alicuota"
+
+
+def discover_book_pairs(root_dir: str) -> Tuple[List[BookPair], List[str]]:
+    """
+    Recorre root_dir y agrupa los libros por carpeta, libro (ventas/compras) y
+    período.
+
+    Args:
+        root_dir: Carpeta raíz; el cliente de cada par es la ruta relativa de su
+            carpeta ("." para los archivos de la raíz).
+
+    Returns:
+        Tupla (pares completos ordenados por cliente, período y libro; archivos
+        que no tienen su contraparte)
+    """
+    groups: Dict[Tuple[str, str, str], Dict[str, str]] = {}
+    for dir_path, dir_names, file_names in os.walk(root_dir):
+        dir_names.sort()
+        client = os.path.relpath(dir_path, root_dir).replace(os.sep, "/")
+        for file_name in sorted(file_names):
+            match = BOOK_FILE_PATTERN.match(file_name)
+            if not match:
+                continue
+            book, part, period = match.groups()
+            group = groups.setdefault((client, period, book.lower()), {})
+            group[part.lower()] = os.path.join(dir_path, file_name)
+
+    pairs: List[BookPair] = []
+    unpaired: List[str] = []
+    for (client, period, book), files in sorted(groups.items()):
+        if "cbte" in files and "alicuota" in files:
+            pairs.append(
+                BookPair(client, period, book, files["cbte"], files["alicuota"])
+            )
+        else:
+            unpaired.extend(files.values())
+
+    logger.info(
+        f"Lote en {root_dir}: {len(pairs)} pares de libros, "
+        f"{len(unpaired)} archivos sin contraparte"
+    )
+    for path in unpaired:
+        logger.warning(f"Archivo sin contraparte, se omite: {path}")
+    return pairs, unpaired
+
+
+def _pair_output_folder(output_root: str, pair: BookPair) -> str:
+    """
+    Carpeta de salida del par: <salida>/<cliente>/<libro>_<período>, para que los
+    reportes de ventas y compras de un mismo cliente no se pisen.
+    """
+    return os.path.normpath(
+        os.path.join(output_root, pair.client, f"{pair.book}_{pair.period}")
+    )
+
+
+def _read_pair_report(output_folder: str) -> Dict[str, Any]:
+    """
+    Lee el reporte final más reciente de la carpeta del par y devuelve sus
+    totales.
+    """
+    reports = glob.glob(os.path.join(output_folder, "final_report_*.json"))
+    if not reports:
+        return {}
+    report_path = max(reports, key=os.path.getmtime)
+    with open(report_path, encoding="utf-8") as f:
+        report = json.load(f)
+    return {
+        "report": report_path.replace(os.sep, "/"),
+        "differences": report.get("differences", {}).get("total", 0),
+        "orphans": {
+            book_key: orphans["total"]
+            for book_key, orphans in report.get("orphans", {}).items()
+        },
+        "unverified_documents": report.get("unverified_documents", {}).get("total", 0),
+        "complete": report.get("complete", True),
+    }
+
+
+def _new_entry(pair: BookPair, output_folder: str) -> Dict[str, Any]:
+    """Entrada del resumen para un par, antes de procesarlo."""
+    return {
+        "client": pair.client,
+        "period": pair.period,
+        "book": pair.book,
+        "cbte_file": pair.cbte_path.replace(os.sep, "/"),
+        "alicuota_file": pair.alicuota_path.replace(os.sep, "/"),
+        "output_folder": output_folder.replace(os.sep, "/"),
+        "status": "ok",
+        "elapsed_seconds": 0.0,
+    }
+
+
+def _run_pair_step(entry: Dict[str, Any], step: Callable, *args, **kwargs) -> Any:
+    """
+    Ejecuta una etapa del procesamiento de un par y suma su duración a la
+    entrada. Los errores se registran en la entrada sin interrumpir el resto
+    del lote; en ese caso devuelve None.
+    """
+    start = time.perf_counter()
+    try:
+        return step(*args, **kwargs)
+    except ProcessingError as e:
+        entry["status"] = "error"
+        entry["error"] = e.message
+    except Exception as e:
+        logger.exception(f"Error inesperado en {entry['cbte_file']}")
+        entry["status"] = "error"
+        entry["error"] = str(e)
+    finally:
+        entry["elapsed_seconds"] = round(
+            entry["elapsed_seconds"] + time.perf_counter() - start, 3
+        )
+    return None
+
+
+def _process_pair(
+    pair: BookPair, output_root: str, engine: str, service
+) -> Dict[str, Any]:
+    """
+    Procesa un par de libros con su propia consulta AFIP y devuelve su entrada
+    del resumen.
+    """
+    output_folder = _pair_output_folder(output_root, pair)
+    entry = _new_entry(pair, output_folder)
+    if engine == "streaming":
+        compare, options = run_book_comparison_streaming, {}
+    elif engine == "incremental":
+        compare = run_book_comparison_incremental
+        options = {"client": pair.client, "period": pair.period}
+    else:
+        compare, options = run_book_comparison, {"engine": engine}
+    _run_pair_step(
+        entry,
+        compare,
+        pair.cbte_path,
+        pair.cbte_key,
+        pair.alicuota_path,
+        pair.alicuota_key,
+        output_folder,
+        service=service,
+        **options,
+    )
+    if entry["status"] == "ok":
+        entry.update(_read_pair_report(output_folder))
+    return entry
+
+
+def _lookup_batch_documents(
+    prepared: List[PreparedComparison], output_root: str, service
+) -> Tuple[Set[int], Set[int], Dict[str, int]]:
+    """
+    Consulta una sola vez en AFIP la unión de los documentos de todos los pares
+    preparados, con un checkpoint propio del lote en la carpeta de salida.
+
+    Returns:
+        Tupla (documentos con errores, documentos sin verificar, estadísticas
+        de la consulta para el resumen)
+    """
+    plans = [comparison.plan for comparison in prepared]
+    with CheckpointJournal(
+        os.path.join(output_root, BATCH_CHECKPOINT_NAME + CHECKPOINT_SUFFIX),
+        **read_cache_ttls(),
+    ) as journal:
+        error_docs, unverified_docs = lookup_plan_documents(plans, service, journal)
+        if unverified_docs:
+            logger.warning(
+                f"{len(unverified_docs)} documentos sin verificar en AFIP; el "
+                f"checkpoint {journal.path} se conserva para retomar el lote."
+            )
+        else:
+            journal.discard()
+
+    stats = {
+        "planned_documents": sum(len(plan.lines_by_document) for plan in plans),
+        "distinct_documents": len(
+            set().union(*(plan.lines_by_document for plan in plans))
+        ),
+        "error_documents": len(error_docs),
+        "unverified_documents": len(unverified_docs),
+    }
+    return error_docs, unverified_docs, stats
+
+
+def _prepare_pair(
+    entry: Dict[str, Any], pair: BookPair, output_folder: str, engine: str
+) -> Tuple[Dict[str, Any], Optional[PreparedComparison]]:
+    """
+    Primera fase de un par (parseo, totales y plan de consultas). Se ejecuta en
+    otro proceso, por lo que devuelve también la entrada del resumen
+    actualizada.
+
+    Returns:
+        Tupla (entrada del resumen, comparación preparada o None si falló)
+    """
+    comparison = _run_pair_step(
+        entry,
+        prepare_book_comparison,
+        pair.cbte_path,
+        pair.cbte_key,
+        pair.alicuota_path,
+        pair.alicuota_key,
+        output_folder,
+        engine=engine,
+    )
+    return entry, comparison
+
+
+def _prepare_executor(engine: str, workers: int) -> Executor:
+    """
+    Pool de la fase de preparación. El parseo es CPU-bound y en hilos quedaría
+    serializado por el GIL, así que los pares se preparan en hasta un proceso
+    por CPU. Con el motor "parallel" cada par ya reparte su parseo entre
+    procesos, y con un único proceso no hay nada que repartir: en esos casos se
+    usan hilos, sin el costo de enviar los resultados entre procesos.
+    """
+    processes = min(max(1, workers), os.cpu_count() or 1)
+    if engine == "parallel" or processes == 1:
+        return ThreadPoolExecutor(max_workers=max(1, workers))
+    return ProcessPoolExecutor(max_workers=processes)
+
+
+def _run_two_phase(
+    pairs: List[BookPair], output_root: str, engine: str, workers: int, service
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Procesa los pares en dos fases: todos se preparan (parseo, totales y plan
+    de consultas) en un pool de procesos, los documentos de todos se consultan
+    juntos y el resultado se vuelca a cada par en un pool de hilos.
+    """
+    output_folders = [_pair_output_folder(output_root, pair) for pair in pairs]
+    entries = [
+        _new_entry(pair, output_folder)
+        for pair, output_folder in zip(pairs, output_folders)
+    ]
+
+    with _prepare_executor(engine, workers) as executor:
+        results = list(
+            executor.map(_prepare_pair, entries, pairs, output_folders, repeat(engine))
+        )
+    entries = [entry for entry, _ in results]
+    ready = [
+        (entry, comparison) for entry, comparison in results if comparison is not None
+    ]
+
+    error_docs, unverified_docs, stats = _lookup_batch_documents(
+        [comparison for _, comparison in ready], output_root, service
+    )
+
+    # Volcar el resultado y escribir cada libro es sobre todo E/S
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        list(
+            executor.map(
+                lambda item: _run_pair_step(
+                    item[0],
+                    finish_book_comparison,
+                    item[1],
+                    error_docs,
+                    unverified_docs,
+                ),
+                ready,
+            )
+        )
+
+    for entry, output_folder in zip(entries, output_folders):
+        if entry["status"] == "ok":
+            entry.update(_read_pair_report(output_folder))
+    return entries, stats
+
+
+def _create_shared_service():
+    """
+    Crea el cliente AFIP compartido por todo el lote. Si la caché persistente
+    está deshabilitada, usa una caché en memoria para que los CUIT repetidos
+    entre clientes se consulten una sola vez durante la corrida.
+    """
+    try:
+        service = create_afip_service()
+    except Exception as e:
+        logger.error(f"No se pudo crear el cliente AFIP compartido: {e}")
+        return None
+    if service.cache is None:
+        service.cache = ResponseCache(":memory:")
+    return service
+
+
+def write_batch_summary(
+    entries: List[Dict[str, Any]],
+    unpaired: List[str],
+    output_root: str,
+    service=None,
+    lookup_stats: Optional[Dict[str, int]] = None,
+) -> str:
+    """
+    Escribe el resumen consolidado del lote en
+    <salida>/batch_summary_YYYY-MM-DD_HHMMSS.json.
+
+    Returns:
+        Ruta al archivo JSON generado
+    """
+    failed = [entry for entry in entries if entry["status"] != "ok"]
+    summary: Dict[str, Any] = {
+        "query_date": datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+        "total_pairs": len(entries),
+        "succeeded": len(entries) - len(failed),
+        "failed": len(failed),
+        "incomplete": sum(1 for entry in entries if entry.get("complete") is False),
+        "differences": sum(entry.get("differences", 0) for entry in entries),
+        "unverified_documents": sum(
+            entry.get("unverified_documents", 0) for entry in entries
+        ),
+        "unpaired_files": [path.replace(os.sep, "/") for path in unpaired],
+        "pairs": entries,
+    }
+    if lookup_stats is not None:
+        summary["afip_lookup"] = lookup_stats
+    if service is not None and service.cache is not None:
+        summary["afip_cache"] = {
+            "hits": service.cache.hits,
+            "misses": service.cache.misses,
+        }
+
+    os.makedirs(output_root, exist_ok=True)
+    filename = f"batch_summary_{datetime.now().strftime('%Y-%m-%d_%H%M%S')}.json"
+    file_path = os.path.join(output_root, filename)
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    logger.info(
+        f"Lote terminado: {summary['succeeded']} pares correctos, "
+        f"{summary['failed']} con error, {summary['incomplete']} incompletos. "
+        f"Resumen en {file_path}"
+    )
+    return file_path
+
+
+def run_batch(
+    root_dir: str,
+    output_root: str,
+    workers: int = DEFAULT_BATCH_WORKERS,
+    engine: str = "python",
+    global_lookup: bool = True,
+) -> str:
+    """
+    Procesa todos los pares de libros encontrados bajo root_dir.
+
+    Con global_lookup (por defecto) los documentos de todos los pares se
+    consultan en AFIP en una única consulta deduplicada, entre el parseo y la
+    escritura de cada par; si no, cada par consulta los suyos (con la caché
+    compartida).
+
+    Args:
+        root_dir: Carpeta con los libros, una subcarpeta por cliente.
+        output_root: Carpeta de salida; se replica la estructura de clientes.
+        workers: Cantidad de pares procesados a la vez. En dos fases, los
+            pares se parsean en ese número de procesos, sin superar la
+            cantidad de CPU (hilos con el motor "parallel", que ya parsea cada
+            libro en procesos). Con la consulta
+            por par los pares corren en hilos que comparten el cliente AFIP:
+            se superponen las consultas y la E/S, pero el parseo queda limitado
+            por el GIL.
+        engine: Motor de run_book_comparison ("python", "numpy", "parallel"),
+            "streaming" (sort-merge join en bloques) o "incremental" (sólo se
+            revalidan las líneas que cambiaron desde la corrida anterior del
+            mismo cliente y período).
+        global_lookup: Si es True, procesa el lote en dos fases con una sola
+            consulta AFIP. No se aplica al motor "incremental", que consulta
+            por par sólo los documentos sin resultado previo.
+
+    Returns:
+        Ruta al resumen consolidado
+    """
+    if engine not in ENGINES:
+        raise ProcessingError(f"Motor desconocido: {engine}")
+    pairs, unpaired = discover_book_pairs(root_dir)
+
+    service = _create_shared_service()
+    try:
+        lookup_stats = None
+        if global_lookup and engine != "incremental":
+            entries, lookup_stats = _run_two_phase(
+                pairs, output_root, engine, workers, service
+            )
+        else:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+                entries = list(
+                    executor.map(
+                        lambda pair: _process_pair(pair, output_root, engine, service),
+                        pairs,
+                    )
+                )
+        return write_batch_summary(
+            entries, unpaired, output_root, service, lookup_stats
+        )
+    finally:
+        if service is not None and service.cache is not None:
+            service.cache.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Procesa en lote los libros IVA de una carpeta de clientes."
+    )
+    parser.add_argument("root_dir", help="Carpeta con los libros de los clientes")
+    parser.add_argument("output_root", help="Carpeta de salida")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_BATCH_WORKERS,
+        help="Pares procesados a la vez",
+    )
+    parser.add_argument("--engine", choices=ENGINES, default="python")
+    parser.add_argument(
+        "--per-book-lookup",
+        action="store_true",
+        help="Consultar AFIP por par en lugar de una única consulta global",
+    )
+    args = parser.parse_args(argv)
+    print(
+        run_batch(
+            args.root_dir,
+            args.output_root,
+            args.workers,
+            args.engine,
+            not args.per_book_lookup,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+"""
+Servidor local que imita la API de AFIP, para medir el cliente (`AFIPService`)
+sin red y en forma reproducible.
+
+Implementa `/token`, `/inscription`, `/padron` y `/{servicio}/health` con las
+mismas formas JSON que espera el cliente: `{"access_token": ...}` y
+`{"data": [{id: registro}, ...]}`, con los errores en `errorConstancia`,
+`errorMonotributo` y `errorRegimenGeneral`. Son configurables la latencia, la
+tasa de errores 5xx, el vencimiento del token (401) y un límite de solicitudes
+(429 con Retry-After).
+
+Modos:
+  * synthetic (por defecto): registros generados en forma determinística a
+    partir del ID. Las CUIT con dígito verificador inválido y una fracción
+    configurable de las válidas devuelven "No existe persona con ese Id"; otra
+    fracción, "La clave se encuentra inactiva".
+  * record: reenvía cada solicitud al servidor real (--upstream) y graba los
+    registros recibidos en --fixtures ({servicio}.jsonl).
+  * replay: responde con los registros grabados; los IDs desconocidos se
+    informan como inexistentes.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.afip_stub_server --port 8765 --latency 0.05 --error-rate 0.02
+    python -m benchmarks.afip_stub_server --mode record --upstream https://... --fixtures fixtures/
+    python -m benchmarks.afip_stub_server --mode replay --fixtures fixtures/
+
+Luego, en el .env: AFIP_BASE_URL=http://127.0.0.1:8765
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+import requests
+
+from afip_client.error_utils import NOT_FOUND_ERROR_MSG
+from afip_client.rate_limiter import TokenBucket
+from core.cuit_validator import is_valid_cuit
+
+SERVICES = ("inscription", "padron")
+INACTIVE_ERROR_MSG = "La clave se encuentra inactiva"
+
+
+class StubConfig:
+    """
+    Parámetros del servidor de prueba.
+    """
+
+    def __init__(
+        self,
+        mode: str = "synthetic",
+        latency: float = 0.0,
+        latency_per_id: float = 0.0,
+        error_rate: float = 0.0,
+        token_ttl: float = 0.0,
+        rate_limit: int = 0,
+        rate_period: float = 1.0,
+        not_found_rate: float = 0.05,
+        inactive_rate: float = 0.02,
+        seed: int = 42,
+        upstream: Optional[str] = None,
+        fixtures: Optional[str] = None,
+    ) -> None:
+        """
+        Args:
+            mode: "synthetic", "record" o "replay"
+            latency: Segundos fijos por solicitud de datos
+            latency_per_id: Segundos adicionales por ID consultado
+            error_rate: Fracción de solicitudes que responden 500
+            token_ttl: Segundos de validez del token (0 = no vence)
+            rate_limit: Máximo de solicitudes de datos por período (0 = sin límite)
+            rate_period: Duración del período del límite, en segundos
+            not_found_rate: Fracción de CUIT válidas que se informan inexistentes
+            inactive_rate: Fracción de CUIT válidas que se informan inactivas
+            seed: Semilla de los errores simulados
+            upstream: URL del servidor real (modo record)
+            fixtures: Carpeta de los registros grabados (modos record y replay)
+        """
+        self.mode = mode
+        self.latency = latency
+        self.latency_per_id = latency_per_id
+        self.error_rate = error_rate
+        self.token_ttl = token_ttl
+        self.rate_limit = rate_limit
+        self.rate_period = rate_period
+        self.not_found_rate = not_found_rate
+        self.inactive_rate = inactive_rate
+        self.seed = seed
+        self.upstream = upstream
+        self.fixtures = fixtures
+
+
+def _fraction(person_id: str, salt: str) -> float:
+    """Valor pseudoaleatorio estable en [0, 1) para un ID."""
+    return zlib.crc32(f"{salt}:{person_id}".encode()) % 10000 / 10000
+
+
+def synthetic_record(service: str, person_id: str, config: StubConfig) -> dict:
+    """
+    Genera el registro de un ID, con la forma de la respuesta real.
+    """
+    try:
+        valid = is_valid_cuit(int(person_id))
+    except ValueError:
+        valid = False
+    if not valid or _fraction(person_id, "not_found") < config.not_found_rate:
+        return {
+            "errorConstancia": {"error": [NOT_FOUND_ERROR_MSG], "idPersona": person_id},
+            "datosGenerales": None,
+        }
+
+    record = {
+        "datosGenerales": {
+            "idPersona": int(person_id),
+            "tipoPersona": "JURIDICA" if person_id.startswith("3") else "FISICA",
+            "estadoClave": "ACTIVO",
+            "domicilioFiscal": {
+                "direccion": "CALLE FALSA 123",
+                "codPostal": "1000",
+                "datoAdicional": None,
+            },
+            "caracterizacion": [],
+        },
+        "errorConstancia": None,
+        "errorMonotributo": None,
+        "errorRegimenGeneral": None,
+    }
+    if service == "padron":
+        record["datosRegimenGeneral"] = {
+            "impuesto": [{"idImpuesto": 30, "descripcionImpuesto": "IVA"}],
+            "regimen": [],
+        }
+    if _fraction(person_id, "inactive") < config.inactive_rate:
+        record["datosGenerales"]["estadoClave"] = "INACTIVO"
+        record["errorConstancia"] = {"error": [INACTIVE_ERROR_MSG]}
+    return record
+
+
+class FixtureStore:
+    """
+    Registros grabados por servicio e ID, en archivos {servicio}.jsonl.
+    """
+
+    def __init__(self, folder: str) -> None:
+        self.folder = folder
+        self.records: Dict[str, Dict[str, Any]] = {service: {} for service in SERVICES}
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+        for service in SERVICES:
+            path = self._path(service)
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as fixture_file:
+                    for line in fixture_file:
+                        entry = json.loads(line)
+                        self.records[service][entry["person_id"]] = entry["record"]
+
+    def _path(self, service: str) -> str:
+        return os.path.join(self.folder, f"{service}.jsonl")
+
+    def save(self, service: str, items: List[Dict[str, Any]]) -> None:
+        with self._lock, open(self._path(service), "a", encoding="utf-8") as f:
+            for item in items:
+                for person_id, record in item.items():
+                    self.records[service][person_id] = record
+                    f.write(
+                        json.dumps(
+                            {"person_id": person_id, "record": record},
+                            ensure_ascii=False,
+                        )
+                        + "\n"
+                    )
+
+    def get(self, service: str, person_id: str) -> dict:
+        record = self.records[service].get(person_id)
+        if record is None:
+            return {"errorConstancia": {"error": [NOT_FOUND_ERROR_MSG]}}
+        return record
+
+
+class StubAFIPServer(ThreadingHTTPServer):
+    """
+    Servidor HTTP de prueba. Lleva la cuenta de las solicitudes por ruta y
+    código de respuesta en `stats`.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, config: StubConfig, host: str = "127.0.0.1", port: int = 0):
+        if config.mode != "synthetic" and not config.fixtures:
+            raise ValueError(f"El modo {config.mode} requiere --fixtures")
+        if config.mode == "record" and not config.upstream:
+            raise ValueError("El modo record requiere --upstream")
+        super().__init__((host, port), _StubHandler)
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.tokens: Dict[str, float] = {}
+        self.stats: Dict[str, int] = {}
+        self.rate_limiter = (
+            TokenBucket(config.rate_limit, config.rate_period)
+            if config.rate_limit > 0
+            else None
+        )
+        self.fixtures = FixtureStore(config.fixtures) if config.fixtures else None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, path: str, status: int) -> None:
+        with self._lock:
+            key = f"{path} {status}"
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def issue_token(self) -> str:
+        token = uuid.uuid4().hex
+        with self._lock:
+            self.tokens[token] = time.monotonic()
+        return token
+
+    def token_is_valid(self, token: str) -> bool:
+        with self._lock:
+            issued_at = self.tokens.get(token)
+        if issued_at is None:
+            return False
+        ttl = self.config.token_ttl
+        return ttl <= 0 or time.monotonic() - issued_at < ttl
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self.random.random() < self.config.error_rate
+
+    def start(self) -> str:
+        """Atiende solicitudes en un hilo en segundo plano; devuelve la URL base."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self) -> None:
+        """Detiene el servidor iniciado con start()."""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server: StubAFIPServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Sin una línea por solicitud en la consola
+        pass
+
+    def _send_json(self, status: int, body: Any, headers: Optional[dict] = None):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+        self.server.count(self.path, status)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _bearer_token(self) -> str:
+        authorization = self.headers.get("Authorization", "")
+        return authorization[len("Bearer ") :] if authorization else ""
+
+    def _proxy(self, method: str, body: bytes) -> Optional[Any]:
+        """Reenvía la solicitud al servidor real (modo record)."""
+        headers = {
+            name: value
+            for name, value in self.headers.items()
+            if name.lower() in ("authorization", "content-type")
+        }
+        response = requests.request(
+            method,
+            self.server.config.upstream.rstrip("/") + self.path,
+            data=body,
+            headers=headers,
+            timeout=60,
+        )
+        try:
+            content = response.json()
+        except ValueError:
+            content = {"detail": response.text}
+        self._send_json(response.status_code, content)
+        return content if response.ok else None
+
+    def do_POST(self) -> None:
+        body = self._read_body()
+        config = self.server.config
+        if self.path == "/token":
+            if config.mode == "record":
+                self._proxy("POST", body)
+                return
+            form = parse_qs(body.decode("utf-8"))
+            if not form.get("username") or not form.get("password"):
+                self._send_json(400, {"detail": "Faltan credenciales"})
+                return
+            self._send_json(
+                200,
+                {"access_token": self.server.issue_token(), "token_type": "bearer"},
+            )
+            return
+
+        service = self.path.strip("/")
+        if service not in SERVICES:
+            self._send_json(404, {"detail": "Not Found"})
+            return
+
+        if config.mode == "record":
+            content = self._proxy("POST", body)
+            if content is not None:
+                self.server.fixtures.save(service, content.get("data", []))
+            return
+
+        if not self.server.token_is_valid(self._bearer_token()):
+            self._send_json(401, {"detail": "Token expirado o inválido"})
+            return
+        if self.server.rate_limiter is not None:
+            wait = self.server.rate_limiter.try_acquire()
+            if wait > 0:
+                self._send_json(
+                    429,
+                    {"detail": "Demasiadas solicitudes"},
+                    {"Retry-After": str(max(1, math.ceil(wait)))},
+                )
+                return
+
+        person_ids = [
+            str(pid) for pid in json.loads(body or b"{}").get("persona_ids", [])
+        ]
+        time.sleep(config.latency + config.latency_per_id * len(person_ids))
+        if self.server.should_fail():
+            self._send_json(500, {"detail": "Error interno simulado"})
+            return
+
+        if config.mode == "replay":
+            data = [{pid: self.server.fixtures.get(service, pid)} for pid in person_ids]
+        else:
+            data = [{pid: synthetic_record(service, pid, config)} for pid in person_ids]
+        self._send_json(200, {"data": data})
+
+    def do_GET(self) -> None:
+        parts = self.path.strip("/").split("/")
+        if len(parts) == 2 and parts[0] in SERVICES and parts[1] == "health":
+            if self.server.config.mode == "record":
+                self._proxy("GET", b"")
+                return
+            self._send_json(200, {"status": "ok", "service": parts[0]})
+            return
+        self._send_json(404, {"detail": "Not Found"})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor AFIP de prueba")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--mode", choices=("synthetic", "record", "replay"), default="synthetic"
+    )
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-per-id", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--token-ttl", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=0)
+    parser.add_argument("--rate-period", type=float, default=1.0)
+    parser.add_argument("--not-found-rate", type=float, default=0.05)
+    parser.add_argument("--inactive-rate", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--upstream")
+    parser.add_argument("--fixtures")
+    args = parser.parse_args()
+
+    host, port = args.host, args.port
+    del args.host, args.port
+    config = StubConfig(**vars(args))
+    server = StubAFIPServer(config, host, port)
+    print(f"Servidor AFIP de prueba ({config.mode}) en {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Solicitudes atendidas: {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark de carga del cliente AFIP contra el servidor local de prueba
+(`benchmarks.afip_stub_server`), sin red.
+
+Mide el tiempo de `fetch_service_data_with_failures` sobre un lote de CUIT en
+varios escenarios: un solo worker contra varios en paralelo, un servidor con
+errores 5xx, límite de solicitudes y token que vence, y la caché en frío contra
+la caché ya cargada. Para cada escenario informa los IDs sin verificar y las
+respuestas del servidor por código.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_afip_client [cantidad_de_ids]
+"""
+
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+from afip_client.afip_service import AFIPService
+from afip_client.response_cache import ResponseCache
+from benchmarks.afip_stub_server import StubAFIPServer, StubConfig
+from core.cuit_validator import CUIT_WEIGHTS
+from logger import logger
+
+
+def build_cuits(count: int):
+    """
+    Genera `count` CUIT con dígito verificador válido.
+    """
+    rng = random.Random(42)
+    cuits = []
+    while len(cuits) < count:
+        base = f"{rng.choice((20, 23, 27, 30, 33))}{rng.randint(0, 10**8 - 1):08d}"
+        check = 11 - sum(int(d) * w for d, w in zip(base, CUIT_WEIGHTS)) % 11
+        if check == 10:
+            continue
+        cuits.append(int(base + str(0 if check == 11 else check)))
+    return cuits
+
+
+def run_scenario(name, config, person_ids, max_workers, cache=None):
+    server = StubAFIPServer(config)
+    base_url = server.start()
+    try:
+        service = AFIPService(
+            "usuario",
+            "clave",
+            base_url,
+            chunk_size=100,
+            max_calls=1000,
+            pause_duration=1,
+            max_retries=5,
+            retry_delay=1,
+            services_available=["inscription"],
+            cache=cache,
+            max_workers=max_workers,
+        )
+        start = time.perf_counter()
+        _, failed_ids = service.fetch_service_data_with_failures(
+            "inscription", person_ids
+        )
+        elapsed = time.perf_counter() - start
+    finally:
+        server.stop()
+    stats = ", ".join(f"{key}: {value}" for key, value in sorted(server.stats.items()))
+    print(f"{name:>28}: {elapsed:7.2f} s  ({len(failed_ids)} sin verificar)  [{stats}]")
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    person_ids = build_cuits(count)
+    logger.setLevel(logging.CRITICAL)
+    print(f"Consultando {count} CUIT contra el servidor de prueba...")
+
+    latency = {"latency": 0.05, "latency_per_id": 0.0005}
+    run_scenario("1 worker", StubConfig(**latency), person_ids, 1)
+    run_scenario("8 workers", StubConfig(**latency), person_ids, 8)
+    run_scenario(
+        "8 workers, 5xx + 429 + 401",
+        StubConfig(**latency, error_rate=0.05, rate_limit=10, token_ttl=2.0),
+        person_ids,
+        8,
+    )
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ResponseCache(os.path.join(temp_dir, "cache.sqlite3"))
+        run_scenario("caché en frío", StubConfig(**latency), person_ids, 8, cache)
+        run_scenario("caché cargada", StubConfig(**latency), person_ids, 8, cache)
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
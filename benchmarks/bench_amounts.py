@@ -0,0 +1,116 @@
+"""
+Benchmark del pipeline de importes: aritmética de punto flotante (implementación
+anterior, reproducida aquí como referencia) contra centavos enteros.
+
+Genera un libro sintético de ventas_cbte en memoria y mide, para cada línea, la
+extracción de los importes, la suma de los campos de total, la comparación contra
+el campo 9 y el formateo para escritura.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_amounts [cantidad_de_líneas]
+"""
+
+import math
+import random
+import sys
+import time
+
+from core.field_calculator import is_difference_significant
+from core.string_utils import format_numeric_string, pad_left
+from core.value_extractor import get_compiled_layout
+from models.book_utils import retrieve_keys_to_sum
+
+BOOK_KEY = "libro_iva_digital_ventas_cbte"
+TOTAL_FIELD = 9
+UNIQUE_LINES = 1000
+
+
+def build_synthetic_lines(count: int):
+    """
+    Construye `count` líneas de 266 caracteres a partir de un conjunto de líneas
+    distintas, con importes aleatorios en los campos a sumar. El campo 9 coincide
+    con la suma salvo en un 3% de las líneas.
+    """
+    rng = random.Random(42)
+    slices_by_field = {number: sl for number, sl, _ in get_compiled_layout(BOOK_KEY)}
+    pool = []
+    for _ in range(UNIQUE_LINES):
+        chars = ["0"] * 266
+        total = 0
+        for key in retrieve_keys_to_sum(BOOK_KEY):
+            value = rng.randint(0, 10**9)
+            total += value
+            chars[slices_by_field[key]] = list(str(value).zfill(15))
+        if rng.random() < 0.03:
+            total += rng.randint(101, 10**5)
+        chars[slices_by_field[TOTAL_FIELD]] = list(str(total).zfill(15))
+        pool.append("".join(chars))
+    return [pool[i % UNIQUE_LINES] for i in range(count)]
+
+
+def _legacy_format_field_value(value: str, decimal_index: int) -> str:
+    integer_part = value[:-decimal_index]
+    decimal_part = value[-decimal_index:]
+    return f"{int(integer_part)}.{decimal_part}"
+
+
+def _legacy_format_numeric_string(value: float, len_of_str: int) -> str:
+    decimals, integer = math.modf(value)
+    decimals = abs(round(decimals, 2))
+    str_value = f"{int(integer)}{str(decimals)[2:].ljust(2, '0')}"
+    return pad_left(str_value, len_of_str)
+
+
+def run_float_pipeline(lines, slices, total_slice):
+    differences = 0
+    for line in lines:
+        total = 0
+        for field_slice in slices:
+            total += float(_legacy_format_field_value(line[field_slice], 2))
+        total = round(total, 2)
+        original = float(_legacy_format_field_value(line[total_slice], 2))
+        if abs(total - original) > 1:
+            differences += 1
+            _legacy_format_numeric_string(total, 15)
+    return differences
+
+
+def run_cents_pipeline(lines, slices, total_slice):
+    differences = 0
+    for line in lines:
+        total = 0
+        for field_slice in slices:
+            total += int(line[field_slice])
+        original = int(line[total_slice])
+        if is_difference_significant(total, original):
+            differences += 1
+            format_numeric_string(total, 15)
+    return differences
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    slices_by_field = {number: sl for number, sl, _ in get_compiled_layout(BOOK_KEY)}
+    slices = [slices_by_field[key] for key in retrieve_keys_to_sum(BOOK_KEY)]
+    total_slice = slices_by_field[TOTAL_FIELD]
+
+    print(f"Generando libro sintético de {count} líneas...")
+    lines = build_synthetic_lines(count)
+
+    results = {}
+    for name, pipeline in (
+        ("float + round()", run_float_pipeline),
+        ("centavos enteros", run_cents_pipeline),
+    ):
+        start = time.perf_counter()
+        differences = pipeline(lines, slices, total_slice)
+        elapsed = time.perf_counter() - start
+        results[name] = elapsed
+        print(f"{name:>18}: {elapsed:7.2f} s  ({differences} diferencias)")
+
+    speedup = results["float + round()"] / results["centavos enteros"]
+    print(f"Aceleración: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Benchmark de la decodificación de respuestas de `inscription`: limpieza completa
+de cada registro + format_response + acumulación de errores (implementación
+anterior) contra el decodificador de una sola pasada que sólo extrae las claves
+de error.
+
+Usa una respuesta grabada (un JSON con la forma {"data": [...]}, tal como la
+devuelve el servicio); si no se indica una, genera y graba una respuesta
+sintética con la cantidad de registros pedida, con un 10% de CUIT inexistentes,
+un 2% de claves inactivas y otros errores de régimen.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_response_decoder [cantidad_de_registros] [respuesta.json]
+"""
+
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+from afip_client.afip_service import AFIPService
+from afip_client.error_utils import (
+    INSCRIPTION_ERROR_KEYS,
+    INVALID_DOCUMENT_ERROR_MSGS,
+    NOT_FOUND_ERROR_MSG,
+    find_invalid_ids,
+    find_keys_with_error_msgs,
+)
+from afip_client.response_decoder import decode_response
+from logger import logger
+
+
+def _valid_record(rng: random.Random, person_id: int) -> dict:
+    return {
+        "datosGenerales": {
+            "idPersona": person_id,
+            "tipoPersona": rng.choice(["FISICA", "JURIDICA"]),
+            "nombre": "NOMBRE",
+            "apellido": "APELLIDO",
+            "razonSocial": None,
+            "estadoClave": "ACTIVO",
+            "domicilioFiscal": {
+                "direccion": "CALLE FALSA 123",
+                "localidad": "CIUDAD",
+                "codPostal": "1000",
+                "idProvincia": rng.randint(0, 24),
+                "descripcionProvincia": "PROVINCIA",
+                "datoAdicional": None,
+                "tipoDatoAdicional": None,
+            },
+            "caracterizacion": [],
+        },
+        "datosRegimenGeneral": {
+            "actividad": [
+                {
+                    "idActividad": rng.randint(10000, 999999),
+                    "descripcionActividad": "ACTIVIDAD",
+                    "orden": order,
+                    "periodo": 201801,
+                    "nomenclador": 883,
+                }
+                for order in range(1, rng.randint(1, 4) + 1)
+            ],
+            "impuesto": [
+                {"idImpuesto": 30, "descripcionImpuesto": "IVA", "periodo": 201801}
+            ],
+            "regimen": [],
+        },
+        "datosMonotributo": None,
+        "errorConstancia": None,
+        "errorMonotributo": None,
+        "errorRegimenGeneral": None,
+        "metadata": {"fechaHora": "2024-01-01T00:00:00", "servidor": "srv1"},
+    }
+
+
+def build_recorded_response(count: int, path: str) -> None:
+    """
+    Graba en `path` una respuesta sintética de `count` registros.
+    """
+    rng = random.Random(42)
+    data = []
+    for index in range(count):
+        person_id = 20000000000 + index
+        draw = rng.random()
+        if draw < 0.10:
+            record = {
+                "errorConstancia": {
+                    "error": [NOT_FOUND_ERROR_MSG],
+                    "idPersona": person_id,
+                },
+                "datosGenerales": None,
+            }
+        else:
+            record = _valid_record(rng, person_id)
+            if draw < 0.12:
+                record["errorConstancia"] = {
+                    "error": ["La clave se encuentra inactiva"],
+                    "apellido": "APELLIDO",
+                }
+            elif draw < 0.20:
+                record["errorMonotributo"] = {
+                    "error": ["El contribuyente no esta adherido al monotributo"],
+                    "mensaje": None,
+                }
+        data.append({str(person_id): record})
+    with open(path, "w", encoding="utf-8") as response_file:
+        json.dump({"data": data}, response_file)
+
+
+def _legacy_clean_response_dict(data):
+    if isinstance(data, dict):
+        return {
+            key: _legacy_clean_response_dict(value)
+            for key, value in data.items()
+            if value not in [None, []]
+        }
+    elif isinstance(data, list):
+        return [_legacy_clean_response_dict(item) for item in data]
+    else:
+        return data
+
+
+def run_legacy_pipeline(response_data):
+    cleaned = [_legacy_clean_response_dict(item) for item in response_data]
+    records = AFIPService.format_response(cleaned)
+    data_with_error = AFIPService.accumulate_errors_in_data(
+        records, INSCRIPTION_ERROR_KEYS
+    )
+    return find_keys_with_error_msgs(data_with_error, INVALID_DOCUMENT_ERROR_MSGS)
+
+
+def run_decoder_pipeline(response_data):
+    records = decode_response(response_data, INSCRIPTION_ERROR_KEYS)
+    return find_invalid_ids(
+        records, INSCRIPTION_ERROR_KEYS, INVALID_DOCUMENT_ERROR_MSGS
+    )
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    path = sys.argv[2] if len(sys.argv) > 2 else None
+
+    # Los mensajes de debug por registro no son parte de lo que se mide
+    logger.setLevel(logging.INFO)
+
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), f"inscription_{count}.json")
+        if not os.path.exists(path):
+            print(f"Grabando respuesta sintética de {count} registros en {path}...")
+            build_recorded_response(count, path)
+
+    with open(path, encoding="utf-8") as response_file:
+        response_data = json.load(response_file)["data"]
+    print(f"Respuesta: {len(response_data)} registros ({path})")
+
+    # La igualdad de los resultados se verifica en tests/test_response_decoder.py
+    results = {}
+    for name, pipeline in (
+        ("limpieza completa", run_legacy_pipeline),
+        ("una sola pasada", run_decoder_pipeline),
+    ):
+        start = time.perf_counter()
+        invalid = pipeline(response_data)
+        elapsed = time.perf_counter() - start
+        results[name] = elapsed
+        print(f"{name:>18}: {elapsed:7.2f} s  ({len(invalid)} documentos inválidos)")
+
+    speedup = results["limpieza completa"] / results["una sola pasada"]
+    print(f"Aceleración: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
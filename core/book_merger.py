@@ -1,7 +1,12 @@
 from collections import OrderedDict
-from typing import Dict, List
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
 
+from core.exceptions import UnsortedBookError
 from logger import logger
+from models.book_utils import retrieve_join_key_fields
+
+JoinKey = Tuple[str, ...]
 
 
 def append_total_sums(
@@ -37,71 +42,236 @@ def append_total_sums(
             total_sum += book2_total
             logger.debug(f"Línea {key}: total de {book_2_key} = {book2_total}")
 
-        # Agregar el total sumado en el diccionario principal
-        rounded_total = round(total_sum, 2)
-        value["total_summed_amount"] = rounded_total
-        logger.debug(f"Línea {key}: total sumado = {rounded_total}")
+        # Agregar el total sumado (en centavos) en el diccionario principal
+        value["total_summed_amount"] = total_sum
+        logger.debug(f"Línea {key}: total sumado = {total_sum}")
 
     logger.info("Totales sumados calculados correctamente")
     return merged_dict
 
 
-def merge_books_by_line(
-    dict_list_1: List[Dict], dict_list_2: List[Dict], book_1_key: str, book_2_key: str
-) -> OrderedDict:
+def build_join_key(values: Iterable[Any]) -> JoinKey:
     """
-    Fusiona dos listas de diccionarios en un único diccionario ordenado por número de línea.
+    Normaliza los valores de los campos clave de un registro (tipo, punto de
+    venta, número...) para que coincidan entre libros: se quitan espacios y
+    ceros a la izquierda.
 
     Args:
-        dict_list_1: Primera lista de diccionarios
-        dict_list_2: Segunda lista de diccionarios
-        book_1_key: Clave para identificar la primera lista
-        book_2_key: Clave para identificar la segunda lista
+        values: Valores de los campos clave, en orden
 
     Returns:
-        Diccionario ordenado con los datos fusionados
+        Tupla normalizada usable como clave de un diccionario
     """
-    logger.info(f"Fusionando libros {book_1_key} y {book_2_key}")
-    merged_dict = OrderedDict()
+    return tuple(str(value).strip().lstrip("0") for value in values)
 
-    # Recorrer la primera lista de diccionarios
-    for item_1 in dict_list_1:
-        for key, value in item_1.items():
-            if key not in merged_dict:
-                merged_dict[key] = OrderedDict()
-            merged_dict[key][book_1_key] = value
-            logger.debug(f"Agregando línea {key} de {book_1_key}")
 
-    # Recorrer la segunda lista de diccionarios
+def join_sort_key(join_key: JoinKey) -> Tuple[Tuple[int, str], ...]:
+    """
+    Devuelve una clave de ordenamiento para una clave de comprobante.
+
+    Como los valores normalizados no tienen ceros a la izquierda, comparar
+    (longitud, valor) equivale a comparar numéricamente, que es el orden de los
+    archivos exportados por AFIP.
+    """
+    return tuple((len(value), value) for value in join_key)
+
+
+def aggregate_rows(rows: Iterable[Tuple[int, Dict]]) -> Dict[str, Any]:
+    """
+    Agrega en una sola entrada las líneas de alícuotas de un comprobante.
+    """
+    entry: Dict[str, Any] = {
+        "line_numbers": [],
+        "summed_amounts": {"referenced_fields": None, "total": 0},
+    }
+    for line, record in rows:
+        summed_amounts = record.get("summed_amounts", {})
+        entry["line_numbers"].append(int(line))
+        entry["summed_amounts"]["referenced_fields"] = summed_amounts.get(
+            "referenced_fields"
+        )
+        entry["summed_amounts"]["total"] += summed_amounts.get("total", 0)
+    return entry
+
+
+def iter_sorted_join(
+    records_1: Iterable[Tuple[int, Dict]],
+    records_2: Iterable[Tuple[int, Dict]],
+    book_1_key: str,
+    book_2_key: str,
+    orphans: Dict[str, List[int]],
+) -> Iterator[Tuple[str, OrderedDict]]:
+    """
+    Fusiona por comprobante dos libros ya ordenados por clave (sort-merge join).
+
+    Recorre ambos libros a la par, manteniendo en memoria sólo el comprobante
+    actual y su grupo de alícuotas, por lo que el consumo no depende del tamaño
+    de los archivos. Produce las mismas entradas que join_books_by_key.
+
+    Args:
+        records_1: Tuplas (número de línea, registro) del libro de comprobantes
+        records_2: Tuplas (número de línea, registro) del libro de alícuotas
+        book_1_key: Clave del libro de comprobantes
+        book_2_key: Clave del libro de alícuotas
+        orphans: Diccionario {clave de libro: [números de línea]} donde se
+            acumulan los registros sin contraparte
+
+    Yields:
+        Tuplas (número de línea del comprobante, entrada fusionada)
+
+    Raises:
+        UnsortedBookError: Si alguno de los libros no está ordenado por clave
+    """
+    logger.info(
+        f"Fusionando libros {book_1_key} y {book_2_key} por comprobante (sort-merge)"
+    )
+    key_fields_1 = retrieve_join_key_fields(book_1_key)
+    key_fields_2 = retrieve_join_key_fields(book_2_key)
+    orphans.setdefault(book_1_key, [])
+    orphans.setdefault(book_2_key, [])
+
+    def iter_groups() -> Iterator[Tuple[Tuple, Dict[str, Any]]]:
+        previous = None
+        grouped = groupby(
+            records_2,
+            key=lambda item: build_join_key(
+                item[1].get(field) for field in key_fields_2
+            ),
+        )
+        for join_key, rows in grouped:
+            sort_key = join_sort_key(join_key)
+            entry = aggregate_rows(rows)
+            # Un mismo comprobante en grupos no contiguos también indica desorden
+            if previous is not None and sort_key <= previous:
+                raise UnsortedBookError(
+                    f"El libro {book_2_key} no está ordenado por comprobante "
+                    f"(línea {entry['line_numbers'][0]})."
+                )
+            previous = sort_key
+            yield sort_key, entry
+
+    groups = iter_groups()
+    group = next(groups, None)
+    previous = None
+    for line, record in records_1:
+        sort_key = join_sort_key(
+            build_join_key(record.get(field) for field in key_fields_1)
+        )
+        if previous is not None and sort_key < previous:
+            raise UnsortedBookError(
+                f"El libro {book_1_key} no está ordenado por comprobante (línea {line})."
+            )
+        previous = sort_key
+
+        # Las alícuotas con clave menor no tienen comprobante
+        while group is not None and group[0] < sort_key:
+            orphans[book_2_key].extend(group[1]["line_numbers"])
+            group = next(groups, None)
+
+        entry = OrderedDict()
+        entry[book_1_key] = record
+        # Cada grupo se asigna una sola vez: un comprobante repetido queda huérfano
+        if group is not None and group[0] == sort_key:
+            entry[book_2_key] = group[1]
+            group = next(groups, None)
+        else:
+            orphans[book_1_key].append(int(line))
+            logger.debug(f"Línea {line} de {book_1_key} sin alícuotas")
+        yield str(line), entry
+
+    while group is not None:
+        orphans[book_2_key].extend(group[1]["line_numbers"])
+        group = next(groups, None)
+
+
+def join_books_by_key(
+    dict_list_1: List[Dict], dict_list_2: List[Dict], book_1_key: str, book_2_key: str
+) -> Tuple[OrderedDict, Dict[str, List[int]]]:
+    """
+    Fusiona el libro de comprobantes con el de alícuotas por clave de
+    comprobante (hash join), en lugar de por número de línea.
+
+    Un comprobante puede tener varias líneas de alícuotas (una por tasa): se
+    agregan en una sola entrada con la suma de sus totales y los números de
+    línea de origen. El resultado conserva las líneas del primer libro como
+    claves.
+
+    Args:
+        dict_list_1: Lista de diccionarios del libro de comprobantes
+        dict_list_2: Lista de diccionarios del libro de alícuotas
+        book_1_key: Clave del libro de comprobantes
+        book_2_key: Clave del libro de alícuotas
+
+    Returns:
+        Tupla (diccionario fusionado, huérfanos), donde huérfanos es
+        {clave de libro: [números de línea sin contraparte]}
+    """
+    logger.info(f"Fusionando libros {book_1_key} y {book_2_key} por comprobante")
+    key_fields_1 = retrieve_join_key_fields(book_1_key)
+    key_fields_2 = retrieve_join_key_fields(book_2_key)
+
+    # Agregar las alícuotas por comprobante
+    aggregated: Dict[JoinKey, Dict[str, Any]] = {}
     for item_2 in dict_list_2:
-        for key, value in item_2.items():
-            if key in merged_dict:
-                merged_dict[key][book_2_key] = value
-                logger.debug(f"Agregando línea {key} de {book_2_key} (existente)")
+        for line, record in item_2.items():
+            join_key = build_join_key(record.get(field) for field in key_fields_2)
+            summed_amounts = record.get("summed_amounts", {})
+            entry = aggregated.get(join_key)
+            if entry is None:
+                entry = aggregated[join_key] = {
+                    "line_numbers": [],
+                    "summed_amounts": {
+                        "referenced_fields": summed_amounts.get("referenced_fields"),
+                        "total": 0,
+                    },
+                }
+            entry["line_numbers"].append(int(line))
+            entry["summed_amounts"]["total"] += summed_amounts.get("total", 0)
+
+    # Recorrer los comprobantes tomando el grupo de alícuotas de cada uno
+    merged_dict = OrderedDict()
+    orphans: Dict[str, List[int]] = {book_1_key: [], book_2_key: []}
+    for item_1 in dict_list_1:
+        for line, record in item_1.items():
+            merged_dict[line] = OrderedDict()
+            merged_dict[line][book_1_key] = record
+            join_key = build_join_key(record.get(field) for field in key_fields_1)
+            # Cada grupo se asigna una sola vez: un comprobante repetido queda huérfano
+            entry = aggregated.pop(join_key, None)
+            if entry is None:
+                orphans[book_1_key].append(int(line))
+                logger.debug(f"Línea {line} de {book_1_key} sin alícuotas")
             else:
-                merged_dict[key] = OrderedDict()
-                merged_dict[key][book_2_key] = value
-                logger.debug(f"Agregando línea {key} de {book_2_key} (nueva)")
+                merged_dict[line][book_2_key] = entry
 
-    logger.info(f"Fusión completada. Total de líneas: {len(merged_dict)}")
-    return merged_dict
+    for entry in aggregated.values():
+        orphans[book_2_key].extend(entry["line_numbers"])
+    orphans[book_2_key].sort()
 
+    logger.info(f"Fusión completada. Total de comprobantes: {len(merged_dict)}")
+    for book_key, lines in orphans.items():
+        if lines:
+            logger.warning(f"Líneas de {book_key} sin contraparte: {len(lines)}")
+    return merged_dict, orphans
 
-def merge_and_summarize(
+
+def join_and_summarize(
     dict_list_1: List[Dict], dict_list_2: List[Dict], book_1_key: str, book_2_key: str
-) -> OrderedDict:
+) -> Tuple[OrderedDict, Dict[str, List[int]]]:
     """
-    Fusiona dos listas de diccionarios y añade los totales sumados.
+    Fusiona los libros por clave de comprobante y añade los totales sumados.
 
     Args:
-        dict_list_1: Primera lista de diccionarios
-        dict_list_2: Segunda lista de diccionarios
-        book_1_key: Clave para identificar la primera lista
-        book_2_key: Clave para identificar la segunda lista
+        dict_list_1: Lista de diccionarios del libro de comprobantes
+        dict_list_2: Lista de diccionarios del libro de alícuotas
+        book_1_key: Clave del libro de comprobantes
+        book_2_key: Clave del libro de alícuotas
 
     Returns:
-        Diccionario ordenado con los datos fusionados y totales calculados
+        Tupla (diccionario fusionado con totales, huérfanos por libro)
     """
-    merged_books = merge_books_by_line(dict_list_1, dict_list_2, book_1_key, book_2_key)
+    merged_books, orphans = join_books_by_key(
+        dict_list_1, dict_list_2, book_1_key, book_2_key
+    )
     merged_books = append_total_sums(merged_books, book_1_key, book_2_key)
-    return merged_books
+    return merged_books, orphans
@@ -1,71 +1,36 @@
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Tuple
 
+from core.book_reader import BookBuffer
+from core.book_record import BookRecord, get_record_schema
+from core.columnar_parser import columns_to_records, load_book_columns
 from core.exceptions import ProcessingError
-from core.field_calculator import calculate_field_totals
-from core.value_extractor import extract_and_format_fields
 from logger import logger
-from models.book_utils import (
-    retrieve_expected_length,
-    retrieve_field_structure,
-    retrieve_keys_to_sum,
-)
 
 
-def parse_book_file(file_name: str, name_of_book: str) -> List[Dict]:
+def parse_book_record(record: bytes, name_of_book: str) -> BookRecord:
     """
-    Procesa un archivo de libro IVA, extrayendo y calculando valores.
+    Extrae y calcula los valores de un registro (bytes crudos) de un libro IVA.
 
     Args:
-        file_name: Ruta al archivo a procesar
+        record: Bytes del registro, sin fin de línea
         name_of_book: Clave del tipo de libro
 
     Returns:
-        Lista de diccionarios con los datos procesados
+        BookRecord ({número de campo: valor} con los totales sumados), que
+        decodifica cada campo al accederlo
     """
-    logger.info(f"Procesando archivo {file_name} como {name_of_book}")
-    list_of_data = []
+    return BookRecord(get_record_schema(name_of_book), bytes(record))
+
+
+def _iter_buffer(buffer: BookBuffer) -> Iterator[Tuple[int, BookRecord]]:
+    """
+    Procesa los registros de un BookBuffer, convirtiendo errores inesperados en
+    ProcessingError.
+    """
+    schema = get_record_schema(buffer.name_of_book)
     try:
-        expected_length = retrieve_expected_length(name_of_book)
-        logger.debug(
-            f"Longitud esperada para {name_of_book}: {expected_length} caracteres"
-        )
-
-        with open(file_name, "r") as file:
-            for index, line in enumerate(file, start=1):
-                logger.debug(f"Procesando línea {index} (longitud: {len(line) - 1})")
-
-                # Verificar longitud de línea
-                if len(line) - 1 != expected_length:
-                    error_msg = (
-                        f"La longitud de la línea {index} no coincide con la longitud esperada para el libro {name_of_book}. "
-                        f"Longitud actual: {len(line)}, longitud esperada: {expected_length}"
-                    )
-                    logger.error(error_msg)
-                    raise ProcessingError(error_msg)
-
-                # Procesar línea
-                line = line.strip()
-                book_structure = retrieve_field_structure(name_of_book)
-                extracted_values = extract_and_format_fields(line, book_structure)
-
-                # Calcular totales
-                keys_to_sum = retrieve_keys_to_sum(name_of_book)
-                calculated_values = calculate_field_totals(
-                    extracted_values, keys_to_sum
-                )
-
-                # Guardar resultados
-                dict_of_line = {str(index): calculated_values}
-                list_of_data.append(dict_of_line)
-                logger.debug(f"Línea {index} procesada correctamente")
-
-        logger.info(f"Archivo procesado. Total de líneas: {len(list_of_data)}")
-        return list_of_data
-
-    except FileNotFoundError:
-        error_msg = f"No se encontró el archivo {file_name}."
-        logger.error(error_msg)
-        raise ProcessingError(error_msg)
+        for index, record in buffer.iter_records():
+            yield index, BookRecord(schema, record.tobytes())
     except ProcessingError as e:
         logger.error(f"Error de procesamiento: {e.message}")
         raise e
@@ -73,3 +38,59 @@ def parse_book_file(file_name: str, name_of_book: str) -> List[Dict]:
         error_msg = f"Ocurrió un error inesperado: {str(e)}"
         logger.exception(error_msg)
         raise ProcessingError(error_msg) from e
+
+
+def iter_book_file(
+    file_name: str, name_of_book: str, buffer: Optional[BookBuffer] = None
+) -> Iterator[Tuple[int, BookRecord]]:
+    """
+    Procesa un archivo de libro IVA de forma incremental, produciendo una línea
+    procesada por vez. El consumo de memoria no depende del tamaño del archivo.
+
+    Args:
+        file_name: Ruta al archivo a procesar
+        name_of_book: Clave del tipo de libro
+        buffer: BookBuffer ya abierto sobre el archivo, para compartirlo con la
+            escritura. Si es None, se mapea el archivo durante la iteración.
+
+    Yields:
+        Tuplas (número de línea, BookRecord con los datos procesados)
+    """
+    logger.info(f"Procesando archivo {file_name} como {name_of_book}")
+    if buffer is not None:
+        yield from _iter_buffer(buffer)
+        return
+    with BookBuffer(file_name, name_of_book) as buffer:
+        yield from _iter_buffer(buffer)
+
+
+def parse_book_file(
+    file_name: str,
+    name_of_book: str,
+    engine: str = "python",
+    buffer: Optional[BookBuffer] = None,
+) -> List[Dict]:
+    """
+    Procesa un archivo de libro IVA, extrayendo y calculando valores.
+
+    Args:
+        file_name: Ruta al archivo a procesar
+        name_of_book: Clave del tipo de libro
+        engine: "python" (línea a línea) o "numpy" (decodificación columnar de
+            importes y totales; requiere numpy)
+        buffer: BookBuffer ya abierto sobre el archivo (opcional)
+
+    Returns:
+        Lista de diccionarios {número de línea: BookRecord} con los datos procesados
+    """
+    if engine == "numpy":
+        return columns_to_records(load_book_columns(file_name, name_of_book, buffer))
+    if engine != "python":
+        raise ProcessingError(f"Motor de parseo desconocido: {engine}")
+
+    list_of_data = [
+        {str(index): calculated_values}
+        for index, calculated_values in iter_book_file(file_name, name_of_book, buffer)
+    ]
+    logger.info(f"Archivo procesado. Total de líneas: {len(list_of_data)}")
+    return list_of_data
@@ -0,0 +1,118 @@
+import mmap
+from typing import Iterator, Optional, Tuple
+
+from core.exceptions import ProcessingError
+from logger import logger
+from models.book_utils import retrieve_expected_length
+
+# Codificación de los archivos de libros IVA
+BOOK_ENCODING = "ISO-8859-1"
+
+
+class BookBuffer:
+    """
+    Archivo de libro IVA mapeado en memoria.
+
+    Expone los registros de ancho fijo como memoryviews sobre los bytes crudos del
+    archivo, sin decodificarlos. El mismo buffer puede usarse para parsear el libro
+    y para escribir el archivo corregido, evitando leer el archivo dos veces.
+
+    Uso:
+        with BookBuffer(file_name, name_of_book) as buffer:
+            for index, record in buffer.iter_records():
+                ...
+    """
+
+    def __init__(self, file_name: str, name_of_book: Optional[str]) -> None:
+        """
+        Args:
+            file_name: Ruta al archivo a mapear
+            name_of_book: Clave del tipo de libro. Si es None, la longitud de
+                registro se toma de la primera línea del archivo.
+        """
+        self.file_name = file_name
+        self.name_of_book = name_of_book
+
+        try:
+            self._file = open(file_name, "rb")
+        except FileNotFoundError:
+            error_msg = f"No se encontró el archivo {file_name}."
+            logger.error(error_msg)
+            raise ProcessingError(error_msg)
+
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.view = memoryview(self._mmap)
+        except ValueError:
+            # Archivo vacío: mmap no admite longitud 0
+            self._mmap = None
+            self.view = memoryview(b"")
+
+        if name_of_book is not None:
+            self.expected_length = retrieve_expected_length(name_of_book)
+        else:
+            first_newline = self._mmap.find(b"\n") if self._mmap is not None else -1
+            first_newline = len(self.view) if first_newline == -1 else first_newline
+            carriage_return = self.view[first_newline - 1 : first_newline] == b"\r"
+            self.expected_length = first_newline - carriage_return
+
+        # Detectar el fin de línea (LF o CRLF) a partir de la primera línea
+        terminator_span = self.view[self.expected_length : self.expected_length + 2]
+        self.terminator = b"\r\n" if terminator_span == b"\r\n" else b"\n"
+        self.stride = self.expected_length + len(self.terminator)
+
+    def __enter__(self) -> "BookBuffer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return -(-len(self.view) // self.stride)
+
+    def close(self) -> None:
+        """Libera el mapeo en memoria y cierra el archivo."""
+        try:
+            self.view.release()
+            if self._mmap is not None:
+                self._mmap.close()
+        except BufferError:
+            # Todavía hay memoryviews de registros en uso: el mapeo se libera
+            # cuando el recolector de basura los descarte
+            logger.debug(f"Mapeo de {self.file_name} liberado en diferido")
+        self._file.close()
+
+    def line_offset(self, index: int) -> int:
+        """Devuelve la posición en bytes del inicio de la línea `index` (1-based)."""
+        return (index - 1) * self.stride
+
+    def _raise_length_error(self, index: int, offset: int) -> None:
+        line_end = self._mmap.find(b"\n", offset) if self._mmap is not None else -1
+        line_end = len(self.view) if line_end == -1 else line_end
+        actual_length = len(self.view[offset:line_end].tobytes().rstrip(b"\r"))
+        error_msg = (
+            f"La longitud de la línea {index} no coincide con la longitud esperada para el libro {self.name_of_book}. "
+            f"Longitud actual: {actual_length + 1}, longitud esperada: {self.expected_length}"
+        )
+        logger.error(error_msg)
+        raise ProcessingError(error_msg)
+
+    def iter_records(self) -> Iterator[Tuple[int, memoryview]]:
+        """
+        Recorre los registros del archivo validando la longitud de cada uno.
+
+        Yields:
+            Tuplas (número de línea, memoryview del registro sin fin de línea)
+        """
+        view = self.view
+        size = len(view)
+        expected_length = self.expected_length
+        terminator = self.terminator
+        terminator_length = len(terminator)
+        for index, offset in enumerate(range(0, size, self.stride), start=1):
+            record_end = offset + expected_length
+            line_end = record_end + terminator_length
+            # La última línea puede no tener fin de línea
+            if view[record_end:line_end] != terminator and record_end != size:
+                self._raise_length_error(index, offset)
+            yield index, view[offset:record_end]
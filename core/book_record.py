@@ -0,0 +1,129 @@
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Optional, Union
+
+from core.field_calculator import calculate_field_totals
+from core.value_extractor import extract_and_format_fields, get_compiled_layout
+from logger import logger
+from models.book_utils import retrieve_keys_to_sum
+
+# Clave con los totales sumados de la línea, igual que en los diccionarios
+SUMMED_AMOUNTS_KEY = "summed_amounts"
+
+
+class RecordSchema:
+    """
+    Esquema compilado de un libro, compartido por todos sus registros: slice y
+    conversor de cada campo y campos a sumar.
+    """
+
+    def __init__(self, name_of_book: str) -> None:
+        self.name_of_book = name_of_book
+        self.layout = get_compiled_layout(name_of_book)
+        self.fields = {
+            field_number: (field_slice, converter)
+            for field_number, field_slice, converter in self.layout
+        }
+        self.keys_to_sum = retrieve_keys_to_sum(name_of_book)
+        self.referenced_fields = ", ".join(map(str, self.keys_to_sum)).strip()
+        for key in self.keys_to_sum:
+            if key not in self.fields:
+                logger.warning(f"Clave {key} no encontrada para sumar")
+
+    def calculate_total(self, raw: bytes) -> int:
+        """Suma los campos a sumar de un registro (en centavos)."""
+        total = 0
+        for key in self.keys_to_sum:
+            field_info = self.fields.get(key)
+            if field_info is not None:
+                field_slice, converter = field_info
+                total += converter(raw[field_slice])
+        return total
+
+
+@lru_cache(maxsize=None)
+def get_record_schema(name_of_book: str) -> RecordSchema:
+    """
+    Devuelve el esquema compilado de un libro, construyéndolo sólo la primera vez.
+
+    Args:
+        name_of_book: Clave del tipo de libro
+
+    Returns:
+        RecordSchema del libro
+    """
+    return RecordSchema(name_of_book)
+
+
+class BookRecord(Mapping):
+    """
+    Registro parseado de un libro IVA que guarda sólo los bytes crudos de la
+    línea y su total; cada campo se decodifica recién cuando se accede.
+
+    Se comporta como el diccionario {número de campo: valor, "summed_amounts":
+    {...}} que devolvía el parser (get, [], in, items...), de modo que los
+    consumidores existentes no cambian. El esquema lo comparte el libro, por lo
+    que cada registro ocupa poco más que su línea.
+    """
+
+    __slots__ = ("schema", "raw", "total")
+
+    def __init__(
+        self, schema: RecordSchema, raw: bytes, total: Optional[int] = None
+    ) -> None:
+        """
+        Args:
+            schema: Esquema del libro (get_record_schema)
+            raw: Bytes del registro, sin fin de línea
+            total: Total sumado ya calculado (en centavos). Si es None, se
+                calcula ahora, de modo que un importe inválido falla al parsear.
+        """
+        self.schema = schema
+        self.raw = raw
+        self.total = schema.calculate_total(raw) if total is None else total
+
+    def field(self, field_number: int) -> Union[int, str]:
+        """Decodifica el valor de un campo."""
+        field_slice, converter = self.schema.fields[field_number]
+        return converter(self.raw[field_slice])
+
+    @property
+    def summed_amounts(self) -> Dict[str, Any]:
+        """Totales sumados, con la misma forma que calculate_field_totals."""
+        return {"referenced_fields": self.schema.referenced_fields, "total": self.total}
+
+    def __getitem__(self, key: Union[int, str]) -> Any:
+        if key == SUMMED_AMOUNTS_KEY:
+            return self.summed_amounts
+        if key not in self.schema.fields:
+            raise KeyError(key)
+        return self.field(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key == SUMMED_AMOUNTS_KEY or key in self.schema.fields
+
+    def __iter__(self) -> Iterator[Union[int, str]]:
+        yield from self.schema.fields
+        yield SUMMED_AMOUNTS_KEY
+
+    def __len__(self) -> int:
+        return len(self.schema.fields) + 1
+
+    def __repr__(self) -> str:
+        return f"BookRecord({self.schema.name_of_book!r}, {self.raw!r})"
+
+    def __reduce__(self):
+        # Al enviarse entre procesos sólo viajan la clave del libro y los bytes
+        return _rebuild_record, (self.schema.name_of_book, self.raw, self.total)
+
+    def to_dict(self) -> Dict:
+        """Decodifica todos los campos en el diccionario que devolvía el parser."""
+        return calculate_field_totals(
+            extract_and_format_fields(self.raw, self.schema.layout),
+            self.schema.keys_to_sum,
+        )
+
+
+def _rebuild_record(name_of_book: str, raw: bytes, total: int) -> BookRecord:
+    """Reconstruye un BookRecord serializado con pickle."""
+    return BookRecord(get_record_schema(name_of_book), raw, total)
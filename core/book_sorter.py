@@ -0,0 +1,153 @@
+import heapq
+import os
+import tempfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from core.book_merger import build_join_key, join_sort_key
+from core.book_parser import iter_book_file, parse_book_record
+from core.book_reader import BOOK_ENCODING, BookBuffer
+from logger import logger
+from models.book_utils import retrieve_field_structure, retrieve_join_key_fields
+
+# Cantidad de registros ordenados en memoria por cada archivo temporal
+SORT_RUN_LINES = 200000
+# Ancho del número de línea que precede a cada registro en los archivos temporales
+_INDEX_WIDTH = 10
+
+
+def _key_spans(name_of_book: str) -> List[Tuple[int, int]]:
+    """
+    Devuelve las posiciones (inicio, fin exclusivo) de los campos clave del libro.
+    """
+    field_structure = retrieve_field_structure(name_of_book)
+    spans = []
+    for field in retrieve_join_key_fields(name_of_book):
+        positions = field_structure[field]["Posiciones"]
+        spans.append((positions[0], positions[-1] + 1))
+    return spans
+
+
+def _record_sort_key(record, spans: List[Tuple[int, int]]) -> Tuple:
+    """
+    Calcula la clave de ordenamiento de un registro leyendo sólo sus campos clave.
+    """
+    return join_sort_key(
+        build_join_key(str(record[start:end], BOOK_ENCODING) for start, end in spans)
+    )
+
+
+def is_book_sorted(buffer: BookBuffer) -> bool:
+    """
+    Indica si un libro está ordenado por clave de comprobante. Sólo se leen los
+    campos clave de cada registro, sin parsear el resto.
+
+    Args:
+        buffer: BookBuffer abierto sobre el libro
+
+    Returns:
+        True si las claves están en orden no decreciente
+    """
+    spans = _key_spans(buffer.name_of_book)
+    previous = None
+    for index, record in buffer.iter_records():
+        sort_key = _record_sort_key(record, spans)
+        if previous is not None and sort_key < previous:
+            logger.info(
+                f"El libro {buffer.name_of_book} no está ordenado por comprobante "
+                f"(línea {index})"
+            )
+            return False
+        previous = sort_key
+    return True
+
+
+def _write_run(
+    run: List[Tuple[Tuple, int, bytes]], directory: str, run_number: int
+) -> str:
+    """
+    Ordena un bloque de registros y lo guarda en un archivo temporal, con el
+    número de línea original delante de cada registro.
+    """
+    run.sort(key=lambda item: (item[0], item[1]))
+    run_path = os.path.join(directory, f"run_{run_number:05d}.txt")
+    with open(run_path, "wb") as run_file:
+        for _, index, record in run:
+            run_file.write(b"%0*d%s\n" % (_INDEX_WIDTH, index, record))
+    return run_path
+
+
+def _iter_run(run_path: str) -> Iterator[Tuple[int, bytes]]:
+    """Recorre un archivo temporal produciendo (número de línea, registro)."""
+    with open(run_path, "rb") as run_file:
+        for line in run_file:
+            yield int(line[:_INDEX_WIDTH]), line[_INDEX_WIDTH:-1]
+
+
+def iter_externally_sorted(
+    buffer: BookBuffer,
+    run_lines: int = SORT_RUN_LINES,
+    temp_dir: Optional[str] = None,
+) -> Iterator[Tuple[int, bytes]]:
+    """
+    Ordena un libro por clave de comprobante con un ordenamiento externo: los
+    registros se ordenan en bloques de run_lines líneas que se guardan en
+    archivos temporales y luego se combinan con una mezcla de k vías.
+
+    Args:
+        buffer: BookBuffer abierto sobre el libro
+        run_lines: Cantidad de registros por bloque ordenado en memoria
+        temp_dir: Carpeta para los archivos temporales (por defecto, la del sistema)
+
+    Yields:
+        Tuplas (número de línea original, registro) en orden de comprobante
+    """
+    spans = _key_spans(buffer.name_of_book)
+    with tempfile.TemporaryDirectory(dir=temp_dir) as directory:
+        run_paths = []
+        run: List[Tuple[Tuple, int, bytes]] = []
+        for index, record in buffer.iter_records():
+            record = record.tobytes()
+            run.append((_record_sort_key(record, spans), index, record))
+            if len(run) >= run_lines:
+                run_paths.append(_write_run(run, directory, len(run_paths)))
+                run = []
+        if run:
+            run_paths.append(_write_run(run, directory, len(run_paths)))
+        del run
+        logger.info(
+            f"Ordenando {buffer.name_of_book} por comprobante "
+            f"({len(run_paths)} bloques temporales)"
+        )
+
+        # A igual clave se respeta el orden original de las líneas
+        yield from heapq.merge(
+            *(_iter_run(path) for path in run_paths),
+            key=lambda item: (_record_sort_key(item[1], spans), item[0]),
+        )
+
+
+def iter_book_by_key(
+    buffer: BookBuffer,
+    run_lines: int = SORT_RUN_LINES,
+    temp_dir: Optional[str] = None,
+) -> Iterator[Tuple[int, Dict]]:
+    """
+    Recorre un libro en orden de comprobante, listo para iter_sorted_join. Si el
+    archivo ya está ordenado se procesa directamente; si no, se recurre a un
+    ordenamiento externo sobre archivos temporales.
+
+    Args:
+        buffer: BookBuffer abierto sobre el libro
+        run_lines: Cantidad de registros por bloque del ordenamiento externo
+        temp_dir: Carpeta para los archivos temporales
+
+    Yields:
+        Tuplas (número de línea original, diccionario con los datos procesados)
+    """
+    if is_book_sorted(buffer):
+        yield from iter_book_file(buffer.file_name, buffer.name_of_book, buffer)
+        return
+
+    logger.info(f"Procesando archivo {buffer.file_name} como {buffer.name_of_book}")
+    for index, record in iter_externally_sorted(buffer, run_lines, temp_dir):
+        yield index, parse_book_record(record, buffer.name_of_book)
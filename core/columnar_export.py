@@ -0,0 +1,279 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.exceptions import ProcessingError
+from core.value_extractor import get_field_names, get_field_scales
+from logger import logger
+from models.book_utils import retrieve_field_structure
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: sólo lo requiere la exportación columnar
+    pa = None
+
+# Extensión de los archivos según el formato de exportación
+EXPORT_EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# Carpeta, dentro de la salida, donde se escriben las tablas exportadas
+EXPORT_FOLDER = "export"
+
+# Observación de BOOKS que identifica a los campos de fecha
+DATE_OBSERVATION = "AAAAMMDD"
+
+
+def check_export_format(export_format: Optional[str]) -> None:
+    """
+    Verifica que el formato de exportación sea conocido y que pyarrow esté
+    instalado, para fallar antes de procesar los libros.
+    """
+    if export_format is None:
+        return
+    if export_format not in EXPORT_EXTENSIONS:
+        raise ProcessingError(f"Formato de exportación desconocido: {export_format}")
+    if pa is None:
+        error_msg = (
+            "La exportación columnar requiere pyarrow. Instálalo con: "
+            "pip install pyarrow"
+        )
+        logger.error(error_msg)
+        raise ProcessingError(error_msg)
+
+
+def _amount_array(values: List[Any]) -> "pa.Array":
+    """Importes en unidades del último decimal; los no numéricos quedan nulos."""
+    return pa.array(
+        [value if isinstance(value, int) else None for value in values],
+        type=pa.int64(),
+    )
+
+
+def _date_array(values: List[Any]) -> "pa.Array":
+    """Fechas AAAAMMDD como date32; las vacías o inválidas (00000000) quedan nulas."""
+    timestamps = pc.strptime(
+        pa.array(values, type=pa.string()),
+        format="%Y%m%d",
+        unit="s",
+        error_is_null=True,
+    )
+    return timestamps.cast(pa.date32())
+
+
+def _to_amount(value: Any) -> Optional[int]:
+    """Importe formateado para el libro (con ceros y signo) como entero, o None."""
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def book_schema(name_of_book: str) -> "pa.Schema":
+    """
+    Esquema Arrow de un libro a partir de su definición en BOOKS: una columna
+    "line" y una por campo, con el nombre del campo. Los importes son int64 en
+    unidades del último decimal (centavos para "13 enteros 2 decimales"), las
+    fechas AAAAMMDD son date32 y el resto texto. Cada columna guarda en su
+    metadata el número de campo y, para los importes, la escala.
+    """
+    scales = get_field_scales(name_of_book)
+    fields = [pa.field("line", pa.int64(), nullable=False)]
+    for field_number, field_info in retrieve_field_structure(name_of_book).items():
+        metadata = {"field_number": str(field_number)}
+        if field_number in scales:
+            field_type = pa.int64()
+            metadata["scale"] = str(scales[field_number])
+        elif field_info.get("Observaciones") == DATE_OBSERVATION:
+            field_type = pa.date32()
+        else:
+            field_type = pa.string()
+        fields.append(pa.field(field_info["Campo"], field_type, metadata=metadata))
+    return pa.schema(fields, metadata={"book": name_of_book})
+
+
+def book_table(list_of_data: List[Dict], name_of_book: str) -> "pa.Table":
+    """
+    Convierte un libro parseado (la lista que devuelve parse_book_file) en una
+    tabla Arrow con el esquema de book_schema.
+
+    Args:
+        list_of_data: Lista de diccionarios {número de línea: {campo: valor}}
+        name_of_book: Clave del tipo de libro
+
+    Returns:
+        Tabla con una fila por línea del libro
+    """
+    schema = book_schema(name_of_book)
+    lines: List[int] = []
+    values: Dict[int, List[Any]] = {
+        field_number: [] for field_number in retrieve_field_structure(name_of_book)
+    }
+    for item in list_of_data:
+        for line, record in item.items():
+            lines.append(int(line))
+            for field_number, column in values.items():
+                column.append(record.get(field_number))
+
+    columns = [pa.array(lines, type=pa.int64())]
+    for schema_field, column in zip(list(schema)[1:], values.values()):
+        if pa.types.is_int64(schema_field.type):
+            columns.append(_amount_array(column))
+        elif pa.types.is_date32(schema_field.type):
+            columns.append(_date_array(column))
+        else:
+            columns.append(pa.array(column, type=pa.string()))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def merged_totals_table(
+    merged_books: Dict[str, Dict],
+    book_1_key: str,
+    book_2_key: str,
+    field_number: int = 9,
+) -> "pa.Table":
+    """
+    Tabla con los totales por comprobante de un diccionario fusionado (la salida
+    de join_and_summarize), en centavos:
+      - line: línea del comprobante en el libro 1.
+      - book_2_lines: líneas de sus alícuotas en el libro 2.
+      - book_1_total / book_2_total: suma de los campos de cada libro.
+      - total_summed_amount: total calculado.
+      - declared_amount: total declarado en field_number del libro 1.
+      - difference: declarado menos calculado.
+
+    Args:
+        merged_books: Diccionario fusionado con los totales sumados
+        book_1_key: Clave del libro de comprobantes
+        book_2_key: Clave del libro de alícuotas
+        field_number: Campo del libro 1 con el total declarado
+
+    Returns:
+        Tabla con una fila por comprobante
+    """
+    lines, book_2_lines = [], []
+    book_1_totals, book_2_totals, summed, declared = [], [], [], []
+    for line, value in merged_books.items():
+        record_1 = value.get(book_1_key, {})
+        entry_2 = value.get(book_2_key)
+        lines.append(int(line))
+        book_2_lines.append(entry_2["line_numbers"] if entry_2 else [])
+        book_1_totals.append(record_1.get("summed_amounts", {}).get("total", 0))
+        book_2_totals.append(entry_2["summed_amounts"]["total"] if entry_2 else 0)
+        summed.append(value.get("total_summed_amount", 0))
+        declared.append(record_1.get(field_number))
+
+    declared_array = _amount_array(declared)
+    summed_array = pa.array(summed, type=pa.int64())
+    return pa.table(
+        {
+            "line": pa.array(lines, type=pa.int64()),
+            "book_2_lines": pa.array(book_2_lines, type=pa.list_(pa.int64())),
+            "book_1_total": pa.array(book_1_totals, type=pa.int64()),
+            "book_2_total": pa.array(book_2_totals, type=pa.int64()),
+            "total_summed_amount": summed_array,
+            "declared_amount": declared_array,
+            "difference": pc.subtract(declared_array, summed_array),
+        },
+        metadata={"book_1": book_1_key, "book_2": book_2_key},
+    )
+
+
+def differences_table(
+    difference_tuples: List[Tuple[int, Any, Any, int]], name_of_book: str
+) -> "pa.Table":
+    """
+    Tabla con la lista de diferencias (línea, valor correcto, valor actual,
+    campo). Los valores se guardan como el texto que se escribe en el libro y,
+    si el campo es un importe, también como int64 en correct_amount y
+    actual_amount.
+
+    Args:
+        difference_tuples: Diferencias a exportar
+        name_of_book: Clave del libro al que corresponden
+
+    Returns:
+        Tabla con una fila por diferencia
+    """
+    field_names = get_field_names(name_of_book)
+    scales = get_field_scales(name_of_book)
+    lines, fields, names, correct, actual = [], [], [], [], []
+    correct_amounts, actual_amounts = [], []
+    for line, correct_value, actual_value, field_number in difference_tuples:
+        lines.append(line)
+        fields.append(field_number)
+        names.append(field_names.get(field_number))
+        correct.append(None if correct_value is None else str(correct_value))
+        actual.append(None if actual_value is None else str(actual_value))
+        is_amount = field_number in scales
+        correct_amounts.append(_to_amount(correct_value) if is_amount else None)
+        actual_amounts.append(_to_amount(actual_value) if is_amount else None)
+
+    return pa.table(
+        {
+            "line": pa.array(lines, type=pa.int64()),
+            "field": pa.array(fields, type=pa.int32()),
+            "field_name": pa.array(names, type=pa.string()),
+            "correct_value": pa.array(correct, type=pa.string()),
+            "actual_value": pa.array(actual, type=pa.string()),
+            "correct_amount": pa.array(correct_amounts, type=pa.int64()),
+            "actual_amount": pa.array(actual_amounts, type=pa.int64()),
+        },
+        metadata={"book": name_of_book},
+    )
+
+
+def write_table(table: "pa.Table", file_path: str, export_format: str) -> None:
+    """Escribe una tabla como Parquet o Arrow IPC (Feather v2)."""
+    if export_format == "parquet":
+        pq.write_table(table, file_path)
+    else:
+        feather.write_feather(table, file_path)
+
+
+def export_book_comparison(
+    output_dir: str,
+    book_1_lines: List[Dict],
+    book_2_lines: List[Dict],
+    merged_books: Dict[str, Dict],
+    differences: List[Tuple[int, Any, Any, int]],
+    book_1_key: str,
+    book_2_key: str,
+    export_format: str = "parquet",
+) -> List[str]:
+    """
+    Exporta el resultado de una comparación a archivos columnares tipados en
+    <output_dir>/export: un archivo por libro parseado (con el nombre del
+    libro), merged_totals con los totales por comprobante y differences con la
+    lista de diferencias. Los archivos se reemplazan en cada corrida.
+
+    Args:
+        output_dir: Carpeta de salida de la comparación
+        book_1_lines: Libro de comprobantes parseado
+        book_2_lines: Libro de alícuotas parseado
+        merged_books: Diccionario fusionado con los totales sumados
+        differences: Diferencias encontradas (línea, valor nuevo, valor actual, campo)
+        book_1_key: Clave del libro de comprobantes
+        book_2_key: Clave del libro de alícuotas
+        export_format: "parquet" o "arrow" (Arrow IPC)
+
+    Returns:
+        Rutas de los archivos escritos
+    """
+    check_export_format(export_format)
+    export_dir = os.path.join(output_dir, EXPORT_FOLDER)
+    os.makedirs(export_dir, exist_ok=True)
+    tables = {
+        book_1_key: book_table(book_1_lines, book_1_key),
+        book_2_key: book_table(book_2_lines, book_2_key),
+        "merged_totals": merged_totals_table(merged_books, book_1_key, book_2_key),
+        "differences": differences_table(differences, book_1_key),
+    }
+
+    paths = []
+    for name, table in tables.items():
+        file_path = os.path.join(export_dir, name + EXPORT_EXTENSIONS[export_format])
+        write_table(table, file_path, export_format)
+        paths.append(file_path)
+        logger.info(f"Exportadas {table.num_rows} filas a {file_path}")
+    return paths
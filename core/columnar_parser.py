@@ -0,0 +1,373 @@
+from typing import Dict, List, Optional, Tuple
+
+from core.book_merger import JoinKey, build_join_key
+from core.book_reader import BOOK_ENCODING, BookBuffer
+from core.book_record import BookRecord, get_record_schema
+from core.exceptions import ProcessingError
+from core.value_extractor import DECIMALS_KEY, get_compiled_layout
+from logger import logger
+from models.book_utils import (
+    retrieve_expected_length,
+    retrieve_field_structure,
+    retrieve_join_key_fields,
+    retrieve_keys_to_sum,
+)
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional: sólo lo requiere el motor columnar
+    np = None
+
+_ASCII_ZERO = ord("0")
+
+
+def _require_numpy() -> None:
+    """Verifica que numpy esté instalado antes de usar el motor columnar."""
+    if np is None:
+        error_msg = "El motor columnar requiere numpy. Instálalo con: pip install numpy"
+        logger.error(error_msg)
+        raise ProcessingError(error_msg)
+
+
+class BookColumns:
+    """
+    Representación columnar de un libro IVA de ancho fijo.
+
+    Los registros se mantienen como una matriz (n_líneas, longitud_registro) de
+    bytes, y cada campo de importe se decodifica a un arreglo int64 expresado en
+    unidades de su último decimal (centavos para "13 enteros 2 decimales").
+    """
+
+    def __init__(
+        self,
+        name_of_book: str,
+        records: "np.ndarray",
+        amounts: Dict[int, "np.ndarray"],
+        scales: Dict[int, int],
+    ) -> None:
+        self.name_of_book = name_of_book
+        self.records = records
+        self.amounts = amounts
+        self.scales = scales
+
+    def __len__(self) -> int:
+        return self.records.shape[0]
+
+    def field_bytes(self, field_number: int) -> "np.ndarray":
+        """
+        Devuelve la sub-matriz de bytes que ocupa un campo en todas las líneas.
+        """
+        positions = retrieve_field_structure(self.name_of_book)[field_number][
+            "Posiciones"
+        ]
+        return self.records[:, positions[0] : positions[-1] + 1]
+
+    def text_column(self, field_number: int) -> List[str]:
+        """
+        Decodifica un campo de texto para todas las líneas, aplicando el mismo
+        conversor que el motor por defecto.
+        """
+        converters = {
+            number: conv for number, _, conv in get_compiled_layout(self.name_of_book)
+        }
+        converter = converters[field_number]
+        column = np.ascontiguousarray(self.field_bytes(field_number))
+        width = column.shape[1]
+        raw = column.tobytes()
+        return [converter(raw[i : i + width]) for i in range(0, len(raw), width)]
+
+
+def _decode_amount_column(
+    digits: "np.ndarray", field_number: int, name_of_book: str
+) -> "np.ndarray":
+    """
+    Convierte una sub-matriz de dígitos ASCII en un arreglo int64.
+
+    Las filas con caracteres no numéricos (espacios, signo) se convierten de a una
+    con int(); si tampoco así son válidas se lanza ProcessingError.
+    """
+    width = digits.shape[1]
+    values = digits.astype(np.int64) - _ASCII_ZERO
+    weights = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    result = values @ weights
+
+    invalid_rows = np.flatnonzero(((values < 0) | (values > 9)).any(axis=1))
+    for row in invalid_rows:
+        raw = digits[row].tobytes().decode(BOOK_ENCODING)
+        try:
+            result[row] = int(raw.strip())
+        except ValueError:
+            error_msg = (
+                f"Valor numérico inválido '{raw}' en la línea {row + 1}, "
+                f"campo {field_number} del libro {name_of_book}."
+            )
+            logger.error(error_msg)
+            raise ProcessingError(error_msg)
+    return result
+
+
+def _raise_length_error(data: bytes, name_of_book: str, expected_length: int) -> None:
+    """
+    Busca la primera línea con longitud incorrecta y lanza ProcessingError con el
+    mismo mensaje que el motor por defecto.
+    """
+    for index, line in enumerate(data.splitlines(), start=1):
+        if len(line) != expected_length:
+            break
+    else:
+        index, line = 0, b""
+    error_msg = (
+        f"La longitud de la línea {index} no coincide con la longitud esperada para el libro {name_of_book}. "
+        f"Longitud actual: {len(line) + 1}, longitud esperada: {expected_length}"
+    )
+    logger.error(error_msg)
+    raise ProcessingError(error_msg)
+
+
+def load_book_columns(
+    file_name: str, name_of_book: str, buffer: Optional[BookBuffer] = None
+) -> BookColumns:
+    """
+    Lee un archivo de libro IVA como un único buffer de bytes y decodifica en
+    bloque todas sus columnas de importes.
+
+    Args:
+        file_name: Ruta al archivo a procesar
+        name_of_book: Clave del tipo de libro
+        buffer: BookBuffer ya abierto sobre el archivo. Si se indica, la matriz de
+            registros es una vista sobre el archivo mapeado, sin copiarlo.
+
+    Returns:
+        BookColumns con los registros y los importes decodificados
+    """
+    _require_numpy()
+    logger.info(f"Procesando archivo {file_name} como {name_of_book} (columnar)")
+    expected_length = retrieve_expected_length(name_of_book)
+
+    if buffer is not None:
+        data = buffer.view
+        terminator = buffer.terminator
+    else:
+        try:
+            with open(file_name, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            error_msg = f"No se encontró el archivo {file_name}."
+            logger.error(error_msg)
+            raise ProcessingError(error_msg)
+
+        # Detectar el fin de línea (LF o CRLF) a partir de la primera línea
+        first_newline = data.find(b"\n")
+        terminator = (
+            b"\r\n" if data[first_newline - 1 : first_newline] == b"\r" else b"\n"
+        )
+    if len(data) and data[-1:] != b"\n":
+        data = bytes(data) + terminator
+    stride = expected_length + len(terminator)
+
+    if len(data) % stride != 0:
+        _raise_length_error(bytes(data), name_of_book, expected_length)
+
+    records = np.frombuffer(data, dtype=np.uint8).reshape(-1, stride)
+    bad_rows = np.flatnonzero(records[:, -1] != ord("\n"))
+    if len(terminator) == 2:
+        bad_rows = np.union1d(bad_rows, np.flatnonzero(records[:, -2] != ord("\r")))
+    if bad_rows.size:
+        _raise_length_error(bytes(data), name_of_book, expected_length)
+    records = records[:, :expected_length]
+
+    amounts: Dict[int, np.ndarray] = {}
+    scales: Dict[int, int] = {}
+    for field_number, field_info in retrieve_field_structure(name_of_book).items():
+        scale = field_info.get(DECIMALS_KEY)
+        if scale is None:
+            continue
+        positions = field_info["Posiciones"]
+        amounts[field_number] = _decode_amount_column(
+            records[:, positions[0] : positions[-1] + 1], field_number, name_of_book
+        )
+        scales[field_number] = scale
+
+    logger.info(f"Archivo procesado. Total de líneas: {records.shape[0]}")
+    return BookColumns(name_of_book, records, amounts, scales)
+
+
+def calculate_column_totals(
+    columns: BookColumns, keys_to_sum: Optional[List[int]] = None
+) -> "np.ndarray":
+    """
+    Suma, para cada línea, los importes de los campos indicados.
+
+    Args:
+        columns: Libro en representación columnar
+        keys_to_sum: Campos a sumar. Por defecto, los definidos para el libro.
+
+    Returns:
+        Arreglo int64 con el total de cada línea, en centavos
+    """
+    if keys_to_sum is None:
+        keys_to_sum = retrieve_keys_to_sum(columns.name_of_book)
+    totals = np.zeros(len(columns), dtype=np.int64)
+    for key in keys_to_sum:
+        if key in columns.amounts:
+            totals += columns.amounts[key]
+        else:
+            logger.warning(f"Clave {key} no encontrada para sumar")
+    return totals
+
+
+def _column_join_keys(columns: BookColumns) -> List[JoinKey]:
+    """Construye la clave de comprobante normalizada de cada línea."""
+    key_columns = [
+        columns.text_column(field)
+        for field in retrieve_join_key_fields(columns.name_of_book)
+    ]
+    return [build_join_key(values) for values in zip(*key_columns)]
+
+
+def join_column_totals(
+    book_1_columns: BookColumns, book_2_columns: BookColumns
+) -> Tuple["np.ndarray", Dict[str, List[int]]]:
+    """
+    Equivalente columnar de join_books_by_key: agrupa las alícuotas por
+    comprobante y devuelve, para cada línea del libro de comprobantes, la suma de
+    los totales de sus alícuotas.
+
+    Args:
+        book_1_columns: Libro de comprobantes
+        book_2_columns: Libro de alícuotas
+
+    Returns:
+        Tupla (arreglo int64 con la suma por línea del primer libro, huérfanos),
+        donde huérfanos es {clave de libro: [números de línea sin contraparte]}
+    """
+    # Asignar un identificador de grupo a cada comprobante del libro de alícuotas
+    group_ids: Dict[JoinKey, int] = {}
+    keys_2 = _column_join_keys(book_2_columns)
+    rows_group = np.fromiter(
+        (group_ids.setdefault(key, len(group_ids)) for key in keys_2),
+        dtype=np.int64,
+        count=len(keys_2),
+    )
+    group_totals = np.zeros(len(group_ids), dtype=np.int64)
+    np.add.at(group_totals, rows_group, calculate_column_totals(book_2_columns))
+
+    # Cada grupo se asigna una sola vez: un comprobante repetido queda huérfano
+    claimed = np.zeros(len(group_ids), dtype=bool)
+    matched_rows, matched_groups, book_1_orphans = [], [], []
+    for row, key in enumerate(_column_join_keys(book_1_columns)):
+        group = group_ids.get(key)
+        if group is None or claimed[group]:
+            book_1_orphans.append(row + 1)
+            continue
+        claimed[group] = True
+        matched_rows.append(row)
+        matched_groups.append(group)
+
+    totals = np.zeros(len(book_1_columns), dtype=np.int64)
+    totals[matched_rows] = group_totals[matched_groups]
+    orphans = {
+        book_1_columns.name_of_book: book_1_orphans,
+        book_2_columns.name_of_book: (
+            np.flatnonzero(~claimed[rows_group]) + 1
+        ).tolist(),
+    }
+    for book_key, lines in orphans.items():
+        if lines:
+            logger.warning(f"Líneas de {book_key} sin contraparte: {len(lines)}")
+    return totals, orphans
+
+
+def detect_column_differences(
+    columns: BookColumns,
+    total_summed_amounts: "np.ndarray",
+    field_number: int = 9,
+    threshold: int = 0,
+) -> List[Tuple]:
+    """
+    Equivalente vectorizado de detect_total_differences: compara el total
+    calculado de cada línea contra un campo del libro.
+
+    Args:
+        columns: Libro contra el que comparar
+        total_summed_amounts: Totales por línea en centavos
+        field_number: Número del campo a comparar con el total calculado
+        threshold: Umbral de diferencia aceptable (centavos)
+
+    Returns:
+        Lista de tuplas con diferencias encontradas (línea, valor calculado, valor actual),
+        con los importes en centavos
+    """
+    logger.info(
+        f"Buscando diferencias en el campo {field_number} del libro {columns.name_of_book}"
+    )
+    field_values = columns.amounts[field_number]
+    rows = np.flatnonzero(np.abs(total_summed_amounts - field_values) > threshold)
+    differences = [
+        (
+            int(row) + 1,
+            int(total_summed_amounts[row]),
+            int(field_values[row]),
+        )
+        for row in rows
+    ]
+    logger.info(f"Total de diferencias encontradas: {len(differences)}")
+    return differences
+
+
+def extract_column_document_ids(
+    columns: BookColumns, field_number: int = 7
+) -> List[int]:
+    """
+    Devuelve el número de documento de cada línea como entero, o 0 cuando el
+    valor no puede convertirse (igual que extract_document_entries).
+    """
+    list_of_docs = []
+    for value in columns.text_column(field_number):
+        try:
+            list_of_docs.append(int(value))
+        except ValueError:
+            list_of_docs.append(0)
+    return list_of_docs
+
+
+def extract_column_document_entries(
+    columns: BookColumns, field_number: int = 7, type_field_number: int = 6
+) -> List[Tuple[int, str, int]]:
+    """
+    Equivalente columnar de extract_document_entries: devuelve, para cada línea,
+    (línea, código de documento, número de documento).
+    """
+    return [
+        (line, document_type, document_id)
+        for line, (document_type, document_id) in enumerate(
+            zip(
+                columns.text_column(type_field_number),
+                extract_column_document_ids(columns, field_number),
+            ),
+            start=1,
+        )
+    ]
+
+
+def columns_to_records(columns: BookColumns) -> List[Dict]:
+    """
+    Materializa un libro columnar en la misma estructura que devuelve
+    parse_book_file con el motor por defecto. Los totales ya calculados en
+    forma vectorizada se guardan en cada BookRecord.
+
+    Args:
+        columns: Libro en representación columnar
+
+    Returns:
+        Lista de diccionarios {número de línea: BookRecord}
+    """
+    schema = get_record_schema(columns.name_of_book)
+    totals = calculate_column_totals(columns, schema.keys_to_sum).tolist()
+
+    width = columns.records.shape[1]
+    raw = np.ascontiguousarray(columns.records).tobytes()
+    return [
+        {str(row + 1): BookRecord(schema, raw[start : start + width], totals[row])}
+        for row, start in enumerate(range(0, len(raw), width))
+    ]
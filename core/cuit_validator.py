@@ -0,0 +1,117 @@
+from typing import Iterable, List, Tuple
+
+from logger import logger
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional: sin él se valida con un bucle
+    np = None
+
+# Prefijos asignados por AFIP: personas humanas (20, 23, 24, 25, 26, 27) y
+# personas jurídicas (30, 33, 34)
+CUIT_PREFIXES = frozenset({20, 23, 24, 25, 26, 27, 30, 33, 34})
+
+# Pesos del dígito verificador (módulo 11) para los primeros 10 dígitos
+CUIT_WEIGHTS = (5, 4, 3, 2, 7, 6, 5, 4, 3, 2)
+
+_MIN_CUIT = 10**10
+_MAX_CUIT = 10**11
+
+
+def _check_digit(document_id: int) -> int:
+    """
+    Calcula el dígito verificador de una CUIT de 11 dígitos, o -1 si el resto
+    no admite dígito válido (AFIP asigna otro prefijo en ese caso).
+    """
+    digits = str(document_id)
+    total = sum(int(digit) * weight for digit, weight in zip(digits, CUIT_WEIGHTS))
+    check = 11 - total % 11
+    if check == 11:
+        return 0
+    if check == 10:
+        return -1
+    return check
+
+
+def is_valid_cuit(document_id: int) -> bool:
+    """
+    Verifica localmente una CUIT/CUIL/CDI: 11 dígitos, prefijo asignado y
+    dígito verificador módulo 11.
+
+    Args:
+        document_id: Número de documento
+
+    Returns:
+        True si el documento es plausible; False si seguro es inválido
+    """
+    if not _MIN_CUIT <= document_id < _MAX_CUIT:
+        return False
+    if document_id // 10**9 not in CUIT_PREFIXES:
+        return False
+    return _check_digit(document_id) == document_id % 10
+
+
+def _validate_cuits_numpy(document_ids: List[int]) -> List[bool]:
+    """
+    Versión vectorizada de is_valid_cuit: los dígitos se obtienen por división
+    entera sobre un arreglo int64, sin convertir cada número a texto.
+    """
+    values = np.array(
+        [
+            document_id if _MIN_CUIT <= document_id < _MAX_CUIT else 0
+            for document_id in document_ids
+        ],
+        dtype=np.int64,
+    )
+    in_range = values > 0
+    prefix_ok = np.isin(values // 10**9, list(CUIT_PREFIXES))
+
+    total = np.zeros(len(values), dtype=np.int64)
+    for position, weight in enumerate(CUIT_WEIGHTS):
+        total += (values // 10 ** (10 - position)) % 10 * weight
+    check = 11 - total % 11
+    check[check == 11] = 0
+    # Un resto de 10 no admite dígito válido
+    check[check == 10] = -1
+
+    valid = in_range & prefix_ok & (check == values % 10)
+    return valid.tolist()
+
+
+def validate_cuits(document_ids: Iterable[int]) -> List[bool]:
+    """
+    Valida localmente una lista de documentos (ver is_valid_cuit). Usa numpy si
+    está instalado.
+
+    Args:
+        document_ids: Números de documento
+
+    Returns:
+        Lista de booleanos, en el mismo orden que los documentos
+    """
+    document_ids = list(document_ids)
+    if np is not None and document_ids:
+        return _validate_cuits_numpy(document_ids)
+    return [is_valid_cuit(document_id) for document_id in document_ids]
+
+
+def partition_cuits(document_ids: Iterable[int]) -> Tuple[List[int], List[int]]:
+    """
+    Separa los documentos plausibles, que deben consultarse en AFIP, de los que
+    seguro son inválidos (largo, prefijo o dígito verificador incorrectos).
+
+    Args:
+        document_ids: Números de documento
+
+    Returns:
+        Tupla (documentos plausibles, documentos inválidos), en el orden original
+    """
+    document_ids = list(document_ids)
+    plausible, invalid = [], []
+    for document_id, valid in zip(document_ids, validate_cuits(document_ids)):
+        (plausible if valid else invalid).append(document_id)
+    logger.info(
+        f"Validación local de CUIT: {len(plausible)} plausibles, "
+        f"{len(invalid)} inválidos (no se consultan en AFIP)"
+    )
+    return plausible, invalid
@@ -5,15 +5,16 @@ from core.string_utils import format_numeric_string
 from logger import logger
 
 
-def format_difference(data: Tuple) -> Tuple:
+def format_difference(data: Tuple, field_number: int = 9) -> Tuple:
     """
     Formatea una tupla de diferencia para su uso posterior.
 
     Args:
         data: Tupla con (índice, monto calculado, monto original)
+        field_number: Número del campo al que corresponde la diferencia
 
     Returns:
-        Tupla formateada
+        Tupla formateada (índice, valor nuevo, valor original, número de campo)
     """
     # Validar que data sea una tupla y tenga 3 elementos
     if not isinstance(data, tuple) or len(data) != 3:
@@ -34,34 +35,41 @@ def format_difference(data: Tuple) -> Tuple:
     )
 
     # Retornar la tupla con los valores procesados
-    return index, formatted_summed, formatted_original
+    return index, formatted_summed, formatted_original, field_number
 
 
-def format_differences(list_of_tuples: List[Tuple]) -> List[Tuple]:
+def format_differences(
+    list_of_tuples: List[Tuple], field_number: int = 9
+) -> List[Tuple]:
     """
     Formatea una lista de tuplas de diferencias.
 
     Args:
         list_of_tuples: Lista de tuplas con diferencias
+        field_number: Número del campo al que corresponden las diferencias
 
     Returns:
         Lista de tuplas formateadas
     """
     logger.info(f"Formateando {len(list_of_tuples)} tuplas de diferencias")
     # Usar list comprehension para procesar cada tupla
-    return [format_difference(item) for item in list_of_tuples]
+    return [format_difference(item, field_number) for item in list_of_tuples]
 
 
-def format_total_differences(merged_books: dict, book_key: str) -> list:
+def format_total_differences(
+    merged_books: dict, book_key: str, field_number: int = 9
+) -> list:
     """
     Finds and formats the total differences between calculated and original values.
 
     Args:
         merged_books (dict): Merged data from both books.
         book_key (str): Key for the book to compare against totals.
+        field_number (int): Field holding the total of the operation (default 9).
 
     Returns:
-        list: List of formatted difference tuples.
+        list: List of formatted difference tuples
+        (line, new_value, original_value, field_number).
     """
-    differences = detect_total_differences(merged_books, book_key)
-    return format_differences(differences)
+    differences = detect_total_differences(merged_books, book_key, field_number)
+    return format_differences(differences, field_number)
@@ -1,6 +1,11 @@
-from afip_client.error_detector import detect_invalid_documents
+from typing import Iterable, List, Set, Tuple
+
+from afip_client.error_detector import detect_invalid_documents_with_status
+from core.cuit_validator import partition_cuits
+from core.lookup_planner import LookupPlan, build_lookup_plan
 from core.string_utils import pad_left
-from core.value_extractor import extract_document_ids
+from core.value_extractor import extract_document_entries
+from logger import logger
 
 
 def get_replacement_document_id(document: str) -> str:
@@ -21,26 +26,150 @@ def get_replacement_document_id(document: str) -> str:
 
 
 def detect_and_prepare_error_documents(
-    merged_books: dict, book_key: str, field_number: int = 7
+    merged_books: dict,
+    book_key: str,
+    field_number: int = 7,
+    service=None,
+    type_field_number: int = 6,
+    journal=None,
 ):
     """
     Extracts document IDs from the merged book data, checks for errors via AFIP,
     and maps those with errors to replacement-ready format.
 
+    Each distinct CUIT is queried once (see core.lookup_planner); the result is
+    mapped back to every line that uses it.
+
     Args:
         merged_books (dict): Merged dictionary of both books.
         book_key (str): Identifier of the book to extract documents from.
         field_number (int): Field containing the document value (default 7).
+        service (AFIPService, optional): Shared AFIP client to reuse.
+        type_field_number (int): Field containing the document type (default 6).
+        journal (CheckpointJournal, optional): Checkpoint to resume from and record to.
+
+    Returns:
+        tuple: (list of (line_index, new_doc, original_doc, field_number) tuples for
+        erroneous documents, sorted list of lines whose document could not be verified).
+    """
+    entries = extract_document_entries(
+        merged_books, book_key, field_number, type_field_number
+    )
+    return prepare_planned_error_documents(
+        build_lookup_plan(entries), field_number, service, journal
+    )
+
+
+def prepare_planned_error_documents(
+    plan: LookupPlan, field_number: int = 7, service=None, journal=None
+) -> Tuple[List[Tuple[int, str, str, int]], List[int]]:
+    """
+    Consulta en AFIP los documentos de un plan y arma las tuplas de reemplazo
+    para todas las líneas que usan un documento con errores.
+
+    Args:
+        plan: Plan de consultas con los documentos únicos y sus líneas
+        field_number: Número del campo que contiene el documento
+        service: Cliente AFIP compartido (opcional)
+        journal: Checkpoint de la corrida, para retomarla si se interrumpe (opcional)
+
+    Returns:
+        Tupla (lista de tuplas (índice, documento nuevo, documento original, número
+        de campo), líneas cuyo documento no pudo verificarse)
+    """
+    error_docs, unverified_docs = lookup_plan_documents([plan], service, journal)
+    return build_plan_replacement_entries(
+        plan, error_docs, unverified_docs, field_number
+    )
+
+
+def lookup_plan_documents(
+    plans: Iterable[LookupPlan], service=None, journal=None
+) -> Tuple[Set[int], Set[int]]:
+    """
+    Consulta una sola vez la unión de los documentos de varios planes (p. ej. los
+    de todos los libros de un lote).
+
+    Los documentos con largo, prefijo o dígito verificador incorrectos se
+    marcan como erróneos sin consultar a AFIP; sólo los plausibles se envían
+    al servicio.
+
+    Args:
+        plans: Planes de consultas de cada libro
+        service: Cliente AFIP compartido (opcional)
+        journal: Checkpoint de la corrida, para retomarla si se interrumpe (opcional)
 
     Returns:
-        list: Tuples of (line_index, original_doc, new_doc) for erroneous documents.
+        Tupla (documentos con errores, documentos que no pudieron verificarse)
     """
-    extracted_docs = extract_document_ids(merged_books, book_key, field_number)
-    error_docs = detect_invalid_documents(extracted_docs)
-    return build_replacement_entries(extracted_docs, error_docs)
+    plans = list(plans)
+    document_ids = list(
+        dict.fromkeys(
+            document_id for plan in plans for document_id in plan.lines_by_document
+        )
+    )
+    if not document_ids:
+        return set(), set()
+    if len(plans) > 1:
+        planned = sum(len(plan.lines_by_document) for plan in plans)
+        logger.info(
+            f"Consulta AFIP global: {len(document_ids)} documentos distintos para "
+            f"{planned} documentos de {len(plans)} libros"
+        )
 
+    plausible_docs, error_docs = partition_cuits(document_ids)
+    unverified_docs = []
+    if plausible_docs:
+        afip_error_docs, unverified_docs = detect_invalid_documents_with_status(
+            plausible_docs, service, journal
+        )
+        error_docs.extend(afip_error_docs)
+    return {int(doc) for doc in error_docs}, {int(doc) for doc in unverified_docs}
 
-def build_replacement_entries(document_list, error_documents_strings):
+
+def build_plan_replacement_entries(
+    plan: LookupPlan,
+    error_documents: Set[int],
+    unverified_documents: Set[int],
+    field_number: int = 7,
+) -> Tuple[List[Tuple[int, str, str, int]], List[int]]:
+    """
+    Vuelca el resultado de una consulta (propia o global) a las líneas del plan
+    de un libro.
+
+    Args:
+        plan: Plan de consultas del libro
+        error_documents: Documentos con errores
+        unverified_documents: Documentos que no pudieron verificarse
+        field_number: Número del campo que contiene el documento
+
+    Returns:
+        Tupla (lista de tuplas (índice, documento nuevo, documento original, número
+        de campo), líneas cuyo documento no pudo verificarse)
+    """
+    # Sólo se recorren los documentos del libro, no todos los del lote
+    own_error_docs = [doc for doc in plan.lines_by_document if doc in error_documents]
+    own_unverified_docs = [
+        doc for doc in plan.lines_by_document if doc in unverified_documents
+    ]
+    error_lines = plan.lines_for(own_error_docs)
+    entries = build_replacement_entries(
+        [doc for _, doc in error_lines],
+        own_error_docs,
+        field_number=field_number,
+        line_numbers=[line for line, _ in error_lines],
+    )
+    unverified_lines = [line for line, _ in plan.lines_for(own_unverified_docs)]
+    return entries, unverified_lines
+
+
+def build_replacement_entries(
+    document_list,
+    error_documents_strings,
+    first_line: int = 1,
+    field_number: int = 7,
+    line_numbers=None,
+):
     """
     Crea una lista de tuplas que contienen el índice y el documento
     para cada documento que aparece en la lista de documentos con errores.
@@ -48,20 +177,27 @@ def build_replacement_entries(document_list, error_documents_strings):
     Args:
         document_list: Lista completa de documentos (enteros)
         error_documents_strings: Lista de documentos con errores (strings)
+        first_line: Número de línea del primer documento de la lista
+        field_number: Número del campo que contiene el documento
+        line_numbers: Número de línea de cada documento de la lista. Si es None,
+            se asumen líneas consecutivas a partir de first_line.
 
     Returns:
-        Lista de tuplas (índice, documento) para documentos con errores
+        Lista de tuplas (índice, documento nuevo, documento original, número de campo)
+        para documentos con errores
     """
     # Convertir error_documents a un conjunto de enteros para búsqueda eficiente
     error_docs_set = set(int(doc) for doc in error_documents_strings)
 
     indexed_error_documents = []
-    for index, doc in enumerate(document_list):
+    if line_numbers is None:
+        line_numbers = range(first_line, first_line + len(document_list))
+
+    for index, doc in zip(line_numbers, document_list):
         if doc in error_docs_set:
-            index += 1  # Ajustar el índice para que sea 1-based
             original_doc = pad_left(str(doc), 20)
             new_doc = get_replacement_document_id(str(doc))
             # Agregar el índice y el documento a la lista
-            indexed_error_documents.append((index, new_doc, original_doc))
+            indexed_error_documents.append((index, new_doc, original_doc, field_number))
 
     return indexed_error_documents
@@ -4,3 +4,7 @@ class ProcessingError(Exception):
     def __init__(self, message):
         super().__init__(message)
         self.message = message
+
+
+class UnsortedBookError(ProcessingError):
+    """Se lanza cuando un libro no está ordenado por clave de comprobante."""
@@ -1,41 +1,37 @@
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Tuple
 
 from logger import logger
 
 
-def calculate_field_totals(data_dict: Dict[int, Dict], keys_to_sum: List[int]) -> Dict:
+def calculate_field_totals(data_dict: Dict[int, Any], keys_to_sum: List[int]) -> Dict:
     """
     Calcula los totales sumando los valores de campos específicos.
 
+    Los importes son enteros en centavos, por lo que la suma es exacta.
+
     Args:
-        data_dict: Diccionario con los datos de una línea
+        data_dict: Diccionario {número de campo: valor} con los datos de una línea
         keys_to_sum: Lista de claves cuyos valores deben sumarse
 
     Returns:
-        Diccionario actualizado con el total sumado
+        Diccionario actualizado con el total sumado (en centavos)
     """
-    logger.debug(f"Calculando totales para claves: {keys_to_sum}")
     total_sum = 0
     for key in keys_to_sum:
-        if key in data_dict and "value" in data_dict[key]:
-            value = float(data_dict[key]["value"])
-            total_sum += value
-            logger.debug(f"Campo {key}: {value}")
+        if key in data_dict:
+            total_sum += data_dict[key]
         else:
             logger.warning(f"Clave {key} no encontrada para sumar")
 
-    rounded_total = round(total_sum, 2)
-    logger.debug(f"Total calculado: {rounded_total}")
-
     data_dict["summed_amounts"] = {
         "referenced_fields": ", ".join(map(str, keys_to_sum)).strip(),
-        "total": rounded_total,
+        "total": total_sum,
     }
 
     return data_dict
 
 
-def compute_difference(value1: float, value2: float) -> float:
+def compute_difference(value1: int, value2: int) -> int:
     """
     Calcula la diferencia absoluta entre dos valores.
 
@@ -49,16 +45,15 @@ def compute_difference(value1: float, value2: float) -> float:
     return abs(value1 - value2)
 
 
-def is_difference_significant(
-    value1: float, value2: float, threshold: float = 1
-) -> bool:
+def is_difference_significant(value1: int, value2: int, threshold: int = 0) -> bool:
     """
     Verifica si la diferencia entre dos valores excede un umbral.
 
     Args:
-        value1: Primer valor
-        value2: Segundo valor
-        threshold: Umbral de diferencia aceptable
+        value1: Primer valor (centavos)
+        value2: Segundo valor (centavos)
+        threshold: Umbral de diferencia aceptable (centavos). Como los importes
+            se suman en forma exacta, por defecto cualquier diferencia es significativa.
 
     Returns:
         True si la diferencia excede el umbral, False en caso contrario
@@ -67,7 +62,10 @@ def is_difference_significant(
 
 
 def detect_total_differences(
-    merged_dict: Dict[str, Dict], book_key: str, field_number: int = 9
+    merged_dict: Dict[str, Dict],
+    book_key: str,
+    field_number: int = 9,
+    threshold: int = 0,
 ) -> List[Tuple]:
     """
     Encuentra diferencias entre los totales calculados y los valores en un campo específico.
@@ -76,9 +74,11 @@ def detect_total_differences(
         merged_dict: Diccionario fusionado con datos de ambos libros
         book_key: Clave del libro en el que buscar diferencias
         field_number: Número del campo a comparar con el total calculado
+        threshold: Umbral de diferencia aceptable (centavos)
 
     Returns:
-        Lista de tuplas con diferencias encontradas (línea, valor calculado, valor actual)
+        Lista de tuplas con diferencias encontradas (línea, valor calculado, valor actual),
+        con los importes en centavos
     """
     logger.info(f"Buscando diferencias en el campo {field_number} del libro {book_key}")
     differences = []
@@ -90,13 +90,12 @@ def detect_total_differences(
         # Obtener el valor del campo especificado en el libro proporcionado
         field_value = None
         if book_key in value:
-            field_data = value[book_key].get(field_number, {})
-            field_value = float(field_data.get("value", 0))
+            field_value = value[book_key].get(field_number, 0)
 
         # Comparar los valores
         if field_value is not None and total_summed_amount != field_value:
             diff = compute_difference(total_summed_amount, field_value)
-            if is_difference_significant(total_summed_amount, field_value):
+            if is_difference_significant(total_summed_amount, field_value, threshold):
                 logger.debug(
                     f"Diferencia encontrada en línea {key}: calculado={total_summed_amount}, actual={field_value}, diff={diff}"
                 )
@@ -1,19 +1,122 @@
 import os
-from typing import List, Tuple
+import shutil
+from typing import Dict, List, Optional, Tuple
 
+from core.book_reader import BOOK_ENCODING, BookBuffer
+from core.exceptions import ProcessingError
 from logger import logger
+from models.book_utils import retrieve_field_structure
+
+
+def build_output_file_name(file_name: str, output_path: str) -> str:
+    """
+    Genera la ruta del archivo modificado, creando la carpeta de salida si no existe.
+
+    Args:
+        file_name: Ruta al archivo original
+        output_path: Carpeta donde guardar el archivo modificado
+
+    Returns:
+        Ruta del archivo modificado
+    """
+    # Asegurarse de que la carpeta de salida exista
+    if not os.path.isdir(output_path):
+        try:
+            os.makedirs(output_path, exist_ok=True)
+            logger.debug(f"Carpeta de salida creada: {output_path}")
+        except Exception as e:
+            logger.error(f"Error al crear carpeta de salida '{output_path}': {e}")
+            raise
+
+    # Generar nombre del archivo modificado
+    base = os.path.basename(file_name)
+    name, ext = os.path.splitext(base)
+    modified_file_name = os.path.join(output_path, f"{name}_modificated{ext or '.txt'}")
+    logger.debug(f"Nombre del archivo de salida: {modified_file_name}")
+    return modified_file_name
+
+
+def _resolve_field_span(name_of_book: str, field_number: int) -> Tuple[int, int]:
+    """
+    Devuelve la posición (inicio, fin exclusivo) de un campo dentro del registro,
+    según la estructura del libro.
+    """
+    positions = retrieve_field_structure(name_of_book)[field_number]["Posiciones"]
+    return positions[0], positions[-1] + 1
+
+
+def _group_patches(
+    buffer: BookBuffer, list_of_values: List[Tuple]
+) -> Dict[int, List[Tuple[int, bytes]]]:
+    """
+    Convierte las diferencias en parches (posición absoluta, bytes nuevos),
+    agrupados por línea y ordenados por posición.
+
+    Cada parche se valida contra el archivo mapeado: el valor original debe estar
+    exactamente en la posición del campo y el valor nuevo debe tener su mismo
+    ancho. Los que no cumplen se descartan con una advertencia.
+    """
+    total_lines = len(buffer)
+    patches_by_line: Dict[int, List[Tuple[int, bytes]]] = {}
+    for idx, (line_num, new_value, old_value, field_number) in enumerate(
+        list_of_values, start=1
+    ):
+        logger.debug(
+            f"[Item {idx}] Procesando tupla: línea={line_num}, campo={field_number}, "
+            f"old='{old_value}', new='{new_value}'"
+        )
+        line_num = int(line_num)
+        if not 1 <= line_num <= total_lines:
+            logger.warning(
+                f"  ⚠️ Índice fuera de rango: {line_num - 1} (válido: 0–{total_lines - 1})"
+            )
+            continue
+
+        field_start, field_end = _resolve_field_span(buffer.name_of_book, field_number)
+        offset = buffer.line_offset(line_num) + field_start
+        end = buffer.line_offset(line_num) + field_end
+        new_bytes = new_value.encode(BOOK_ENCODING)
+        if len(new_bytes) != field_end - field_start:
+            logger.warning(
+                f"  ⚠️ El valor '{new_value}' no tiene el ancho del campo {field_number} "
+                f"({field_end - field_start}) en línea {line_num}"
+            )
+            continue
+        if buffer.view[offset:end] != old_value.encode(BOOK_ENCODING):
+            logger.warning(
+                f"  ⚠️ No encontrado en línea {line_num}, campo {field_number}: '{old_value}'"
+            )
+            continue
+
+        patches_by_line.setdefault(line_num, []).append((offset, new_bytes))
+        logger.debug(f"  → Reemplazo OK en línea {line_num}")
+
+    for patches in patches_by_line.values():
+        patches.sort()
+    return patches_by_line
 
 
 def write_replacements(
-    list_of_values: List[Tuple], file_name: str, output_path: str
+    list_of_values: List[Tuple],
+    file_name: str,
+    output_path: str,
+    buffer: Optional[BookBuffer] = None,
+    name_of_book: Optional[str] = None,
 ) -> None:
     """
     Reemplaza valores en un archivo según una lista de tuplas con diferencias.
 
+    El archivo original se copia una única vez y luego sólo se sobrescriben, en
+    su posición exacta, los bytes de los campos modificados.
+
     Args:
-        list_of_values: Lista de tuplas con diferencias (línea, valor nuevo, valor original)
+        list_of_values: Lista de tuplas con diferencias
+            (línea, valor nuevo, valor original, número de campo)
         file_name: Ruta al archivo a modificar
         output_path: Ruta donde guardar el archivo modificado
+        buffer: BookBuffer ya abierto sobre el archivo (p. ej. el usado para
+            parsearlo). Si es None, se mapea el archivo.
+        name_of_book: Clave del tipo de libro. Requerida si no se indica buffer.
     """
     logger.info(f"Reemplazando las lineas en el archivo: '{file_name}'")
     logger.debug(
@@ -26,58 +129,28 @@ def write_replacements(
             logger.error(f"El archivo no existe: {file_name}")
             return
 
-        # Leer todas las líneas del archivo
-        logger.debug("Abriendo archivo para lectura")
-        with open(file_name, "r", encoding="ISO-8859-1") as file:
-            lines = file.readlines()
-        logger.debug(f"Archivo leído correctamente: {len(lines)} líneas cargadas")
-
-        # Reemplazar las líneas según los valores de la lista
-        replacements_count = 0
-        for idx, (line_num, new_value, old_value) in enumerate(list_of_values, start=1):
-            logger.debug(
-                f"[Item {idx}] Procesando tupla: línea={line_num}, old='{old_value}', new='{new_value}'"
-            )
-            line_index = int(line_num) - 1
-
-            if 0 <= line_index < len(lines):
-                if old_value in lines[line_index]:
-                    before = lines[line_index].rstrip("\n")
-                    lines[line_index] = lines[line_index].replace(old_value, new_value)
-                    after = lines[line_index].rstrip("\n")
-                    replacements_count += 1
-                    logger.debug(
-                        f"  → Reemplazo OK en línea {line_num}: '{before}'  →  '{after}'"
-                    )
-                else:
-                    logger.warning(
-                        f"  ⚠️ No encontrado en línea {line_num}: '{old_value}'"
-                    )
-            else:
-                logger.warning(
-                    f"  ⚠️ Índice fuera de rango: {line_index} (válido: 0–{len(lines) - 1})"
+        if buffer is None:
+            if name_of_book is None:
+                raise ProcessingError(
+                    "Se requiere el tipo de libro para ubicar los campos a reemplazar."
+                )
+            with BookBuffer(file_name, name_of_book) as own_buffer:
+                return write_replacements(
+                    list_of_values, file_name, output_path, own_buffer
                 )
 
-        # Asegurarse de que la carpeta de salida exista
-        if not os.path.isdir(output_path):
-            try:
-                os.makedirs(output_path, exist_ok=True)
-                logger.debug(f"Carpeta de salida creada: {output_path}")
-            except Exception as e:
-                logger.error(f"Error al crear carpeta de salida '{output_path}': {e}")
-                raise
-
-        # Generar nombre del archivo modificado
-        base = os.path.basename(file_name)
-        name, ext = os.path.splitext(base)
-        modified_file_name = os.path.join(
-            output_path, f"{name}_modificated{ext or '.txt'}"
-        )
-        logger.debug(f"Nombre del archivo de salida: {modified_file_name}")
+        modified_file_name = build_output_file_name(file_name, output_path)
+        patches_by_line = _group_patches(buffer, list_of_values)
 
-        # Escribir las líneas modificadas
-        with open(modified_file_name, "w", encoding="ISO-8859-1") as file:
-            file.writelines(lines)
+        # Copia única del archivo y escritura de los tramos modificados
+        shutil.copyfile(file_name, modified_file_name)
+        replacements_count = 0
+        with open(modified_file_name, "r+b") as file:
+            for line_num in sorted(patches_by_line):
+                for offset, new_bytes in patches_by_line[line_num]:
+                    file.seek(offset)
+                    file.write(new_bytes)
+                    replacements_count += 1
         logger.info(f"Archivo modificado guardado en '{modified_file_name}'")
         logger.info(f"Total de reemplazos realizados: {replacements_count}")
 
@@ -0,0 +1,327 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Set, Tuple
+
+from afip_client.response_cache import DEFAULT_TTL_NOT_FOUND, DEFAULT_TTL_VALID
+from core.book_merger import (
+    JoinKey,
+    aggregate_rows,
+    append_total_sums,
+    build_join_key,
+)
+from core.book_parser import parse_book_record
+from core.book_reader import BookBuffer
+from core.diff_formatter import format_total_differences
+from core.value_extractor import extract_document_entries
+from logger import logger
+from models.book_utils import retrieve_join_key_fields
+
+# Versión del formato del estado; un estado de otra versión se descarta
+STATE_VERSION = 2
+
+DEFAULT_STATE_DIR = os.path.join("cache", "incremental")
+
+
+def hash_record(record: bytes) -> str:
+    """Huella del contenido de un registro (bytes crudos, sin fin de línea)."""
+    return hashlib.blake2b(record, digest_size=16).hexdigest()
+
+
+def combine_hashes(hashes: Iterable[str]) -> str:
+    """Huella de una secuencia de huellas (un comprobante y sus alícuotas)."""
+    return hashlib.blake2b("|".join(hashes).encode("ascii"), digest_size=16).hexdigest()
+
+
+def incremental_state_path(
+    state_dir: str, client: str, period: str, book_key: str
+) -> str:
+    """Ruta del estado incremental de un (cliente, período, libro)."""
+    return os.path.join(state_dir, client, period, f"{book_key}.json")
+
+
+class IncrementalState:
+    """
+    Resultados por línea de la última corrida de un libro, para revalidar sólo
+    lo que cambió.
+
+    Todo se guarda por contenido y no por número de línea, de modo que insertar
+    o borrar líneas no invalida el resto:
+      - join_keys: clave de comprobante de cada huella de registro, por libro.
+      - results: diferencias de totales (sin número de línea) y documento de
+        cada comprobante, por huella combinada del comprobante y su grupo de
+        alícuotas.
+      - verdicts: resultado AFIP de cada documento verificado (True si tiene
+        errores) y momento de la consulta. Vencen con los mismos plazos que las
+        respuestas de la caché AFIP, para no reutilizar un resultado que la
+        caché ya volvería a consultar.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_valid: int = DEFAULT_TTL_VALID,
+        ttl_error: int = DEFAULT_TTL_NOT_FOUND,
+    ) -> None:
+        """
+        Carga el estado de path, si existe, descartando los resultados AFIP
+        vencidos.
+
+        Args:
+            path: Ruta al archivo JSON del estado
+            ttl_valid: Segundos de validez del resultado de un documento sin errores
+            ttl_error: Segundos de validez del resultado de un documento con errores
+        """
+        self.path = path
+        self.ttl_valid = ttl_valid
+        self.ttl_error = ttl_error
+        self.join_keys: Dict[str, Dict[str, JoinKey]] = {}
+        self.results: Dict[str, Dict] = {}
+        self.verdicts: Dict[int, Tuple[bool, float]] = {}
+
+        if not os.path.exists(path):
+            logger.info(f"Sin estado incremental previo en {path}")
+            return
+        try:
+            with open(path, encoding="utf-8") as state_file:
+                data = json.load(state_file)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Estado incremental ilegible en {path}, se descarta: {e}")
+            return
+        if data.get("version") != STATE_VERSION:
+            logger.warning(f"Estado incremental de otra versión en {path}, se descarta")
+            return
+
+        self.join_keys = {
+            book_key: {digest: tuple(key) for digest, key in keys.items()}
+            for book_key, keys in data["join_keys"].items()
+        }
+        self.results = data["results"]
+        now = time.time()
+        self.verdicts = {
+            int(document): (is_error, checked_at)
+            for document, (is_error, checked_at) in data["verdicts"].items()
+            if not self._is_expired(is_error, checked_at, now)
+        }
+        expired = len(data["verdicts"]) - len(self.verdicts)
+        if expired:
+            logger.info(f"Resultados AFIP vencidos en {path}: {expired}")
+
+    def _is_expired(self, is_error: bool, checked_at: float, now: float) -> bool:
+        """Indica si el resultado de un documento superó su plazo de validez."""
+        ttl = self.ttl_error if is_error else self.ttl_valid
+        return now - checked_at >= ttl
+
+    def record_verdicts(
+        self,
+        document_ids: Iterable[int],
+        error_documents: Set[int],
+        unverified_documents: Set[int],
+    ) -> None:
+        """
+        Guarda el resultado de los documentos consultados con el momento de la
+        consulta; los que no pudieron verificarse no se guardan y se consultan
+        en la próxima corrida.
+        """
+        now = time.time()
+        for document_id in document_ids:
+            if document_id not in unverified_documents:
+                self.verdicts[document_id] = (document_id in error_documents, now)
+
+    def save(self) -> None:
+        """Escribe el estado, reemplazando el anterior de forma atómica."""
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as state_file:
+            json.dump(
+                {
+                    "version": STATE_VERSION,
+                    "join_keys": self.join_keys,
+                    "results": self.results,
+                    "verdicts": {
+                        str(document): list(verdict)
+                        for document, verdict in self.verdicts.items()
+                    },
+                },
+                state_file,
+            )
+        os.replace(temp_path, self.path)
+        logger.info(f"Estado incremental guardado en {self.path}")
+
+
+def _parse_line(buffer: BookBuffer, line: int) -> Dict:
+    """Parsea una única línea (1-based) de un libro mapeado."""
+    offset = buffer.line_offset(line)
+    return parse_book_record(
+        buffer.view[offset : offset + buffer.expected_length].tobytes(),
+        buffer.name_of_book,
+    )
+
+
+def _parsed_line(buffer: BookBuffer, parsed: Dict[int, Dict], line: int) -> Dict:
+    """Registro de una línea, reutilizando el ya parseado al calcular su clave."""
+    if line in parsed:
+        return parsed[line]
+    return _parse_line(buffer, line)
+
+
+def _read_line_keys(
+    buffer: BookBuffer,
+    known_keys: Dict[str, JoinKey],
+    parsed: Dict[int, Dict],
+) -> Tuple[List[str], List[JoinKey]]:
+    """
+    Calcula la huella de cada línea y obtiene su clave de comprobante: del
+    estado o de una línea idéntica anterior si la huella ya se conocía, o
+    parseando la línea si no (el registro parseado queda en parsed).
+
+    Returns:
+        Tupla (huellas, claves de comprobante), en el orden de las líneas
+    """
+    key_fields = retrieve_join_key_fields(buffer.name_of_book)
+    known_keys = dict(known_keys)
+    hashes, keys = [], []
+    for line, record in buffer.iter_records():
+        digest = hash_record(record)
+        join_key = known_keys.get(digest)
+        if join_key is None:
+            parsed[line] = parse_book_record(record.tobytes(), buffer.name_of_book)
+            join_key = build_join_key(parsed[line].get(field) for field in key_fields)
+            known_keys[digest] = join_key
+        hashes.append(digest)
+        keys.append(join_key)
+    return hashes, keys
+
+
+def _join_line_keys(
+    keys_1: List[JoinKey], keys_2: List[JoinKey]
+) -> Tuple[Dict[int, List[int]], List[int], List[int]]:
+    """
+    Versión sólo con claves de join_books_by_key: asigna a cada comprobante su
+    grupo de alícuotas con las mismas reglas (un grupo se asigna una sola vez).
+
+    Returns:
+        Tupla (líneas de alícuotas de cada línea de comprobante, huérfanos del
+        libro 1, huérfanos del libro 2)
+    """
+    aggregated: Dict[JoinKey, List[int]] = {}
+    for line, join_key in enumerate(keys_2, start=1):
+        aggregated.setdefault(join_key, []).append(line)
+
+    groups: Dict[int, List[int]] = {}
+    orphans_1: List[int] = []
+    for line, join_key in enumerate(keys_1, start=1):
+        group = aggregated.pop(join_key, None)
+        if group is None:
+            orphans_1.append(line)
+        else:
+            groups[line] = group
+
+    orphans_2 = sorted(line for group in aggregated.values() for line in group)
+    return groups, orphans_1, orphans_2
+
+
+def revalidate_book(
+    book_1_buffer: BookBuffer,
+    book_2_buffer: BookBuffer,
+    state: IncrementalState,
+) -> Tuple[
+    List[Tuple[int, str, str, int]], List[Tuple[int, str, int]], Dict[str, List[int]]
+]:
+    """
+    Equivalente de parseo + fusión + diferencias de totales que sólo parsea y
+    recalcula los comprobantes nuevos o modificados (o cuyo grupo de alícuotas
+    cambió); el resto se toma del estado de la corrida anterior. El estado se
+    actualiza con los resultados de esta corrida.
+
+    Args:
+        book_1_buffer: Libro de comprobantes mapeado
+        book_2_buffer: Libro de alícuotas mapeado
+        state: Estado incremental del libro
+
+    Returns:
+        Tupla (diferencias de totales, documentos por línea (línea, código,
+        número), huérfanos por libro)
+    """
+    book_1_key = book_1_buffer.name_of_book
+    book_2_key = book_2_buffer.name_of_book
+    parsed_1: Dict[int, Dict] = {}
+    parsed_2: Dict[int, Dict] = {}
+    hashes_1, keys_1 = _read_line_keys(
+        book_1_buffer, state.join_keys.get(book_1_key, {}), parsed_1
+    )
+    hashes_2, keys_2 = _read_line_keys(
+        book_2_buffer, state.join_keys.get(book_2_key, {}), parsed_2
+    )
+    groups, orphans_1, orphans_2 = _join_line_keys(keys_1, keys_2)
+
+    # Huella combinada de cada comprobante con su grupo de alícuotas
+    digests = [
+        combine_hashes(
+            [digest] + [hashes_2[line - 1] for line in groups.get(index, [])]
+        )
+        for index, digest in enumerate(hashes_1, start=1)
+    ]
+    # Las líneas idénticas comparten resultado: se recalcula una por huella
+    dirty_by_digest: Dict[str, int] = {}
+    for line, digest in enumerate(digests, start=1):
+        if digest not in state.results:
+            dirty_by_digest.setdefault(digest, line)
+    dirty = list(dirty_by_digest.values())
+    logger.info(
+        f"Revalidación incremental de {book_1_key}: {len(dirty)} de "
+        f"{len(digests)} comprobantes nuevos o modificados"
+    )
+
+    # Recalcular sólo los comprobantes sucios
+    merged = OrderedDict()
+    for line in dirty:
+        entry = OrderedDict()
+        entry[book_1_key] = _parsed_line(book_1_buffer, parsed_1, line)
+        if line in groups:
+            entry[book_2_key] = aggregate_rows(
+                (group_line, _parsed_line(book_2_buffer, parsed_2, group_line))
+                for group_line in groups[line]
+            )
+        merged[str(line)] = entry
+    append_total_sums(merged, book_1_key, book_2_key)
+
+    new_results = {
+        digests[line - 1]: {"differences": [], "document": [document_type, document]}
+        for line, document_type, document in extract_document_entries(
+            merged, book_1_key
+        )
+    }
+    for line, new_value, old_value, field_number in format_total_differences(
+        merged, book_1_key
+    ):
+        new_results[digests[line - 1]]["differences"].append(
+            [new_value, old_value, field_number]
+        )
+
+    # Sólo se conserva lo que corresponde a las líneas actuales
+    results = {digest: state.results.get(digest) for digest in digests}
+    results.update(new_results)
+    state.results = results
+    state.join_keys = {
+        book_1_key: dict(zip(hashes_1, keys_1)),
+        book_2_key: dict(zip(hashes_2, keys_2)),
+    }
+
+    total_diffs = []
+    document_entries = []
+    for line, digest in enumerate(digests, start=1):
+        result = results[digest]
+        for new_value, old_value, field_number in result["differences"]:
+            total_diffs.append((line, new_value, old_value, field_number))
+        document_entries.append((line, result["document"][0], result["document"][1]))
+
+    orphans = {book_1_key: orphans_1, book_2_key: orphans_2}
+    for book_key, lines in orphans.items():
+        if lines:
+            logger.warning(f"Líneas de {book_key} sin contraparte: {len(lines)}")
+    return total_diffs, document_entries, orphans
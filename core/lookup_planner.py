@@ -0,0 +1,107 @@
+from typing import Dict, Iterable, List, Tuple
+
+from logger import logger
+
+# Códigos de la tabla Documentos que corresponden a una clave tributaria
+# (80 CUIT, 86 CUIL, 87 CDI): sólo esos pueden consultarse en `inscription`
+CUIT_DOCUMENT_TYPES = frozenset({"80", "86", "87"})
+
+
+class LookupPlan:
+    """
+    Plan de consultas a AFIP para los documentos de un libro.
+
+    Cada documento se consulta una sola vez, sin importar en cuántas líneas
+    aparezca; el plan conserva las líneas de cada uno para volcar luego los
+    resultados. Los valores no convertibles (0) y los documentos que no son una
+    clave tributaria (DNI, consumidor final, etc.) no se consultan.
+    """
+
+    def __init__(self) -> None:
+        self.lines_by_document: Dict[int, List[int]] = {}
+        self.skipped_by_type: Dict[str, int] = {}
+        self.invalid_count = 0
+
+    @property
+    def document_ids(self) -> List[int]:
+        """Documentos únicos a consultar, en orden de primera aparición."""
+        return list(self.lines_by_document)
+
+    def add(self, line: int, document_type: str, document_id: int) -> None:
+        """
+        Registra el documento de una línea en el plan.
+
+        Args:
+            line: Número de línea
+            document_type: Código de documento (campo "Código de documento")
+            document_id: Número de identificación, o 0 si no pudo convertirse
+        """
+        if not document_id:
+            self.invalid_count += 1
+            return
+        document_type = str(document_type).strip()
+        if document_type not in CUIT_DOCUMENT_TYPES:
+            self.skipped_by_type[document_type] = (
+                self.skipped_by_type.get(document_type, 0) + 1
+            )
+            return
+        self.lines_by_document.setdefault(document_id, []).append(line)
+
+    def lines_for(self, error_documents: Iterable) -> List[Tuple[int, int]]:
+        """
+        Vuelca los documentos con error a todas las líneas que los usan.
+
+        Args:
+            error_documents: Documentos con error devueltos por AFIP (str o int)
+
+        Returns:
+            Lista de tuplas (línea, documento) ordenada por línea
+        """
+        entries = []
+        for document in error_documents:
+            document_id = int(document)
+            for line in self.lines_by_document.get(document_id, []):
+                entries.append((line, document_id))
+        entries.sort()
+        return entries
+
+    def excluding(self, document_ids: Iterable[int]) -> "LookupPlan":
+        """
+        Devuelve un plan sin los documentos indicados (p. ej. los que ya tienen
+        un resultado conocido).
+        """
+        excluded = set(document_ids)
+        plan = LookupPlan()
+        plan.lines_by_document = {
+            document_id: lines
+            for document_id, lines in self.lines_by_document.items()
+            if document_id not in excluded
+        }
+        return plan
+
+
+def build_lookup_plan(entries: Iterable[Tuple[int, str, int]]) -> LookupPlan:
+    """
+    Arma el plan de consultas a partir de los documentos de cada línea.
+
+    Args:
+        entries: Tuplas (línea, código de documento, número de documento)
+
+    Returns:
+        LookupPlan con los documentos únicos a consultar
+    """
+    plan = LookupPlan()
+    total = 0
+    for line, document_type, document_id in entries:
+        plan.add(line, document_type, document_id)
+        total += 1
+
+    skipped = sum(plan.skipped_by_type.values())
+    logger.info(
+        f"Plan de consultas AFIP: {len(plan.lines_by_document)} documentos únicos "
+        f"para {total} líneas (sin valor: {plan.invalid_count}, "
+        f"no CUIT: {skipped})"
+    )
+    if plan.skipped_by_type:
+        logger.debug(f"Líneas no consultadas por tipo: {plan.skipped_by_type}")
+    return plan
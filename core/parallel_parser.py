@@ -0,0 +1,154 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from core.book_parser import parse_book_file, parse_book_record
+from core.exceptions import ProcessingError
+from logger import logger
+from models.book_utils import retrieve_expected_length
+
+# Cantidad mínima de líneas por bloque: por debajo de esto el costo de enviar
+# los resultados entre procesos supera la ganancia
+MIN_CHUNK_LINES = 20000
+# Bloques por proceso, para repartir mejor la carga entre workers
+CHUNKS_PER_WORKER = 4
+
+
+def _detect_terminator(file_name: str, expected_length: int) -> bytes:
+    """
+    Determina el fin de línea del archivo (LF o CRLF) leyendo la primera línea.
+    """
+    with open(file_name, "rb") as file:
+        head = file.read(expected_length + 2)
+    return b"\r\n" if head[expected_length:] == b"\r\n" else b"\n"
+
+
+def _parse_line_range(
+    file_name: str,
+    name_of_book: str,
+    first_line: int,
+    line_count: int,
+    stride: int,
+    terminator: bytes,
+) -> List[Tuple[int, Dict]]:
+    """
+    Procesa un rango de líneas de un archivo. Se ejecuta en un proceso worker.
+
+    Args:
+        file_name: Ruta al archivo a procesar
+        name_of_book: Clave del tipo de libro
+        first_line: Número (1-based) de la primera línea del rango
+        line_count: Cantidad de líneas del rango
+        stride: Longitud en bytes de cada registro, incluido el fin de línea
+        terminator: Fin de línea del archivo
+
+    Returns:
+        Lista de tuplas (número de línea, diccionario con los datos procesados)
+    """
+    with open(file_name, "rb") as file:
+        file.seek((first_line - 1) * stride)
+        data = file.read(line_count * stride)
+    if not data.endswith(b"\n"):
+        data += terminator
+
+    expected_length = stride - len(terminator)
+    results = []
+    for offset in range(0, len(data), stride):
+        index = first_line + offset // stride
+        record = data[offset : offset + stride]
+        if not record.endswith(terminator):
+            error_msg = (
+                f"La longitud de la línea {index} no coincide con la longitud esperada para el libro {name_of_book}. "
+                f"Longitud esperada: {expected_length}"
+            )
+            raise ProcessingError(error_msg)
+        results.append(
+            (index, parse_book_record(record[:expected_length], name_of_book))
+        )
+    return results
+
+
+def parse_book_file_parallel(
+    file_name: str, name_of_book: str, workers: Optional[int] = None
+) -> List[Dict]:
+    """
+    Procesa un archivo de libro IVA repartiendo bloques de líneas entre varios procesos.
+
+    Como los registros son de ancho fijo, los límites de cada bloque se calculan a
+    partir de la longitud esperada del libro sin recorrer el archivo. Los resultados
+    se combinan en el orden original de las líneas.
+
+    Args:
+        file_name: Ruta al archivo a procesar
+        name_of_book: Clave del tipo de libro
+        workers: Cantidad de procesos. Por defecto, la cantidad de CPUs.
+
+    Returns:
+        Lista de diccionarios con los datos procesados, igual que parse_book_file
+    """
+    workers = workers or os.cpu_count() or 1
+    try:
+        expected_length = retrieve_expected_length(name_of_book)
+        terminator = _detect_terminator(file_name, expected_length)
+        file_size = os.path.getsize(file_name)
+    except FileNotFoundError:
+        error_msg = f"No se encontró el archivo {file_name}."
+        logger.error(error_msg)
+        raise ProcessingError(error_msg)
+
+    stride = expected_length + len(terminator)
+    total_lines, remainder = divmod(file_size, stride)
+    if remainder == expected_length:
+        # Última línea sin fin de línea
+        total_lines += 1
+    elif remainder:
+        # El tamaño no es múltiplo del registro: el parseo secuencial indica la línea
+        logger.warning(
+            f"El tamaño de {file_name} no es múltiplo de la longitud de registro. "
+            "Se procesa en forma secuencial."
+        )
+        return parse_book_file(file_name, name_of_book)
+
+    chunk_lines = max(MIN_CHUNK_LINES, -(-total_lines // (workers * CHUNKS_PER_WORKER)))
+    if workers == 1 or total_lines <= chunk_lines:
+        return parse_book_file(file_name, name_of_book)
+
+    logger.info(
+        f"Procesando archivo {file_name} como {name_of_book} "
+        f"({total_lines} líneas, {workers} procesos)"
+    )
+    ranges = [
+        (first_line, min(chunk_lines, total_lines - first_line + 1))
+        for first_line in range(1, total_lines + 1, chunk_lines)
+    ]
+
+    list_of_data = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    _parse_line_range,
+                    file_name,
+                    name_of_book,
+                    first_line,
+                    line_count,
+                    stride,
+                    terminator,
+                )
+                for first_line, line_count in ranges
+            ]
+            for future in futures:
+                list_of_data.extend(
+                    {str(index): calculated_values}
+                    for index, calculated_values in future.result()
+                )
+    except ProcessingError as e:
+        logger.error(f"Error de procesamiento: {e.message}")
+        raise
+    except Exception as e:
+        error_msg = f"Ocurrió un error inesperado: {str(e)}"
+        logger.exception(error_msg)
+        raise ProcessingError(error_msg) from e
+
+    logger.info(f"Archivo procesado. Total de líneas: {len(list_of_data)}")
+    return list_of_data
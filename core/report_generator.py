@@ -1,34 +1,86 @@
 import json
 import os
 from datetime import datetime
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
+from core.book_record import BookRecord
 from core.exceptions import ProcessingError
+from core.report_writer import StreamingReportWriter, check_report_compression
 from logger import logger
 
+REPORT_FORMATS = ("json", "jsonl")
+
+
+def check_report_options(report_format: str, compression: Optional[str]) -> None:
+    """
+    Verifica el formato y la compresión del reporte antes de procesar los
+    libros. La compresión sólo se admite con el formato "jsonl".
+    """
+    if report_format not in REPORT_FORMATS:
+        raise ProcessingError(f"Formato de reporte desconocido: {report_format}")
+    if compression is not None and report_format != "jsonl":
+        raise ProcessingError("La compresión sólo se admite con report_format='jsonl'")
+    check_report_compression(compression)
+
+
+def _json_default(value: Any) -> Any:
+    """Serializa los registros parseados (BookRecord) como diccionarios."""
+    if isinstance(value, BookRecord):
+        return value.to_dict()
+    raise TypeError(f"Objeto no serializable: {type(value).__name__}")
+
 
 def generate_final_report(
     processed_data: Dict[str, Any],
-    difference_tuples: List[Tuple[int, Any, Any]],
+    difference_tuples: List[Tuple[int, Any, Any, int]],
     output_dir: str = None,
     include_summary: bool = True,
+    orphans: Optional[Dict[str, List[int]]] = None,
+    unverified_lines: Optional[List[int]] = None,
+    report_format: str = "json",
+    compression: Optional[str] = None,
 ) -> str:
     """
     Genera un reporte final en formato JSON con:
       - Fecha y hora de ejecución.
       - (Opcional) Resumen de datos procesados.
       - Discrepancias encontradas (si las hay).
+      - (Opcional) Líneas de cada libro sin contraparte en el otro.
+      - (Opcional) Líneas cuyo documento no pudo verificarse en AFIP; si hay
+        alguna, el reporte se marca como incompleto.
+
+    Con report_format="jsonl" el reporte se escribe con StreamingReportWriter
+    (una línea por registro, opcionalmente comprimido) y el resumen sólo
+    contiene totales agregados, no los datos procesados.
 
     Args:
         processed_data: Diccionario con los datos fusionados y procesados.
-        difference_tuples: Lista de tuplas (línea, valor_correcto, valor_actual).
+        difference_tuples: Lista de tuplas (línea, valor_correcto, valor_actual, campo).
         output_dir: Carpeta donde guardar el reporte. Si es None, usa el directorio actual.
         include_summary: Si es True, incluye conteo y datos procesados; si False, sólo diferencias.
+        orphans: Diccionario {clave de libro: [números de línea]} con los registros
+            que no pudieron fusionarse por comprobante.
+        unverified_lines: Líneas cuyo documento quedó sin verificar porque falló
+            la consulta a AFIP.
+        report_format: "json" (un único documento) o "jsonl" (JSON Lines).
+        compression: Para "jsonl": None, "gzip" o "zstd".
 
     Returns:
-        Ruta al archivo JSON generado.
+        Mensaje con el resumen y la ruta al archivo generado.
     """
+    check_report_options(report_format, compression)
     try:
+        if report_format == "jsonl":
+            with StreamingReportWriter(output_dir, compression) as writer:
+                if include_summary:
+                    writer.add_processed(processed_data)
+                writer.write_differences(difference_tuples)
+                if orphans is not None:
+                    writer.write_orphans(orphans)
+                if unverified_lines is not None:
+                    writer.write_unverified(unverified_lines)
+            return writer.message
+
         # Establecer carpeta de salida
         base_dir = output_dir or os.getcwd()
         os.makedirs(base_dir, exist_ok=True)
@@ -46,10 +98,13 @@ def generate_final_report(
 
         # Agregar diferencias
         if difference_tuples:
-            diffs = {
-                line: {"correct_value": correct, "actual_value": actual}
-                for line, correct, actual in difference_tuples
-            }
+            # Una línea puede tener diferencias en más de un campo
+            diffs: Dict[int, Dict[int, Dict[str, Any]]] = {}
+            for line, correct, actual, field_number in difference_tuples:
+                diffs.setdefault(line, {})[field_number] = {
+                    "correct_value": correct,
+                    "actual_value": actual,
+                }
             report["differences"] = {
                 "total": len(difference_tuples),
                 "entries": diffs,
@@ -58,6 +113,29 @@ def generate_final_report(
         else:
             report["differences"] = {"total": 0, "entries": {}}
 
+        # Agregar registros sin contraparte
+        if orphans is not None:
+            report["orphans"] = {
+                book_key: {"total": len(lines), "lines": lines}
+                for book_key, lines in orphans.items()
+            }
+            for book_key, lines in orphans.items():
+                if lines:
+                    msg += f"\nLíneas sin contraparte en {book_key}: {len(lines)}"
+
+        # Agregar documentos sin verificar
+        if unverified_lines is not None:
+            report["complete"] = not unverified_lines
+            report["unverified_documents"] = {
+                "total": len(unverified_lines),
+                "lines": unverified_lines,
+            }
+            if unverified_lines:
+                msg += (
+                    f"\nReporte incompleto: {len(unverified_lines)} líneas sin "
+                    f"verificar en AFIP"
+                )
+
         # Nombre de archivo por fecha
         filename = f"final_report_{datetime.now().strftime('%Y-%m-%d_%H%M%S')}.json"
         file_path = os.path.join(base_dir, filename)
@@ -65,7 +143,7 @@ def generate_final_report(
 
         # Guardar JSON
         with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
+            json.dump(report, f, ensure_ascii=False, indent=2, default=_json_default)
 
         logger.info(f"Reporte generado en {file_path}")
         return msg
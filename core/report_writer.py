@@ -0,0 +1,233 @@
+import gzip
+import io
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.exceptions import ProcessingError
+from logger import logger
+
+try:
+    import zstandard
+except ImportError:  # zstandard es opcional: sólo se requiere para compression="zstd"
+    zstandard = None
+
+# Versión del formato de los registros del reporte JSON Lines
+REPORT_FORMAT_VERSION = 1
+
+# Extensión del archivo según la compresión
+REPORT_EXTENSIONS = {None: ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+
+def check_report_compression(compression: Optional[str]) -> None:
+    """
+    Verifica que la compresión sea conocida y esté disponible, para fallar
+    antes de procesar los libros.
+    """
+    if compression not in REPORT_EXTENSIONS:
+        raise ProcessingError(f"Compresión de reporte desconocida: {compression}")
+    if compression == "zstd" and zstandard is None:
+        raise ProcessingError(
+            "La compresión zstd requiere el paquete zstandard (pip install zstandard)."
+        )
+
+
+def _open_report_file(file_path: str, compression: Optional[str]) -> io.TextIOBase:
+    """Abre el archivo de texto del reporte, comprimido si corresponde."""
+    if compression is None:
+        return open(file_path, "w", encoding="utf-8")
+    if compression == "gzip":
+        return gzip.open(file_path, "wt", encoding="utf-8")
+    raw_file = open(file_path, "wb")
+    return io.TextIOWrapper(
+        zstandard.ZstdCompressor().stream_writer(raw_file), encoding="utf-8"
+    )
+
+
+class StreamingReportWriter:
+    """
+    Reporte final en formato JSON Lines que se escribe mientras el proceso
+    avanza, sin armar el reporte completo en memoria.
+
+    Cada línea es un objeto con un campo "type":
+      - "header": fecha de ejecución y versión del formato (primera línea).
+      - "difference": una diferencia (línea, campo, valor correcto y actual).
+      - "orphans": líneas de un libro sin contraparte en el otro.
+      - "unverified_documents": líneas cuyo documento no pudo verificarse.
+      - "summary": totales agregados (última línea); no incluye los datos
+        procesados línea por línea.
+
+    Uso:
+        with StreamingReportWriter(output_dir, compression="gzip") as writer:
+            writer.add_processed(merged_books, book_key)
+            writer.write_differences(differences)
+        message = writer.message
+    """
+
+    def __init__(
+        self, output_dir: Optional[str] = None, compression: Optional[str] = None
+    ) -> None:
+        """
+        Args:
+            output_dir: Carpeta donde guardar el reporte. Si es None, usa el
+                directorio actual.
+            compression: None, "gzip" o "zstd" (requiere zstandard)
+        """
+        check_report_compression(compression)
+        base_dir = output_dir or os.getcwd()
+        os.makedirs(base_dir, exist_ok=True)
+        filename = (
+            f"final_report_{datetime.now().strftime('%Y-%m-%d_%H%M%S')}"
+            f"{REPORT_EXTENSIONS[compression]}"
+        )
+        self.file_path = os.path.join(base_dir, filename)
+        self.message = ""
+        self._file = _open_report_file(self.file_path, compression)
+
+        self._processed = False
+        self._records = 0
+        self._records_by_book: Dict[str, int] = {}
+        self._total_summed_amount = 0
+        self._declared_total_amount: Optional[int] = None
+        self._differences = 0
+        self._differences_by_field: Dict[int, int] = {}
+        self._lines_with_differences = set()
+        self._orphans: Dict[str, int] = {}
+        self._unverified: Optional[int] = None
+
+        self._write(
+            {
+                "type": "header",
+                "format_version": REPORT_FORMAT_VERSION,
+                "query_date": datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+            }
+        )
+
+    def __enter__(self) -> "StreamingReportWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # El reporte queda sin resumen: no se confunde con uno completo
+            self._file.close()
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False))
+        self._file.write("\n")
+
+    def add_processed(
+        self,
+        merged_books: Dict[str, Any],
+        book_key: Optional[str] = None,
+        field_number: int = 9,
+    ) -> None:
+        """
+        Suma al resumen los comprobantes fusionados de un bloque: cantidad por
+        libro, total calculado y, si se indica book_key, total declarado en su
+        campo field_number (en centavos). Los datos no se escriben.
+        """
+        self._processed = True
+        if book_key is not None and self._declared_total_amount is None:
+            self._declared_total_amount = 0
+        for value in merged_books.values():
+            self._records += 1
+            for key, record in value.items():
+                if key == "total_summed_amount":
+                    self._total_summed_amount += record
+                else:
+                    self._records_by_book[key] = self._records_by_book.get(key, 0) + 1
+            declared = value.get(book_key, {}).get(field_number) if book_key else None
+            if isinstance(declared, int):
+                self._declared_total_amount += declared
+
+    def write_differences(
+        self, difference_tuples: Iterable[Tuple[int, Any, Any, int]]
+    ) -> None:
+        """Escribe diferencias (línea, valor correcto, valor actual, campo)."""
+        for line, correct, actual, field_number in difference_tuples:
+            self._write(
+                {
+                    "type": "difference",
+                    "line": line,
+                    "field": field_number,
+                    "correct_value": correct,
+                    "actual_value": actual,
+                }
+            )
+            self._differences += 1
+            self._differences_by_field[field_number] = (
+                self._differences_by_field.get(field_number, 0) + 1
+            )
+            self._lines_with_differences.add(line)
+
+    def write_orphans(self, orphans: Dict[str, List[int]]) -> None:
+        """Escribe las líneas sin contraparte de cada libro."""
+        for book_key, lines in orphans.items():
+            self._write(
+                {
+                    "type": "orphans",
+                    "book": book_key,
+                    "total": len(lines),
+                    "lines": lines,
+                }
+            )
+            self._orphans[book_key] = self._orphans.get(book_key, 0) + len(lines)
+
+    def write_unverified(self, unverified_lines: List[int]) -> None:
+        """Escribe las líneas cuyo documento no pudo verificarse en AFIP."""
+        self._write(
+            {
+                "type": "unverified_documents",
+                "total": len(unverified_lines),
+                "lines": unverified_lines,
+            }
+        )
+        self._unverified = (self._unverified or 0) + len(unverified_lines)
+
+    def close(self) -> str:
+        """
+        Escribe el resumen agregado, cierra el archivo y devuelve el mensaje
+        para el usuario (el mismo formato que generate_final_report).
+        """
+        summary: Dict[str, Any] = {"type": "summary"}
+        if self._processed:
+            summary["total_records"] = self._records
+            summary["records_by_book"] = self._records_by_book
+            summary["total_summed_amount"] = self._total_summed_amount
+            if self._declared_total_amount is not None:
+                summary["declared_total_amount"] = self._declared_total_amount
+        summary["differences"] = {
+            "total": self._differences,
+            "lines": len(self._lines_with_differences),
+            "by_field": {
+                str(field): count
+                for field, count in sorted(self._differences_by_field.items())
+            },
+        }
+        summary["orphans"] = self._orphans
+        msg = "Resumen del procesamiento:"
+        if self._records:
+            msg += f"\nDatos procesados: {self._records}"
+        if self._differences:
+            msg += f"\nDiferencias encontradas: {self._differences}"
+        for book_key, total in self._orphans.items():
+            if total:
+                msg += f"\nLíneas sin contraparte en {book_key}: {total}"
+        if self._unverified is not None:
+            summary["complete"] = not self._unverified
+            summary["unverified_documents"] = self._unverified
+            if self._unverified:
+                msg += (
+                    f"\nReporte incompleto: {self._unverified} líneas sin "
+                    f"verificar en AFIP"
+                )
+        self._write(summary)
+        self._file.close()
+
+        msg += f"\nRuta del archivo: {self.file_path.replace(os.sep, '/')}"
+        logger.info(f"Reporte generado en {self.file_path}")
+        self.message = msg
+        return msg
@@ -1,5 +1,3 @@
-import math
-
 from logger import logger
 
 
@@ -21,32 +19,22 @@ def pad_left(str_value: str, len_of_str: int) -> str:
     return str_value
 
 
-def format_numeric_string(value: float, len_of_str: int) -> str:
+def format_numeric_string(value: int, len_of_str: int) -> str:
     """
-    Formatea un valor numérico según el formato requerido por AFIP.
+    Formatea un importe en centavos según el formato requerido por AFIP
+    (enteros y decimales sin punto, completado con ceros a la izquierda).
 
     Args:
-        value: Valor numérico a formatear
+        value: Importe en centavos
         len_of_str: Longitud del string resultante
 
     Returns:
         Cadena formateada
     """
     try:
-        # Descomponer el valor en parte decimal y parte entera
-        decimals, integer = math.modf(value)
-
-        # Redondear la parte decimal a dos decimales
-        decimals = abs(round(decimals, 2))
-
-        # Convertir a string y eliminar el punto decimal
-        str_value = f"{int(integer)}{str(decimals)[2:].ljust(2, '0')}"
-
-        # Ajustar a longitud
-        if len(str_value) < len_of_str:
-            str_value = pad_left(str_value, len_of_str)
-
-        return str_value
+        if value < 0:
+            return f"-{pad_left(str(-int(value)), len_of_str - 1)}"
+        return pad_left(str(int(value)), len_of_str)
 
     except (ValueError, TypeError) as e:
         logger.error(f"Error al formatear valor {value}: {e}")
@@ -1,163 +1,184 @@
-from typing import Dict, List, Optional, Tuple, Union
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Tuple, Union
 
+from core.book_reader import BOOK_ENCODING
 from logger import logger
+from models.book_utils import retrieve_field_structure
 
 
-def extract_substring_value(
-    data_string: str, positions: Union[Tuple[int, int], Tuple[int]]
-) -> str:
+def _raw_converter(value: bytes) -> str:
+    """Conversor para campos de texto sin formato especial: decodifica y elimina espacios."""
+    return value.decode(BOOK_ENCODING).strip()
+
+
+def _strip_zeros_converter(value: bytes) -> str:
+    """Conversor para campos completados con ceros a la izquierda."""
+    return value.decode(BOOK_ENCODING).lstrip("0").strip()
+
+
+def _fixed_point_converter(value: bytes) -> Union[int, str]:
+    """
+    Conversor para importes con punto decimal implícito: devuelve el entero tal
+    como está en el archivo, es decir, expresado en unidades del último decimal
+    (centavos para "13 enteros 2 decimales"). La escala de cada campo se obtiene
+    del esquema con get_field_scales(). El valor no se decodifica como texto.
     """
-    Extrae un valor de una cadena según las posiciones especificadas.
+    try:
+        return int(value)
+    except ValueError as e:
+        logger.error(f"Error al convertir importe '{value}': {e}")
+        return value.decode(BOOK_ENCODING).strip()
+
+
+# Clave de la definición de un campo con su cantidad de decimales implícitos;
+# sólo la tienen los importes
+DECIMALS_KEY = "Decimales"
+
+# Conversores según el texto de "Observaciones" de los campos que no son importes
+_OBSERVATION_CONVERTERS: Dict[str, Callable[[bytes], Union[int, str]]] = {
+    "Completar con ceros a la izquierda": _strip_zeros_converter,
+}
+
+
+def _select_converter(field_info: Dict) -> Callable[[bytes], Union[int, str]]:
+    """Elige el conversor de un campo según su definición."""
+    if field_info.get(DECIMALS_KEY) is not None:
+        return _fixed_point_converter
+    return _OBSERVATION_CONVERTERS.get(field_info.get("Observaciones"), _raw_converter)
+
+
+FieldLayout = Tuple[Tuple[int, slice, Callable[[bytes], Union[int, str]]], ...]
+
+
+def compile_field_layout(field_structure: Dict) -> FieldLayout:
+    """
+    Compila la estructura de un libro en una secuencia de (número de campo,
+    slice, conversor), resolviendo una única vez las posiciones y las
+    observaciones de cada campo.
 
     Args:
-        data_string: Cadena de datos
-        positions: Tupla con posiciones de inicio y fin, o solo inicio
+        field_structure: Diccionario que define las posiciones y observaciones de cada campo.
 
     Returns:
-        Valor extraído
+        Tupla con la disposición compilada de los campos
     """
-    try:
-        if len(positions) == 2:
-            start_position, end_position = positions
-            extracted = data_string[start_position : end_position + 1]
-            logger.debug(f"Valor extraído de posiciones {positions}: '{extracted}'")
-            return extracted
-        else:
-            start_position = positions[0]
-            extracted = data_string[start_position]
-            logger.debug(f"Valor extraído de posición {start_position}: '{extracted}'")
-            return extracted
-    except (IndexError, TypeError) as e:
-        logger.error(f"Error al extraer valor de posiciones {positions}: {e}")
-        return ""
-
-
-def format_field_value(value: str, decimal_index: int) -> str:
+    layout = []
+    for field_number, field_info in field_structure.items():
+        positions = field_info["Posiciones"]
+        start_position = positions[0]
+        end_position = positions[-1]
+        converter = _select_converter(field_info)
+        layout.append(
+            (field_number, slice(start_position, end_position + 1), converter)
+        )
+    return tuple(layout)
+
+
+@lru_cache(maxsize=None)
+def get_compiled_layout(name_of_book: str) -> FieldLayout:
     """
-    Formatea un valor añadiendo punto decimal en la posición correcta.
+    Devuelve la disposición compilada de un libro, construyéndola sólo la primera vez.
 
     Args:
-        value: Valor a formatear
-        decimal_index: Índice para la parte decimal
+        name_of_book: Clave del tipo de libro
 
     Returns:
-        Valor formateado
+        Tupla con la disposición compilada de los campos
     """
-    try:
-        value = value.strip()
-        integer_part = value[:-decimal_index]
-        decimal_part = value[-decimal_index:]
-        formatted = f"{int(integer_part)}.{decimal_part}"
-        logger.debug(f"Valor formateado: {value} -> {formatted}")
-        return formatted
-    except (IndexError, ValueError) as e:
-        logger.error(
-            f"Error al formatear valor {value} con índice decimal {decimal_index}: {e}"
-        )
-        return value
+    logger.debug(f"Compilando disposición de campos para {name_of_book}")
+    return compile_field_layout(retrieve_field_structure(name_of_book))
 
 
-def extract_and_format_fields(data_string: str, field_structure: Dict) -> Dict:
+def get_field_names(name_of_book: str) -> Dict[int, str]:
     """
-    Extrae valores de una cadena de acuerdo a una estructura de campo definida, aplicando
-    formateo para los casos de decimales sin punto (13 enteros y 2 decimales, 4 enteros y 6 decimales).
+    Devuelve los nombres de los campos de un libro, indexados por número de campo.
 
     Args:
-        data_string: Cadena de datos que contiene los valores a extraer.
-        field_structure: Diccionario que define las posiciones y observaciones de cada campo.
+        name_of_book: Clave del tipo de libro
 
     Returns:
-        dict: Un diccionario que contiene el número de campo, el nombre y el valor formateado.
+        Diccionario {número de campo: nombre}
     """
-    logger.debug(f"Extrayendo valores de línea de longitud {len(data_string)}")
-    extracted_values = {}
+    return {
+        field_number: field_info["Campo"]
+        for field_number, field_info in retrieve_field_structure(name_of_book).items()
+    }
 
-    for field_number, field_info in field_structure.items():
-        field_positions = field_info["Posiciones"]
-        field_name = field_info["Campo"]
-        field_observations = field_info.get(
-            "Observaciones"
-        )  # Usamos .get() para evitar errores si no hay observaciones
-
-        field_value = extract_substring_value(data_string, field_positions)
-        logger.debug(
-            f"Campo {field_number} ({field_name}): valor extraído '{field_value}'"
-        )
 
-        # Verificamos si hay observaciones que requieren un formato específico
-        if field_observations:
-            decimal_index = None
+def get_field_scales(name_of_book: str) -> Dict[int, int]:
+    """
+    Devuelve la cantidad de decimales implícitos de cada campo de importe de un libro.
 
-            if field_observations == "13 enteros 2 decimales sin punto decimal":
-                decimal_index = 2  # Para valores con 13 enteros y 2 decimales
-            elif field_observations == "4 enteros 6 decimales sin punto decimal":
-                decimal_index = 6  # Para valores con 4 enteros y 6 decimales
-            elif field_observations == "Completar con ceros a la izquierda":
-                field_value = field_value.lstrip("0")
-                logger.debug(
-                    f"Campo {field_number}: eliminando ceros a la izquierda -> '{field_value}'"
-                )
+    Args:
+        name_of_book: Clave del tipo de libro
 
-            if decimal_index is not None:
-                # Formateamos el valor como un número decimal
-                field_value = format_field_value(field_value, decimal_index)
+    Returns:
+        Diccionario {número de campo: decimales}
+    """
+    return {
+        field_number: field_info[DECIMALS_KEY]
+        for field_number, field_info in retrieve_field_structure(name_of_book).items()
+        if field_info.get(DECIMALS_KEY) is not None
+    }
 
-        # Guardamos el resultado en el diccionario de valores extraídos
-        extracted_values[field_number] = {
-            "field_name": field_name,
-            "value": field_value.strip(),
-        }  # Elimina espacios adicionales
 
-    return extracted_values
+def extract_and_format_fields(data_string: bytes, layout: FieldLayout) -> Dict:
+    """
+    Extrae valores de un registro de acuerdo a una disposición de campos compilada. Sólo
+    se decodifican (ISO-8859-1) los campos de texto; los
+    importes con decimales sin punto (13 enteros y 2 decimales, 4 enteros y 6 decimales)
+    se devuelven como enteros en unidades del último decimal (p. ej. centavos).
 
+    Los nombres de los campos no se copian en cada línea: se obtienen del esquema
+    con get_field_names().
 
-def extract_document_ids(
-    merged_dict: Dict, book_key: str, field_number: int = 7
-) -> List[Optional[int]]:
+    Args:
+        data_string: Bytes crudos del registro que contiene los valores a extraer.
+        layout: Disposición compilada con compile_field_layout() o get_compiled_layout().
+
+    Returns:
+        dict: Un diccionario {número de campo: valor}.
+    """
+    return {
+        field_number: converter(data_string[field_slice])
+        for field_number, field_slice, converter in layout
+    }
+
+
+def _to_document_id(value: Any) -> int:
+    """Convierte un número de documento a entero, o 0 si no es numérico."""
+    try:
+        return int(str(value).strip())
+    except (ValueError, TypeError):
+        return 0
+
+
+def extract_document_entries(
+    merged_dict: Dict,
+    book_key: str,
+    field_number: int = 7,
+    type_field_number: int = 6,
+) -> List[Tuple[int, str, int]]:
     """
-    Encuentra documentos en un diccionario fusionado según un campo específico
-    y los devuelve como valores enteros, o None cuando no se pueda convertir.
+    Devuelve, para cada línea del libro, su código y número de documento.
 
     Args:
         merged_dict: Diccionario fusionado con datos de ambos libros
         book_key: Clave del libro en el que buscar documentos
         field_number: Número del campo que contiene los documentos
+        type_field_number: Número del campo con el código de documento
 
     Returns:
-        Lista que contiene enteros o None para los documentos encontrados
+        Lista de tuplas (línea, código de documento, número de documento), con 0
+        como número cuando el valor no puede convertirse
     """
     logger.info(f"Buscando documentos en el campo {field_number} del libro {book_key}")
-    list_of_docs = []
-    count_valid = 0
-    count_invalid = 0
-
-    for key, value in merged_dict.items():
-        # Obtener el valor del campo especificado en el libro proporcionado
-        if book_key in value:
-            field_data = value[book_key].get(field_number, {})
-            field_value = field_data.get("value")
-
-            if field_value is not None:
-                try:
-                    # Intentar convertir a entero, eliminando posibles espacios
-                    doc_id = int(str(field_value).strip())
-                    list_of_docs.append(doc_id)
-                    count_valid += 1
-                    logger.debug(f"Documento encontrado en línea {key}: {doc_id}")
-                except (ValueError, TypeError):
-                    # Si no se puede convertir, agregar None y registrar el error
-                    list_of_docs.append(0)
-                    count_invalid += 1
-                    logger.warning(
-                        f"No se pudo convertir a entero el valor '{field_value}' en línea {key}"
-                    )
-            else:
-                # Si no hay valor, agregar None para mantener correspondencia con índices
-                list_of_docs.append(0)
-                count_invalid += 1
-                logger.debug(f"No se encontró valor en la línea {key}")
-
-    logger.info(
-        f"Total de documentos encontrados: {len(list_of_docs)} (válidos: {count_valid}, inválidos: {count_invalid})"
-    )
-    return list_of_docs
+    return [
+        (
+            int(key),
+            str(value[book_key].get(type_field_number, "")),
+            _to_document_id(value[book_key].get(field_number)),
+        )
+        for key, value in merged_dict.items()
+        if book_key in value
+    ]
@@ -0,0 +1,175 @@
+import glob
+import json
+import os
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+from core.exceptions import ProcessingError
+
+# Carpeta con las definiciones de los libros incluidas en el proyecto
+BOOKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "books")
+
+# Variable de entorno con una carpeta adicional de definiciones (por ejemplo,
+# otros regímenes de información); un libro con la misma clave reemplaza al
+# incluido
+EXTRA_BOOKS_DIR_VARIABLE = "BOOK_DEFINITIONS_DIR"
+
+# Claves obligatorias de cada campo de una definición
+FIELD_KEYS = ("Campo", "Posiciones", "Tipo de Dato", "Longitud", "Observaciones")
+
+
+class BookDefinition:
+    """
+    Definición de un libro de ancho fijo leída de un archivo JSON:
+      - fields: {número de campo: {"Campo", "Posiciones", "Tipo de Dato",
+        "Longitud", "Observaciones" y, para los importes, "Decimales"}}, con
+        la misma forma que tenía el diccionario BOOKS.
+      - record_length: longitud del registro, sin fin de línea.
+      - keys_to_sum: campos cuyos importes se suman para el total.
+      - join_key_fields: campos que identifican al comprobante entre libros.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fields: Dict[int, Dict],
+        record_length: int,
+        keys_to_sum: List[int],
+        join_key_fields: List[int],
+    ) -> None:
+        self.name = name
+        self.fields = fields
+        self.record_length = record_length
+        self.keys_to_sum = keys_to_sum
+        self.join_key_fields = join_key_fields
+
+
+def _definition_error(source: str, detail: str) -> ProcessingError:
+    """Error de una definición de libro, indicando el archivo de origen."""
+    return ProcessingError(f"Definición de libro inválida en {source}: {detail}")
+
+
+def validate_book_definition(definition: BookDefinition, source: str) -> None:
+    """
+    Verifica que los campos de una definición sean contiguos, empiecen en la
+    posición 0, coincidan con su longitud declarada y cubran exactamente el
+    registro, y que los campos a sumar y de clave existan.
+
+    Args:
+        definition: Definición a validar
+        source: Origen de la definición, para el mensaje de error
+
+    Raises:
+        ProcessingError: Si la definición no es consistente
+    """
+    if not definition.fields:
+        raise _definition_error(source, "no define campos")
+
+    next_position = 0
+    for field_number in sorted(definition.fields):
+        field_info = definition.fields[field_number]
+        missing = [key for key in FIELD_KEYS if key not in field_info]
+        if missing:
+            raise _definition_error(
+                source, f"al campo {field_number} le falta {', '.join(missing)}"
+            )
+        positions = field_info["Posiciones"]
+        start_position, end_position = positions[0], positions[-1]
+        if start_position != next_position:
+            raise _definition_error(
+                source,
+                f"el campo {field_number} empieza en {start_position} y se "
+                f"esperaba {next_position} (los campos deben ser contiguos)",
+            )
+        if field_info["Longitud"] != end_position - start_position + 1:
+            raise _definition_error(
+                source,
+                f"el campo {field_number} ocupa {positions} pero declara "
+                f"longitud {field_info['Longitud']}",
+            )
+        next_position = end_position + 1
+
+    if next_position != definition.record_length:
+        raise _definition_error(
+            source,
+            f"los campos ocupan {next_position} posiciones y el registro declara "
+            f"{definition.record_length}",
+        )
+    for key in definition.keys_to_sum:
+        if definition.fields.get(key, {}).get("Decimales") is None:
+            raise _definition_error(
+                source, f"el campo a sumar {key} no existe o no es un importe"
+            )
+    for key in definition.join_key_fields:
+        if key not in definition.fields:
+            raise _definition_error(source, f"el campo de clave {key} no existe")
+
+
+def load_book_definition(path: str) -> BookDefinition:
+    """
+    Lee y valida la definición de un libro desde un archivo JSON.
+
+    Args:
+        path: Ruta al archivo
+
+    Returns:
+        BookDefinition validada
+    """
+    try:
+        with open(path, encoding="utf-8") as definition_file:
+            data = json.load(definition_file)
+        definition = BookDefinition(
+            data["book"],
+            {
+                int(field_number): {
+                    **field_info,
+                    "Posiciones": tuple(field_info["Posiciones"]),
+                }
+                for field_number, field_info in data["fields"].items()
+            },
+            data["record_length"],
+            data.get("keys_to_sum", []),
+            data.get("join_key_fields", []),
+        )
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        raise _definition_error(path, f"{type(e).__name__}: {e}")
+    validate_book_definition(definition, path)
+    return definition
+
+
+def load_book_definitions(directories: Iterable[str]) -> Dict[str, BookDefinition]:
+    """
+    Carga todas las definiciones (*.json) de las carpetas indicadas, en orden;
+    una definición posterior reemplaza a una anterior con la misma clave.
+
+    Args:
+        directories: Carpetas con definiciones de libros
+
+    Returns:
+        Diccionario {clave del libro: BookDefinition}
+    """
+    definitions: Dict[str, BookDefinition] = {}
+    for directory in directories:
+        for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+            definition = load_book_definition(path)
+            definitions[definition.name] = definition
+    return definitions
+
+
+@lru_cache(maxsize=None)
+def get_book_registry() -> Dict[str, BookDefinition]:
+    """
+    Devuelve las definiciones de todos los libros, leyéndolas y validándolas
+    sólo la primera vez: las incluidas en models/books y, si está definida la
+    variable de entorno BOOK_DEFINITIONS_DIR, las de esa carpeta.
+    """
+    directories = [BOOKS_DIR]
+    extra_directory = os.getenv(EXTRA_BOOKS_DIR_VARIABLE)
+    if extra_directory:
+        directories.append(extra_directory)
+    return load_book_definitions(directories)
+
+
+def get_book_definition(name_of_book: str) -> Optional[BookDefinition]:
+    """Devuelve la definición de un libro, o None si no está registrado."""
+    return get_book_registry().get(name_of_book)
@@ -1,35 +1,23 @@
-from .models import BOOKS
+from .book_registry import get_book_definition, get_book_registry
 
 
 def retrieve_keys_to_sum(name_of_book):
-    list_of_keys = []
+    definition = get_book_definition(name_of_book)
+    return list(definition.keys_to_sum) if definition else []
 
-    match name_of_book:
-        case "libro_iva_digital_ventas_cbte":
-            list_of_keys = [10, 11, 12, 13, 14, 15, 16, 21]
-        case "libro_iva_digital_ventas_alicuota":
-            list_of_keys = [4, 6]
-        case "libro_iva_digital_compras_cbte":
-            list_of_keys = [10, 11, 12, 13, 14, 15, 16, 21, 22, 25]
-        case "libro_iva_digital_compras_alicuota":
-            list_of_keys = [6, 8]
 
-    return list_of_keys
+def retrieve_join_key_fields(name_of_book):
+    # Tipo de comprobante, punto de venta y número de comprobante. En compras el
+    # número sólo es único por vendedor, por lo que también se incluye su documento.
+    definition = get_book_definition(name_of_book)
+    return list(definition.join_key_fields) if definition else []
 
 
 def retrieve_field_structure(name_of_book):
-    return BOOKS[name_of_book]
+    # Se lee del registro (no de BOOKS) para ver los libros de BOOK_DEFINITIONS_DIR
+    return get_book_registry()[name_of_book].fields
 
 
 def retrieve_expected_length(name_of_book):
-    len_of_book = 0
-    match name_of_book:
-        case "libro_iva_digital_ventas_cbte":
-            len_of_book = 266
-        case "libro_iva_digital_ventas_alicuota":
-            len_of_book = 62
-        case "libro_iva_digital_compras_cbte":
-            len_of_book = 325
-        case "libro_iva_digital_compras_alicuota":
-            len_of_book = 84
-    return len_of_book
+    definition = get_book_definition(name_of_book)
+    return definition.record_length if definition else 0
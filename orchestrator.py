@@ -1,36 +1,172 @@
-from typing import List, Tuple
+import os
+from collections import OrderedDict
+from contextlib import nullcontext
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-from core.book_merger import merge_and_summarize
+from afip_client.checkpoint import CheckpointJournal
+from afip_client.error_detector import create_afip_service, read_cache_ttls
+from core.book_merger import append_total_sums, iter_sorted_join, join_and_summarize
 from core.book_parser import parse_book_file
-from core.diff_formatter import format_total_differences
-from core.error_document_mapper import detect_and_prepare_error_documents
+from core.book_reader import BookBuffer
+from core.book_sorter import SORT_RUN_LINES, iter_book_by_key
+from core.columnar_export import check_export_format, export_book_comparison
+from core.columnar_parser import (
+    calculate_column_totals,
+    detect_column_differences,
+    extract_column_document_entries,
+    join_column_totals,
+    load_book_columns,
+)
+from core.diff_formatter import format_differences, format_total_differences
+from core.error_document_mapper import (
+    build_plan_replacement_entries,
+    detect_and_prepare_error_documents,
+    lookup_plan_documents,
+    prepare_planned_error_documents,
+)
 from core.exceptions import ProcessingError
 from core.file_writer import write_replacements
-from core.report_generator import generate_final_report
+from core.incremental import (
+    DEFAULT_STATE_DIR,
+    IncrementalState,
+    incremental_state_path,
+    revalidate_book,
+)
+from core.lookup_planner import LookupPlan, build_lookup_plan
+from core.parallel_parser import parse_book_file_parallel
+from core.report_generator import check_report_options, generate_final_report
+from core.report_writer import StreamingReportWriter
+from core.value_extractor import extract_document_entries
 from logger import logger
 
+# Cantidad de líneas procesadas por bloque en el modo streaming
+DEFAULT_STREAM_CHUNK_SIZE = 10000
+
+
+# Sufijo del checkpoint de consultas AFIP que se guarda junto a la salida
+CHECKPOINT_SUFFIX = ".afip_checkpoint.jsonl"
+
+
+def _open_checkpoint(book_file_path: str, output_folder: str) -> CheckpointJournal:
+    """
+    Abre el checkpoint de consultas AFIP del libro; si quedó uno de una corrida
+    interrumpida, sólo se consultan los documentos que faltaron. Se usa como
+    context manager: si la corrida falla antes de _close_checkpoint, el archivo
+    se cierra y se conserva para retomarla. Las respuestas más viejas que el
+    TTL de caché de su resultado se vuelven a consultar.
+    """
+    checkpoint_path = os.path.join(
+        output_folder, os.path.basename(book_file_path) + CHECKPOINT_SUFFIX
+    )
+    return CheckpointJournal(checkpoint_path, **read_cache_ttls())
+
+
+def _close_checkpoint(journal: CheckpointJournal, unverified_lines: List[int]) -> None:
+    """
+    Elimina el checkpoint si todos los documentos se verificaron; si no, lo
+    conserva para que la próxima corrida retome las consultas pendientes.
+    """
+    if unverified_lines:
+        journal.close()
+        logger.warning(
+            f"{len(unverified_lines)} líneas sin verificar en AFIP; el checkpoint "
+            f"{journal.path} se conserva para retomar la corrida."
+        )
+    else:
+        journal.discard()
+
 
 def _gather_differences(
-    merged_books: dict, book_key: str
-) -> List[Tuple[int, str, str]]:
+    merged_books: dict, book_key: str, service=None, journal=None
+) -> Tuple[List[Tuple[int, str, str, int]], List[int]]:
     """
     Combina diferencias de totales y documentos erróneos en una sola lista.
+
+    Returns:
+        Tupla (diferencias, líneas cuyo documento no pudo verificarse en AFIP)
     """
     # Diferencias de totales numéricos
     total_diffs = format_total_differences(merged_books, book_key)
     # Diferencias de documentos (errores AFIP)
-    doc_diffs = detect_and_prepare_error_documents(merged_books, book_key)
-    return total_diffs + doc_diffs
+    doc_diffs, unverified_lines = detect_and_prepare_error_documents(
+        merged_books, book_key, service=service, journal=journal
+    )
+    return total_diffs + doc_diffs, unverified_lines
+
+
+def _gather_columnar_differences(
+    book_1_buffer: BookBuffer,
+    book_2_buffer: BookBuffer,
+    journal=None,
+    service=None,
+) -> Tuple[List[Tuple[int, str, str, int]], Dict[str, List[int]], List[int]]:
+    """
+    Equivalente de parseo + fusión + _gather_differences usando el motor columnar:
+    los totales y las diferencias se calculan como operaciones sobre arreglos, sin
+    materializar un diccionario por línea.
+
+    Returns:
+        Tupla (diferencias, huérfanos por libro, líneas sin verificar en AFIP)
+    """
+    total_diffs, orphans, plan = _plan_columnar_comparison(book_1_buffer, book_2_buffer)
+    # Diferencias de documentos (errores AFIP)
+    doc_diffs, unverified_lines = prepare_planned_error_documents(
+        plan, service=service, journal=journal
+    )
+    return total_diffs + doc_diffs, orphans, unverified_lines
+
+
+def _plan_columnar_comparison(
+    book_1_buffer: BookBuffer,
+    book_2_buffer: BookBuffer,
+) -> Tuple[List[Tuple[int, str, str, int]], Dict[str, List[int]], LookupPlan]:
+    """
+    Parte local de _gather_columnar_differences: diferencias de totales,
+    huérfanos y plan de consultas AFIP del libro 1. Las matrices de registros
+    son vistas sobre los archivos mapeados, sin copiarlos.
+    """
+    book_1_columns = load_book_columns(
+        book_1_buffer.file_name, book_1_buffer.name_of_book, book_1_buffer
+    )
+    book_2_columns = load_book_columns(
+        book_2_buffer.file_name, book_2_buffer.name_of_book, book_2_buffer
+    )
+
+    # Diferencias de totales numéricos
+    book_2_totals, orphans = join_column_totals(book_1_columns, book_2_columns)
+    totals = calculate_column_totals(book_1_columns) + book_2_totals
+    total_diffs = format_differences(detect_column_differences(book_1_columns, totals))
+    plan = build_lookup_plan(extract_column_document_entries(book_1_columns))
+    return total_diffs, orphans, plan
+
+
+def _parse_book(
+    file_path: str,
+    book_key: str,
+    engine: str,
+    workers: Optional[int],
+    buffer: Optional[BookBuffer] = None,
+) -> List[dict]:
+    """
+    Parsea un libro con el motor indicado ("python", "numpy" o "parallel").
+    """
+    if engine == "parallel":
+        return parse_book_file_parallel(file_path, book_key, workers)
+    return parse_book_file(file_path, book_key, engine, buffer)
 
 
 def _apply_differences(
-    differences: List[Tuple[int, str, str]], source_file: str, output_folder: str
+    differences: List[Tuple[int, str, str, int]],
+    source_file: str,
+    output_folder: str,
+    buffer: Optional[BookBuffer] = None,
 ) -> None:
     """
     Escribe las líneas modificadas según las diferencias encontradas.
     """
     logger.info(f"Reemplazando {len(differences)} valores en {source_file}")
-    write_replacements(differences, source_file, output_folder)
+    write_replacements(differences, source_file, output_folder, buffer)
 
 
 def run_book_comparison(
@@ -39,42 +175,503 @@ def run_book_comparison(
     book_2_file_path: str,
     book_2_key: str,
     output_folder_path: str,
+    engine: str = "python",
+    workers: Optional[int] = None,
+    service=None,
+    report_format: str = "json",
+    report_compression: Optional[str] = None,
+    export_format: Optional[str] = None,
 ) -> Tuple[bool, str]:
     """
     Realiza el proceso completo de comparación entre dos libros IVA.
+
+    Con engine="numpy" los libros se procesan en forma columnar (requiere numpy);
+    con engine="parallel" el parseo se reparte entre `workers` procesos. Si se
+    indica `service`, las consultas a AFIP usan ese cliente compartido.
+    report_format y report_compression se pasan a generate_final_report. Con
+    export_format="parquet" o "arrow" (requiere pyarrow) los libros parseados,
+    los totales por comprobante y las diferencias se exportan además como
+    tablas columnares en <output_folder_path>/export.
     """
     logger.info(
         f"Iniciando proceso de unificación y fix sobre: {book_1_key} y {book_2_key}"
     )
+    check_report_options(report_format, report_compression)
+    check_export_format(export_format)
+    if export_format is not None and engine == "numpy":
+        raise ProcessingError(
+            "La exportación columnar requiere el motor python o parallel."
+        )
 
     try:
-        # Parseo de archivos
-        book_1_lines = parse_book_file(book_1_file_path, book_1_key)
-        book_2_lines = parse_book_file(book_2_file_path, book_2_key)
-
-        # Validación de longitud
-        if len(book_1_lines) != len(book_2_lines):
-            diff = abs(len(book_1_lines) - len(book_2_lines))
-            msg = (
-                f"Longitudes difieren en {diff} líneas: "
-                f"{book_1_key} tiene {len(book_1_lines)}, "
-                f"{book_2_key} tiene {len(book_2_lines)}."
+        with _open_checkpoint(book_1_file_path, output_folder_path) as journal:
+            # El mismo archivo mapeado se usa para parsear y para escribir el libro 1
+            with BookBuffer(book_1_file_path, book_1_key) as book_1_buffer:
+                if engine == "numpy":
+                    merged = {}
+                    with BookBuffer(book_2_file_path, book_2_key) as book_2_buffer:
+                        differences, orphans, unverified_lines = (
+                            _gather_columnar_differences(
+                                book_1_buffer, book_2_buffer, journal, service
+                            )
+                        )
+                else:
+                    # Parseo de archivos
+                    book_1_lines = _parse_book(
+                        book_1_file_path, book_1_key, engine, workers, book_1_buffer
+                    )
+                    book_2_lines = _parse_book(
+                        book_2_file_path, book_2_key, engine, workers
+                    )
+
+                    # Fusión por comprobante y cálculo
+                    merged, orphans = join_and_summarize(
+                        book_1_lines, book_2_lines, book_1_key, book_2_key
+                    )
+
+                    # Recolectar diferencias
+                    differences, unverified_lines = _gather_differences(
+                        merged, book_1_key, service, journal
+                    )
+
+                    if export_format is not None:
+                        export_book_comparison(
+                            output_folder_path,
+                            book_1_lines,
+                            book_2_lines,
+                            merged,
+                            differences,
+                            book_1_key,
+                            book_2_key,
+                            export_format,
+                        )
+
+                # Aplicar diferencias
+                if differences:
+                    _apply_differences(
+                        differences, book_1_file_path, output_folder_path, book_1_buffer
+                    )
+                else:
+                    logger.info("No se encontraron diferencias entre los libros.")
+
+            # Generar reporte final
+            message = generate_final_report(
+                merged,
+                differences,
+                output_folder_path,
+                False,
+                orphans,
+                unverified_lines,
+                report_format,
+                report_compression,
             )
-            logger.error(msg)
-            raise ProcessingError(msg)
+            _close_checkpoint(journal, unverified_lines)
+        logger.info(f"Proceso completado exitosamente\n{'-' * 50}")
+        return True, message
+
+    except ProcessingError as e:
+        logger.error(f"Error de procesamiento: {e.message}")
+        raise
+    except Exception as e:
+        msg = f"Error inesperado: {e}"
+        logger.exception(msg)
+        raise ProcessingError(msg)
+
+
+def _iter_chunks(iterable: Iterable, chunk_size: int) -> Iterator[list]:
+    """
+    Divide un iterable en listas de, como máximo, chunk_size elementos.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _iter_merged_chunks(
+    book_1_buffer: BookBuffer,
+    book_2_buffer: BookBuffer,
+    book_1_key: str,
+    book_2_key: str,
+    orphans: Dict[str, List[int]],
+    chunk_size: int,
+    temp_dir: Optional[str],
+    sort_run_lines: int = SORT_RUN_LINES,
+) -> Iterator[OrderedDict]:
+    """
+    Fusiona los libros con un sort-merge join y produce, para cada bloque de
+    chunk_size comprobantes, sus entradas fusionadas con los totales calculados.
+    Los huérfanos se acumulan en orphans. Un libro desordenado se ordena
+    externamente en bloques de sort_run_lines registros.
+    """
+    joined_entries = iter_sorted_join(
+        iter_book_by_key(book_1_buffer, sort_run_lines, temp_dir),
+        iter_book_by_key(book_2_buffer, sort_run_lines, temp_dir),
+        book_1_key,
+        book_2_key,
+        orphans,
+    )
+    for chunk in _iter_chunks(joined_entries, chunk_size):
+        yield append_total_sums(OrderedDict(chunk), book_1_key, book_2_key)
+
+
+def run_book_comparison_streaming(
+    book_1_file_path: str,
+    book_1_key: str,
+    book_2_file_path: str,
+    book_2_key: str,
+    output_folder_path: str,
+    chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+    temp_dir: Optional[str] = None,
+    service=None,
+    report_format: str = "json",
+    report_compression: Optional[str] = None,
+    sort_run_lines: int = SORT_RUN_LINES,
+) -> Tuple[bool, str]:
+    """
+    Variante de run_book_comparison que fusiona los libros con un sort-merge join.
+
+    Recorre ambos libros a la par en orden de comprobante, en bloques de
+    chunk_size comprobantes: para cada bloque calcula totales y detecta
+    diferencias (incluida la validación AFIP). Sólo las diferencias se conservan
+    en memoria; al final se aplican sobre una copia del primer libro. Si algún
+    libro no está ordenado por comprobante, se ordena externamente usando
+    archivos temporales en temp_dir, de sort_run_lines registros cada uno. Si
+    no se indica `service`, se crea un cliente AFIP para toda la corrida.
+
+    Con report_format="jsonl" el reporte se escribe bloque a bloque con
+    StreamingReportWriter (comprimido si se indica report_compression, "gzip"
+    o "zstd") y su resumen sólo contiene totales agregados.
+    """
+    logger.info(
+        f"Iniciando proceso streaming sobre: {book_1_key} y {book_2_key} "
+        f"(bloques de {chunk_size} comprobantes)"
+    )
+
+    check_report_options(report_format, report_compression)
+
+    try:
+        if service is None:
+            try:
+                service = create_afip_service()
+            except Exception as e:
+                logger.error(f"No se pudo crear el cliente AFIP compartido: {e}")
+
+        with _open_checkpoint(book_1_file_path, output_folder_path) as journal:
+            differences: List[Tuple[int, str, str, int]] = []
+            unverified_lines: List[int] = []
+            orphans: Dict[str, List[int]] = {}
+            total_entries = 0
+            with BookBuffer(book_1_file_path, book_1_key) as book_1_buffer, BookBuffer(
+                book_2_file_path, book_2_key
+            ) as book_2_buffer, (
+                StreamingReportWriter(output_folder_path, report_compression)
+                if report_format == "jsonl"
+                else nullcontext()
+            ) as report_writer:
+                for merged in _iter_merged_chunks(
+                    book_1_buffer,
+                    book_2_buffer,
+                    book_1_key,
+                    book_2_key,
+                    orphans,
+                    chunk_size,
+                    temp_dir,
+                    sort_run_lines,
+                ):
+                    # Diferencias del bloque
+                    chunk_diffs, chunk_unverified = _gather_differences(
+                        merged, book_1_key, service, journal
+                    )
+                    differences.extend(chunk_diffs)
+                    unverified_lines.extend(chunk_unverified)
+                    total_entries += len(merged)
+                    if report_writer is not None:
+                        report_writer.add_processed(merged, book_1_key)
+                        report_writer.write_differences(chunk_diffs)
 
-        # Fusión y cálculo
-        merged = merge_and_summarize(book_1_lines, book_2_lines, book_1_key, book_2_key)
+                logger.info(f"Comprobantes procesados: {total_entries}")
+                # Aplicar diferencias
+                if differences:
+                    _apply_differences(
+                        differences, book_1_file_path, output_folder_path, book_1_buffer
+                    )
+                else:
+                    logger.info("No se encontraron diferencias entre los libros.")
 
-        # Recolectar y aplicar diferencias
-        differences = _gather_differences(merged, book_1_key)
+                if report_writer is not None:
+                    report_writer.write_orphans(orphans)
+                    report_writer.write_unverified(sorted(unverified_lines))
+
+            # Generar reporte final
+            if report_writer is not None:
+                message = report_writer.message
+            else:
+                message = generate_final_report(
+                    {},
+                    differences,
+                    output_folder_path,
+                    False,
+                    orphans,
+                    sorted(unverified_lines),
+                )
+            _close_checkpoint(journal, unverified_lines)
+        logger.info(f"Proceso completado exitosamente\n{'-' * 50}")
+        return True, message
+
+    except ProcessingError as e:
+        logger.error(f"Error de procesamiento: {e.message}")
+        raise
+    except Exception as e:
+        msg = f"Error inesperado: {e}"
+        logger.exception(msg)
+        raise ProcessingError(msg)
+
+
+class PreparedComparison:
+    """
+    Resultado de la primera fase de una comparación en dos fases: diferencias
+    de totales, huérfanos y plan de consultas AFIP del libro 1. No conserva los
+    libros parseados, de modo que pueden prepararse muchos pares a la vez.
+    """
+
+    def __init__(
+        self,
+        book_1_file_path: str,
+        book_1_key: str,
+        output_folder_path: str,
+        total_differences: List[Tuple[int, str, str, int]],
+        orphans: Dict[str, List[int]],
+        plan: LookupPlan,
+    ) -> None:
+        self.book_1_file_path = book_1_file_path
+        self.book_1_key = book_1_key
+        self.output_folder_path = output_folder_path
+        self.total_differences = total_differences
+        self.orphans = orphans
+        self.plan = plan
+
+
+def prepare_book_comparison(
+    book_1_file_path: str,
+    book_1_key: str,
+    book_2_file_path: str,
+    book_2_key: str,
+    output_folder_path: str,
+    engine: str = "python",
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+    temp_dir: Optional[str] = None,
+    sort_run_lines: int = SORT_RUN_LINES,
+) -> PreparedComparison:
+    """
+    Primera fase de la comparación en dos fases: parsea y fusiona los libros,
+    calcula las diferencias de totales y arma el plan de consultas AFIP, sin
+    consultar a AFIP.
+
+    Los documentos de los planes de varios pares se consultan juntos con
+    lookup_plan_documents (core/error_document_mapper.py) y el resultado se
+    vuelca a cada par con finish_book_comparison. engine admite los motores de
+    run_book_comparison y "streaming" (sort-merge join en bloques de
+    chunk_size comprobantes, con ordenamiento externo en bloques de
+    sort_run_lines registros).
+    """
+    logger.info(f"Preparando comparación de {book_1_file_path} y {book_2_file_path}")
+
+    try:
+        if engine == "numpy":
+            with BookBuffer(book_1_file_path, book_1_key) as book_1_buffer, BookBuffer(
+                book_2_file_path, book_2_key
+            ) as book_2_buffer:
+                total_diffs, orphans, plan = _plan_columnar_comparison(
+                    book_1_buffer, book_2_buffer
+                )
+        elif engine == "streaming":
+            total_diffs = []
+            document_entries = []
+            orphans = {}
+            with BookBuffer(book_1_file_path, book_1_key) as book_1_buffer, BookBuffer(
+                book_2_file_path, book_2_key
+            ) as book_2_buffer:
+                for merged in _iter_merged_chunks(
+                    book_1_buffer,
+                    book_2_buffer,
+                    book_1_key,
+                    book_2_key,
+                    orphans,
+                    chunk_size,
+                    temp_dir,
+                    sort_run_lines,
+                ):
+                    total_diffs.extend(format_total_differences(merged, book_1_key))
+                    document_entries.extend(
+                        extract_document_entries(merged, book_1_key)
+                    )
+            plan = build_lookup_plan(document_entries)
+        else:
+            book_1_lines = _parse_book(book_1_file_path, book_1_key, engine, workers)
+            book_2_lines = _parse_book(book_2_file_path, book_2_key, engine, workers)
+            merged, orphans = join_and_summarize(
+                book_1_lines, book_2_lines, book_1_key, book_2_key
+            )
+            total_diffs = format_total_differences(merged, book_1_key)
+            plan = build_lookup_plan(extract_document_entries(merged, book_1_key))
+
+        return PreparedComparison(
+            book_1_file_path,
+            book_1_key,
+            output_folder_path,
+            total_diffs,
+            orphans,
+            plan,
+        )
+
+    except ProcessingError as e:
+        logger.error(f"Error de procesamiento: {e.message}")
+        raise
+    except Exception as e:
+        msg = f"Error inesperado: {e}"
+        logger.exception(msg)
+        raise ProcessingError(msg)
+
+
+def finish_book_comparison(
+    prepared: PreparedComparison,
+    error_documents: Set[int],
+    unverified_documents: Set[int],
+) -> Tuple[bool, str]:
+    """
+    Segunda fase de la comparación en dos fases: vuelca el resultado de la
+    consulta AFIP a las líneas del par, aplica todas las diferencias sobre una
+    copia del libro 1 y genera el reporte final.
+
+    Args:
+        prepared: Resultado de prepare_book_comparison
+        error_documents: Documentos con errores (de la consulta global)
+        unverified_documents: Documentos que no pudieron verificarse
+    """
+    try:
+        doc_diffs, unverified_lines = build_plan_replacement_entries(
+            prepared.plan, error_documents, unverified_documents
+        )
+        differences = prepared.total_differences + doc_diffs
+
+        # Aplicar diferencias
         if differences:
-            _apply_differences(differences, book_1_file_path, output_folder_path)
+            with BookBuffer(
+                prepared.book_1_file_path, prepared.book_1_key
+            ) as book_1_buffer:
+                _apply_differences(
+                    differences,
+                    prepared.book_1_file_path,
+                    prepared.output_folder_path,
+                    book_1_buffer,
+                )
         else:
             logger.info("No se encontraron diferencias entre los libros.")
 
         # Generar reporte final
-        message = generate_final_report(merged, differences, output_folder_path, False)
+        message = generate_final_report(
+            {},
+            differences,
+            prepared.output_folder_path,
+            False,
+            prepared.orphans,
+            unverified_lines,
+        )
+        logger.info(f"Proceso completado exitosamente\n{'-' * 50}")
+        return True, message
+
+    except ProcessingError as e:
+        logger.error(f"Error de procesamiento: {e.message}")
+        raise
+    except Exception as e:
+        msg = f"Error inesperado: {e}"
+        logger.exception(msg)
+        raise ProcessingError(msg)
+
+
+def run_book_comparison_incremental(
+    book_1_file_path: str,
+    book_1_key: str,
+    book_2_file_path: str,
+    book_2_key: str,
+    output_folder_path: str,
+    client: str,
+    period: str,
+    state_dir: str = DEFAULT_STATE_DIR,
+    service=None,
+) -> Tuple[bool, str]:
+    """
+    Variante de run_book_comparison para reenvíos de un mismo libro: guarda por
+    (cliente, período, libro) la huella y los resultados de cada línea, y en la
+    corrida siguiente sólo parsea y recalcula los comprobantes nuevos o
+    modificados. Las diferencias de totales y los resultados AFIP del resto se
+    reutilizan; sólo se consultan los documentos sin resultado conocido.
+
+    El libro corregido y el reporte son los mismos que los de run_book_comparison.
+    """
+    logger.info(
+        f"Iniciando proceso incremental sobre: {book_1_key} y {book_2_key} "
+        f"(cliente {client}, período {period})"
+    )
+
+    try:
+        # Los resultados AFIP guardados vencen con los plazos de la caché; un
+        # documento con errores puede ser "no encontrado" o tener otro error,
+        # por lo que se usa el menor de ambos plazos
+        ttls = read_cache_ttls()
+        state = IncrementalState(
+            incremental_state_path(state_dir, client, period, book_1_key),
+            ttl_valid=ttls["ttl_valid"],
+            ttl_error=min(ttls["ttl_not_found"], ttls["ttl_error"]),
+        )
+        with _open_checkpoint(book_1_file_path, output_folder_path) as journal:
+            with BookBuffer(book_1_file_path, book_1_key) as book_1_buffer, BookBuffer(
+                book_2_file_path, book_2_key
+            ) as book_2_buffer:
+                total_diffs, document_entries, orphans = revalidate_book(
+                    book_1_buffer, book_2_buffer, state
+                )
+
+                # Sólo se consultan los documentos sin resultado vigente de corridas
+                # anteriores
+                plan = build_lookup_plan(document_entries)
+                known_docs = [doc for doc in plan.document_ids if doc in state.verdicts]
+                pending_plan = plan.excluding(known_docs)
+                logger.info(
+                    f"Documentos con resultado AFIP reutilizado: {len(known_docs)}, "
+                    f"a consultar: {len(pending_plan.document_ids)}"
+                )
+                error_docs, unverified_docs = lookup_plan_documents(
+                    [pending_plan], service, journal
+                )
+                state.record_verdicts(
+                    pending_plan.document_ids, error_docs, unverified_docs
+                )
+                error_docs |= {doc for doc in known_docs if state.verdicts[doc][0]}
+                doc_diffs, unverified_lines = build_plan_replacement_entries(
+                    plan, error_docs, unverified_docs
+                )
+                differences = total_diffs + doc_diffs
+
+                # Aplicar diferencias
+                if differences:
+                    _apply_differences(
+                        differences, book_1_file_path, output_folder_path, book_1_buffer
+                    )
+                else:
+                    logger.info("No se encontraron diferencias entre los libros.")
+
+            state.save()
+
+            # Generar reporte final
+            message = generate_final_report(
+                {}, differences, output_folder_path, False, orphans, unverified_lines
+            )
+            _close_checkpoint(journal, unverified_lines)
         logger.info(f"Proceso completado exitosamente\n{'-' * 50}")
         return True, message
 
@@ -0,0 +1,134 @@
+import glob
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import pytest
+
+from core.book_parser import parse_book_record
+from models.book_utils import retrieve_expected_length, retrieve_field_structure
+
+VENTAS_CBTE = "libro_iva_digital_ventas_cbte"
+VENTAS_ALICUOTA = "libro_iva_digital_ventas_alicuota"
+
+# CUIT con dígito verificador correcto: AFIP responde que el segundo no existe
+VALID_CUIT = 20111111112
+INVALID_CUIT = 20222222223
+
+
+class FakeService:
+    """
+    Cliente AFIP que responde sin red y anota los documentos consultados. Como
+    el cliente real, no consulta los documentos ya registrados en el checkpoint.
+    """
+
+    cache = None
+
+    def __init__(self, invalid=(INVALID_CUIT,)):
+        self.invalid = set(invalid)
+        self.queried = []
+
+    def fetch_service_data_with_failures(self, service_name, person_ids, journal=None):
+        records = {}
+        if journal is not None:
+            records, person_ids = journal.split(service_name, person_ids)
+        self.queried.extend(person_ids)
+        fetched = {}
+        for person_id in person_ids:
+            if person_id in self.invalid:
+                error = {"error": ["No existe persona con ese Id"]}
+                fetched[str(person_id)] = {"errorConstancia": error}
+            else:
+                fetched[str(person_id)] = {"datosGenerales": {"nombre": "X"}}
+        if journal is not None and person_ids:
+            journal.record_chunk(service_name, person_ids, fetched)
+        records.update(fetched)
+        return records, []
+
+
+def build_record(
+    name_of_book: str, values: Optional[Dict[int, Union[int, str]]] = None
+) -> bytes:
+    """
+    Arma un registro de ancho fijo de un libro. Los enteros se completan con
+    ceros a la izquierda y los textos con espacios a la derecha; los campos no
+    indicados quedan en cero (numéricos) o en blanco.
+    """
+    values = values or {}
+    parts = []
+    for field_number, field_info in retrieve_field_structure(name_of_book).items():
+        width = field_info["Longitud"]
+        value = values.get(field_number)
+        if value is None:
+            if field_info["Observaciones"] == "AAAAMMDD":
+                value = "20240131"
+            elif field_info["Tipo de Dato"] == "Numérico":
+                value = 0
+            else:
+                value = ""
+        text = str(value).zfill(width) if isinstance(value, int) else value.ljust(width)
+        assert len(text) == width, (field_number, text)
+        parts.append(text)
+    record = "".join(parts).encode("ISO-8859-1")
+    assert len(record) == retrieve_expected_length(name_of_book)
+    return record
+
+
+def cbte(
+    number: int,
+    total: int,
+    exempt: int = 0,
+    point_of_sale: int = 1,
+    document: int = VALID_CUIT,
+) -> bytes:
+    """Comprobante de ventas (tipo 1) con total declarado, importe exento y CUIT."""
+    return build_record(
+        VENTAS_CBTE,
+        {
+            2: 1,
+            3: point_of_sale,
+            4: number,
+            6: 80,
+            7: document,
+            9: total,
+            12: exempt,
+        },
+    )
+
+
+def alicuota(number: int, net: int, tax: int, point_of_sale: int = 1) -> bytes:
+    """Alícuota de ventas (tipo 1) con neto gravado e impuesto liquidado."""
+    return build_record(
+        VENTAS_ALICUOTA, {1: 1, 2: point_of_sale, 3: number, 4: net, 5: 5, 6: tax}
+    )
+
+
+def parse_records(records: Iterable[bytes], name_of_book: str) -> List[Dict]:
+    """Lista con la misma estructura que devuelve parse_book_file."""
+    return [
+        {str(line): parse_book_record(record, name_of_book)}
+        for line, record in enumerate(records, start=1)
+    ]
+
+
+def write_book(path, records: Iterable[bytes], terminator: bytes = b"\r\n") -> str:
+    """Escribe un libro con el fin de línea indicado y devuelve su ruta."""
+    path.write_bytes(b"".join(record + terminator for record in records))
+    return str(path)
+
+
+def read_outputs(output_folder: str) -> Tuple[Dict, Optional[bytes]]:
+    """Reporte JSON (sin la fecha de consulta) y libro corregido de una corrida."""
+    (report_path,) = glob.glob(os.path.join(output_folder, "final_report_*.json"))
+    with open(report_path, encoding="utf-8") as report_file:
+        report = json.load(report_file)
+    report.pop("query_date")
+    modified = glob.glob(os.path.join(output_folder, "*_modificated.txt"))
+    book = open(modified[0], "rb").read() if modified else None
+    return report, book
+
+
+@pytest.fixture(autouse=True)
+def _work_in_tmp_path(tmp_path, monkeypatch):
+    # Salidas, checkpoints y estados de cada prueba quedan en su carpeta temporal
+    monkeypatch.chdir(tmp_path)
@@ -0,0 +1,127 @@
+import time
+
+import pytest
+
+from afip_client.adaptive_controller import AdaptiveController, parse_retry_after
+
+
+def _controller(**kwargs):
+    options = {"window": 2, "target_latency": 1.0}
+    options.update(kwargs)
+    return AdaptiveController(100, 4, **options)
+
+
+def _record_window(controller, latency=0.1, success=True, status_code=None):
+    for _ in range(controller.window):
+        controller.record(time.monotonic(), latency, success, status_code)
+
+
+def test_default_bounds_span_a_range_around_the_initial_values():
+    controller = AdaptiveController(100, 4)
+    assert (controller.min_chunk_size, controller.max_chunk_size) == (20, 500)
+    assert (controller.chunk_size, controller.concurrency) == (100, 4)
+
+
+def test_healthy_windows_grow_chunk_size_and_concurrency():
+    controller = _controller(max_concurrency=8)
+    step = controller.chunk_step
+    assert step > 0
+
+    _record_window(controller)
+    assert (controller.chunk_size, controller.concurrency) == (100 + step, 5)
+    _record_window(controller)
+    assert (controller.chunk_size, controller.concurrency) == (100 + 2 * step, 6)
+
+
+def test_incomplete_window_does_not_change_the_load():
+    controller = _controller(window=3, max_concurrency=8)
+    controller.record(time.monotonic(), 0.1, True)
+    controller.record(time.monotonic(), 0.1, True)
+    assert (controller.chunk_size, controller.concurrency) == (100, 4)
+
+
+@pytest.mark.parametrize("status_code", [429, 500, 503])
+def test_throttling_response_halves_the_load(status_code):
+    controller = _controller()
+    controller.record(time.monotonic(), 0.1, False, status_code)
+    assert (controller.chunk_size, controller.concurrency) == (50, 2)
+
+
+def test_slow_window_halves_the_load():
+    controller = _controller()
+    _record_window(controller, latency=2.0)
+    assert (controller.chunk_size, controller.concurrency) == (50, 2)
+
+
+def test_failing_window_halves_the_load():
+    controller = _controller()
+    _record_window(controller, success=False)
+    assert (controller.chunk_size, controller.concurrency) == (50, 2)
+
+
+def test_requests_started_before_a_decrease_are_not_counted_again():
+    controller = _controller()
+    started_at = time.monotonic()
+    controller.record(started_at, 0.1, False, 429)
+    controller.record(started_at, 0.1, False, 503)
+    assert (controller.chunk_size, controller.concurrency) == (50, 2)
+
+
+def test_load_stays_within_its_bounds():
+    controller = _controller(
+        min_chunk_size=40, max_chunk_size=120, min_concurrency=2, max_concurrency=5
+    )
+    for _ in range(50):
+        _record_window(controller)
+    assert (controller.chunk_size, controller.concurrency) == (120, 5)
+
+    for _ in range(10):
+        controller.record(time.monotonic(), 0.1, False, 429)
+        time.sleep(0.001)
+    assert (controller.chunk_size, controller.concurrency) == (40, 2)
+
+
+def test_initial_values_are_clamped_to_the_bounds():
+    controller = AdaptiveController(
+        1000, 10, min_chunk_size=10, max_chunk_size=200, max_concurrency=3
+    )
+    assert (controller.chunk_size, controller.concurrency) == (200, 3)
+
+
+def test_equal_bounds_keep_the_chunk_size_fixed():
+    controller = _controller(min_chunk_size=100, max_chunk_size=100)
+    _record_window(controller)
+    controller.record(time.monotonic(), 0.1, False, 429)
+    assert controller.chunk_size == 100
+
+
+def test_retry_after_pauses_every_worker():
+    controller = _controller()
+    assert controller.pause_remaining() == 0
+
+    controller.pause(0.2)
+    assert 0 < controller.pause_remaining() <= 0.2
+    # Una pausa más corta no acorta la vigente
+    controller.pause(0.01)
+    assert controller.pause_remaining() > 0.1
+
+    started_at = time.monotonic()
+    controller.wait_if_paused()
+    assert time.monotonic() - started_at >= 0.1
+    assert controller.pause_remaining() == 0
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("30", 30.0),
+        (" 1.5 ", 1.5),
+        ("-4", 0.0),
+        ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0),
+        ("mañana", None),
+        (None, None),
+        ("", None),
+    ],
+)
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
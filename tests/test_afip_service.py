@@ -0,0 +1,151 @@
+import threading
+import time
+
+import afip_client.afip_service as afip_service
+from afip_client.afip_service import AFIPService
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = headers or {}
+        self.text = str(body)
+        self.request = None
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class FakeSession:
+    """
+    Sesión HTTP sin red: entrega el token y responde cada consulta con
+    `answer(person_ids, attempt)`, que devuelve el código HTTP (o una respuesta).
+    Registra cuándo empieza cada consulta y cuántas hay en curso a la vez.
+    """
+
+    def __init__(self, answer, latency=0.0):
+        self.answer = answer
+        self.latency = latency
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def post(self, url, json=None, data=None, headers=None):
+        if url.endswith("/token"):
+            return FakeResponse(200, {"access_token": "token"})
+        person_ids = tuple(json["persona_ids"])
+        with self._lock:
+            attempt = self._attempts[person_ids] = self._attempts.get(person_ids, 0) + 1
+            self.calls.append((time.monotonic(), person_ids))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            answer = self.answer(person_ids, attempt)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        if isinstance(answer, FakeResponse):
+            return answer
+        if answer != 200:
+            return FakeResponse(answer, {"detail": "error"})
+        data = [{str(person_id): {"datosGenerales": {}}} for person_id in person_ids]
+        return FakeResponse(200, {"data": data})
+
+
+def _service(monkeypatch, session, **options):
+    monkeypatch.setattr(afip_service.requests, "Session", lambda: session)
+    config = {
+        "chunk_size": 1,
+        "max_calls": 1000,
+        "pause_duration": 0,
+        "max_retries": 3,
+        "retry_delay": 0,
+        "max_workers": 2,
+        "min_chunk_size": 1,
+        "max_chunk_size": 1,
+    }
+    config.update(options)
+    return AFIPService("usuario", "clave", "http://afip", **config)
+
+
+def _fetch(service, person_ids, timeout=10):
+    """Consulta en otro hilo para que un bloqueo del despachador no cuelgue la prueba."""
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(
+            service.fetch_service_data_with_failures("inscription", person_ids)
+        ),
+        daemon=True,
+    )
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "el despachador quedó bloqueado"
+    return results[0]
+
+
+def test_retries_complete_while_every_slot_is_busy(monkeypatch):
+    # Cada bloque falla en su primer intento y reintenta mientras los demás
+    # ocupan todos los lugares
+    session = FakeSession(lambda ids, attempt: 400 if attempt == 1 else 200, 0.01)
+    service = _service(monkeypatch, session, min_workers=2)
+    person_ids = list(range(1, 13))
+
+    data, failed = _fetch(service, person_ids)
+
+    assert sorted(int(key) for key in data) == person_ids
+    assert failed == []
+    assert len(session.calls) == 2 * len(person_ids)
+    assert session.max_in_flight <= service.max_workers
+
+
+def test_failing_chunk_does_not_stall_the_others(monkeypatch):
+    session = FakeSession(lambda ids, attempt: 400 if ids == (1,) else 200)
+    service = _service(monkeypatch, session, retry_delay=0.2, min_workers=2)
+    person_ids = list(range(1, 11))
+
+    data, failed = _fetch(service, person_ids)
+
+    assert failed == [1]
+    assert sorted(int(key) for key in data) == person_ids[1:]
+    failing_calls = [at for at, ids in session.calls if ids == (1,)]
+    other_calls = [at for at, ids in session.calls if ids != (1,)]
+    assert len(failing_calls) == service.max_retries
+    # Los demás bloques terminan mientras el primero espera para reintentar
+    assert max(other_calls) < failing_calls[1]
+
+
+def test_token_bucket_caps_the_request_rate(monkeypatch):
+    session = FakeSession(lambda ids, attempt: 200)
+    service = _service(
+        monkeypatch, session, max_calls=2, pause_duration=0.4, max_workers=4
+    )
+    capacity, rate = 2, 2 / 0.4
+
+    _fetch(service, list(range(1, 9)))
+
+    started = sorted(at for at, _ in session.calls)
+    assert len(started) == 8
+    for index, at in enumerate(started):
+        # Tras la ráfaga inicial, una consulta cada 1 / rate segundos
+        earliest = max(0, index - capacity + 1) / rate
+        assert at - started[0] >= earliest - 0.02
+
+
+def test_retry_after_pauses_before_the_next_attempt(monkeypatch):
+    throttled = FakeResponse(429, {"detail": "slow down"}, {"Retry-After": "0.3"})
+    session = FakeSession(lambda ids, attempt: throttled if attempt == 1 else 200)
+    service = _service(monkeypatch, session, max_workers=1)
+
+    data, failed = _fetch(service, [1])
+
+    assert (list(data), failed) == (["1"], [])
+    first, second = (at for at, _ in session.calls)
+    assert second - first >= 0.3
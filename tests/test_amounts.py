@@ -0,0 +1,113 @@
+import pytest
+from conftest import VENTAS_CBTE, build_record
+
+from benchmarks.bench_amounts import (
+    build_synthetic_lines,
+    run_cents_pipeline,
+    run_float_pipeline,
+)
+from core.field_calculator import calculate_field_totals, is_difference_significant
+from core.string_utils import format_numeric_string
+from core.value_extractor import (
+    extract_and_format_fields,
+    get_compiled_layout,
+    get_field_scales,
+)
+from models.book_utils import retrieve_keys_to_sum
+
+TOTAL_FIELD = 9
+EXCHANGE_RATE_FIELD = 18
+LARGEST_AMOUNT = 10**15 - 1
+
+
+def _extract(values):
+    record = build_record(VENTAS_CBTE, values)
+    return extract_and_format_fields(record, get_compiled_layout(VENTAS_CBTE))
+
+
+def test_amount_scales_come_from_the_schema():
+    scales = get_field_scales(VENTAS_CBTE)
+    assert scales[TOTAL_FIELD] == 2
+    assert scales[EXCHANGE_RATE_FIELD] == 6
+    assert 7 not in scales
+
+
+@pytest.mark.parametrize(
+    "raw, cents",
+    [
+        ("000000000121050", 121050),
+        ("000000000000000", 0),
+        ("-00000000001210", -1210),
+        ("999999999999999", LARGEST_AMOUNT),
+    ],
+)
+def test_amounts_are_read_as_integer_cents(raw, cents):
+    assert _extract({TOTAL_FIELD: raw})[TOTAL_FIELD] == cents
+
+
+@pytest.mark.parametrize(
+    "raw, units", [("0001000000", 1_000_000), ("1234567890", 1_234_567_890)]
+)
+def test_exchange_rate_is_read_in_millionths(raw, units):
+    assert _extract({EXCHANGE_RATE_FIELD: raw})[EXCHANGE_RATE_FIELD] == units
+
+
+@pytest.mark.parametrize(
+    "cents, text",
+    [
+        (121050, "000000000121050"),
+        (0, "000000000000000"),
+        (1, "000000000000001"),
+        (-1210, "-00000000001210"),
+        (LARGEST_AMOUNT, "999999999999999"),
+    ],
+)
+def test_cents_are_written_back_at_fixed_width(cents, text):
+    assert format_numeric_string(cents, 15) == text
+    # Lo escrito se vuelve a leer como el mismo importe
+    assert _extract({TOTAL_FIELD: text})[TOTAL_FIELD] == cents
+
+
+def test_totals_are_summed_exactly():
+    keys = retrieve_keys_to_sum(VENTAS_CBTE)
+    # En punto flotante 0,10 + 0,10 + 0,10 no da exactamente 0,30
+    data = {key: 10 for key in keys}
+    total = calculate_field_totals(data, keys)["summed_amounts"]["total"]
+    assert total == 10 * len(keys)
+
+    data = {key: LARGEST_AMOUNT for key in keys}
+    total = calculate_field_totals(data, keys)["summed_amounts"]["total"]
+    assert total == LARGEST_AMOUNT * len(keys)
+
+
+def test_one_cent_is_a_significant_difference():
+    assert is_difference_significant(1211, 1210)
+    assert is_difference_significant(-1210, 1210)
+    assert not is_difference_significant(1210, 1210)
+    assert not is_difference_significant(1211, 1210, threshold=1)
+
+
+def test_cents_pipeline_has_no_false_positives_against_float_pipeline():
+    slices_by_field = {
+        number: field_slice
+        for number, field_slice, _ in get_compiled_layout(VENTAS_CBTE)
+    }
+    slices = [slices_by_field[key] for key in retrieve_keys_to_sum(VENTAS_CBTE)]
+    total_slice = slices_by_field[TOTAL_FIELD]
+
+    # Las diferencias del libro sintético superan el peso de tolerancia anterior
+    lines = build_synthetic_lines(1000)
+    expected = run_float_pipeline(lines, slices, total_slice)
+    assert expected > 0
+    assert run_cents_pipeline(lines, slices, total_slice) == expected
+
+    # Sin la tolerancia, una diferencia de centavos ya no se pierde
+    line = next(
+        line for line in lines if not run_cents_pipeline([line], slices, total_slice)
+    )
+    total = int(line[total_slice])
+    for delta in (1, 99):
+        changed = line[: total_slice.start] + str(total + delta).zfill(15)
+        changed += line[total_slice.stop :]
+        assert run_float_pipeline([changed], slices, total_slice) == 0
+        assert run_cents_pipeline([changed], slices, total_slice) == 1
@@ -0,0 +1,162 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from afip_client.async_afip_service import AsyncAFIPService
+
+httpx = pytest.importorskip("httpx")
+
+
+class FakeAFIP:
+    """
+    Servidor AFIP para httpx.MockTransport: entrega el token y responde cada
+    consulta con `answer(person_ids, attempt)`, que devuelve el código HTTP o
+    una corrutina que lo produce. Anota las consultas iniciadas y canceladas.
+    """
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.tokens = 0
+        self.calls = []
+        self.cancelled = []
+        self._attempts = {}
+
+    async def __call__(self, request):
+        if request.url.path == "/token":
+            self.tokens += 1
+            return httpx.Response(200, json={"access_token": f"token{self.tokens}"})
+        if request.headers["Authorization"] != f"Bearer token{self.tokens}":
+            return httpx.Response(401)
+        person_ids = tuple(json.loads(request.content)["persona_ids"])
+        attempt = self._attempts[person_ids] = self._attempts.get(person_ids, 0) + 1
+        self.calls.append(person_ids)
+        try:
+            status_code = self.answer(person_ids, attempt)
+            if asyncio.iscoroutine(status_code):
+                status_code = await status_code
+        except asyncio.CancelledError:
+            self.cancelled.append(person_ids)
+            raise
+        if status_code != 200:
+            return httpx.Response(status_code, json={"detail": "error"})
+        data = [{str(person_id): {"datosGenerales": {}}} for person_id in person_ids]
+        return httpx.Response(200, json={"data": data})
+
+
+class FailingJournal:
+    """Checkpoint que falla al registrar un bloque."""
+
+    def __init__(self, failing_ids):
+        self.failing_ids = failing_ids
+
+    def split(self, service_name, person_ids):
+        return {}, person_ids
+
+    def record_chunk(self, service_name, person_ids, data):
+        if tuple(person_ids) == self.failing_ids:
+            raise OSError("disco lleno")
+
+
+def _service(server, **options):
+    config = {
+        "chunk_size": 1,
+        "max_calls": 1000,
+        "pause_duration": 0,
+        "max_retries": 3,
+        "retry_delay": 0,
+        "max_workers": 4,
+        "min_workers": 4,
+        "min_chunk_size": 1,
+        "max_chunk_size": 1,
+    }
+    config.update(options)
+    return AsyncAFIPService(
+        "usuario",
+        "clave",
+        "http://afip",
+        transport=httpx.MockTransport(server),
+        **config,
+    )
+
+
+def _fetch(service, person_ids, journal=None):
+    async def fetch():
+        async with service:
+            return await service.fetch_service_data_with_failures(
+                "inscription", person_ids, journal
+            )
+
+    return asyncio.run(fetch())
+
+
+async def _slow(seconds=10):
+    await asyncio.sleep(seconds)
+    return 200
+
+
+def test_fetch_retries_and_reports_failed_chunks():
+    def answer(person_ids, attempt):
+        if person_ids == (3,):
+            return 400
+        return 503 if attempt == 1 and person_ids == (2,) else 200
+
+    server = FakeAFIP(answer)
+    data, failed = _fetch(_service(server), [1, 2, 3, 4, 5])
+
+    assert sorted(data) == ["1", "2", "4", "5"]
+    assert failed == [3]
+    assert server.calls.count((2,)) == 2
+    assert server.calls.count((3,)) == 3
+
+
+def test_token_is_refreshed_once_on_401():
+    server = FakeAFIP(lambda person_ids, attempt: 200)
+    service = _service(server)
+
+    async def fetch():
+        async with service:
+            # El servidor invalida el token entregado
+            server.tokens += 1
+            return await service.fetch_service_data_with_failures(
+                "inscription", [1, 2, 3, 4]
+            )
+
+    data, failed = asyncio.run(fetch())
+    assert (sorted(data), failed) == (["1", "2", "3", "4"], [])
+    # Los cuatro bloques rechazados comparten una única renovación
+    assert server.tokens == 3
+
+
+def test_failing_chunk_cancels_the_others():
+    server = FakeAFIP(
+        lambda person_ids, attempt: 200 if person_ids == (1,) else _slow()
+    )
+    service = _service(server)
+
+    started_at = time.monotonic()
+    with pytest.raises(OSError, match="disco lleno"):
+        _fetch(service, [1, 2, 3, 4], FailingJournal((1,)))
+
+    assert time.monotonic() - started_at < 5
+    assert sorted(server.cancelled) == [(2,), (3,), (4,)]
+    # Los lugares de los bloques cancelados se devuelven al controlador
+    assert service.controller._in_flight == 0
+
+
+def test_cancelled_fetch_cancels_its_chunks():
+    server = FakeAFIP(lambda person_ids, attempt: _slow())
+    service = _service(server, max_workers=2, min_workers=2)
+
+    async def fetch():
+        async with service:
+            await asyncio.wait_for(
+                service.fetch_service_data_with_failures("inscription", [1, 2, 3]),
+                0.2,
+            )
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(fetch())
+    assert sorted(server.cancelled) == [(1,), (2,)]
+    assert service.controller._in_flight == 0
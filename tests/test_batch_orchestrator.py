@@ -0,0 +1,81 @@
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+from conftest import INVALID_CUIT, FakeService, alicuota, cbte, write_book
+
+import batch_orchestrator
+from batch_orchestrator import _prepare_executor, run_batch
+
+
+def _write_batch(root):
+    for client, first in (("a", 1), ("b", 10)):
+        folder = root / client
+        folder.mkdir(parents=True)
+        write_book(
+            folder / "ventas_cbte_202401.txt",
+            [
+                cbte(first, 1210),
+                cbte(first + 1, 999, document=INVALID_CUIT),
+                cbte(first + 2, 121),
+            ],
+        )
+        write_book(
+            folder / "ventas_alicuota_202401.txt",
+            [
+                alicuota(first, 1000, 210),
+                alicuota(first + 1, 1000, 210),
+                alicuota(first + 2, 100, 21),
+            ],
+        )
+    # Libro con un registro de largo incorrecto: el par falla sin cortar el lote
+    folder = root / "c"
+    folder.mkdir()
+    (folder / "ventas_cbte_202401.txt").write_bytes(b"corto\r\n")
+    write_book(folder / "ventas_alicuota_202401.txt", [alicuota(1, 1000, 210)])
+
+
+def _run(tmp_path, monkeypatch, output, cpu_count):
+    monkeypatch.setattr(batch_orchestrator, "create_afip_service", FakeService)
+    monkeypatch.setattr(batch_orchestrator.os, "cpu_count", lambda: cpu_count)
+    summary_path = run_batch(str(tmp_path / "books"), str(tmp_path / output), 2)
+    with open(summary_path, encoding="utf-8") as summary_file:
+        summary = json.load(summary_file)
+    for entry in summary["pairs"]:
+        entry.pop("elapsed_seconds")
+        entry.pop("output_folder")
+        entry.pop("report", None)
+    summary.pop("query_date")
+    return summary
+
+
+@pytest.mark.parametrize(
+    "engine, workers, cpu_count, executor_type",
+    [
+        ("python", 4, 2, ProcessPoolExecutor),
+        ("numpy", 4, 8, ProcessPoolExecutor),
+        ("python", 4, 1, ThreadPoolExecutor),
+        ("python", 1, 8, ThreadPoolExecutor),
+        ("parallel", 4, 8, ThreadPoolExecutor),
+    ],
+)
+def test_prepare_executor(monkeypatch, engine, workers, cpu_count, executor_type):
+    monkeypatch.setattr(batch_orchestrator.os, "cpu_count", lambda: cpu_count)
+    with _prepare_executor(engine, workers) as executor:
+        assert type(executor) is executor_type
+
+
+def test_batch_prepared_in_processes_matches_threads(tmp_path, monkeypatch):
+    _write_batch(tmp_path / "books")
+    in_processes = _run(tmp_path, monkeypatch, "processes", cpu_count=2)
+    in_threads = _run(tmp_path, monkeypatch, "threads", cpu_count=1)
+    assert in_processes == in_threads
+
+    assert (in_processes["total_pairs"], in_processes["failed"]) == (3, 1)
+    # Las entradas actualizadas en los procesos vuelven al resumen
+    failed = [entry for entry in in_processes["pairs"] if entry["status"] != "ok"]
+    assert failed[0]["client"] == "c"
+    assert "longitud" in failed[0]["error"]
+    assert in_processes["afip_lookup"]["distinct_documents"] == 2
+    differences = [entry.get("differences") for entry in in_processes["pairs"]]
+    assert differences == [2, 2, None]
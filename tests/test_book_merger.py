@@ -0,0 +1,85 @@
+from conftest import VENTAS_ALICUOTA, VENTAS_CBTE, alicuota, cbte, parse_records
+
+from core.book_merger import join_and_summarize
+
+
+def _join(cbtes, alicuotas):
+    return join_and_summarize(
+        parse_records(cbtes, VENTAS_CBTE),
+        parse_records(alicuotas, VENTAS_ALICUOTA),
+        VENTAS_CBTE,
+        VENTAS_ALICUOTA,
+    )
+
+
+def test_groups_every_alicuota_of_a_comprobante():
+    merged, orphans = _join(
+        [cbte(1, 3500, exempt=100), cbte(2, 1210)],
+        [alicuota(1, 1000, 210), alicuota(1, 2000, 190), alicuota(2, 1000, 210)],
+    )
+
+    assert list(merged) == ["1", "2"]
+    assert merged["1"][VENTAS_ALICUOTA]["line_numbers"] == [1, 2]
+    assert merged["1"][VENTAS_ALICUOTA]["summed_amounts"]["total"] == 3400
+    assert merged["1"]["total_summed_amount"] == 3500
+    assert merged["2"][VENTAS_ALICUOTA]["line_numbers"] == [3]
+    assert merged["2"]["total_summed_amount"] == 1210
+    assert orphans == {VENTAS_CBTE: [], VENTAS_ALICUOTA: []}
+
+
+def test_matches_regardless_of_line_order():
+    merged, orphans = _join(
+        [cbte(1, 1210), cbte(2, 2420)],
+        [alicuota(2, 2000, 420), alicuota(1, 1000, 210)],
+    )
+
+    assert merged["1"][VENTAS_ALICUOTA]["line_numbers"] == [2]
+    assert merged["2"][VENTAS_ALICUOTA]["line_numbers"] == [1]
+    assert orphans == {VENTAS_CBTE: [], VENTAS_ALICUOTA: []}
+
+
+def test_reports_orphans_on_both_sides():
+    merged, orphans = _join(
+        [cbte(1, 1210), cbte(2, 500)],
+        [alicuota(1, 1000, 210), alicuota(3, 100, 21), alicuota(3, 50, 0)],
+    )
+
+    assert VENTAS_ALICUOTA not in merged["2"]
+    assert merged["2"]["total_summed_amount"] == 0
+    assert orphans == {VENTAS_CBTE: [2], VENTAS_ALICUOTA: [2, 3]}
+
+
+def test_point_of_sale_is_part_of_the_key():
+    merged, orphans = _join([cbte(1, 1210, point_of_sale=2)], [alicuota(1, 1000, 210)])
+
+    assert VENTAS_ALICUOTA not in merged["1"]
+    assert orphans == {VENTAS_CBTE: [1], VENTAS_ALICUOTA: [1]}
+
+
+def test_duplicate_comprobante_claims_the_group_only_once():
+    merged, orphans = _join(
+        [cbte(1, 1210), cbte(1, 1210)],
+        [alicuota(1, 1000, 210)],
+    )
+
+    assert merged["1"][VENTAS_ALICUOTA]["line_numbers"] == [1]
+    assert VENTAS_ALICUOTA not in merged["2"]
+    assert orphans == {VENTAS_CBTE: [2], VENTAS_ALICUOTA: []}
+
+
+def test_sorted_books_pair_each_comprobante_with_its_alicuota():
+    cbtes = [cbte(number, 1000 + number, exempt=number) for number in range(1, 21)]
+    alicuotas = [alicuota(number, 800 + number, 200) for number in range(1, 21)]
+    book_1 = parse_records(cbtes, VENTAS_CBTE)
+    book_2 = parse_records(alicuotas, VENTAS_ALICUOTA)
+
+    merged, orphans = join_and_summarize(book_1, book_2, VENTAS_CBTE, VENTAS_ALICUOTA)
+
+    assert orphans == {VENTAS_CBTE: [], VENTAS_ALICUOTA: []}
+    assert list(merged) == [str(number) for number in range(1, 21)]
+    for number in range(1, 21):
+        entry = merged[str(number)]
+        assert entry[VENTAS_CBTE] == book_1[number - 1][str(number)]
+        assert entry[VENTAS_ALICUOTA]["line_numbers"] == [number]
+        # Exento del comprobante + neto e impuesto de su alícuota, en centavos
+        assert entry["total_summed_amount"] == number + 800 + number + 200
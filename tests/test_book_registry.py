@@ -0,0 +1,174 @@
+import copy
+import json
+import os
+
+import pytest
+
+from core.book_parser import parse_book_file
+from core.exceptions import ProcessingError
+from models.book_registry import (
+    BOOKS_DIR,
+    EXTRA_BOOKS_DIR_VARIABLE,
+    get_book_definition,
+    get_book_registry,
+    load_book_definition,
+)
+from models.book_utils import retrieve_expected_length, retrieve_keys_to_sum
+
+ALICUOTA_PATH = os.path.join(BOOKS_DIR, "libro_iva_digital_ventas_alicuota.json")
+
+# Libro de prueba: tipo (2), número (6) e importe (8 con 2 decimales)
+TEST_BOOK = {
+    "book": "libro_de_prueba",
+    "record_length": 16,
+    "keys_to_sum": [3],
+    "join_key_fields": [1, 2],
+    "fields": {
+        "1": {
+            "Campo": "Tipo",
+            "Posiciones": [0, 1],
+            "Tipo de Dato": "Numérico",
+            "Longitud": 2,
+            "Observaciones": None,
+        },
+        "2": {
+            "Campo": "Número",
+            "Posiciones": [2, 7],
+            "Tipo de Dato": "Numérico",
+            "Longitud": 6,
+            "Observaciones": "Completar con ceros a la izquierda",
+        },
+        "3": {
+            "Campo": "Importe",
+            "Posiciones": [8, 15],
+            "Tipo de Dato": "Numérico",
+            "Longitud": 8,
+            "Observaciones": "6 enteros 2 decimales sin punto decimal",
+            "Decimales": 2,
+        },
+    },
+}
+
+
+@pytest.fixture
+def registry_cache():
+    get_book_registry.cache_clear()
+    yield
+    get_book_registry.cache_clear()
+
+
+def _alicuota():
+    with open(ALICUOTA_PATH, encoding="utf-8") as definition_file:
+        return json.load(definition_file)
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return str(path)
+
+
+def _move_field(data, field_number, start, length=None):
+    field_info = data["fields"][str(field_number)]
+    old_start, old_end = field_info["Posiciones"]
+    field_info["Posiciones"] = [start, start + old_end - old_start]
+    if length is not None:
+        field_info["Longitud"] = length
+
+
+def test_shipped_definitions_are_valid():
+    for name, definition in get_book_registry().items():
+        assert load_book_definition(os.path.join(BOOKS_DIR, name + ".json"))
+        assert definition.record_length == retrieve_expected_length(name)
+
+
+def _gap(data):
+    _move_field(data, 2, 4)
+
+
+def _overlap(data):
+    _move_field(data, 2, 2)
+
+
+def _length_mismatch(data):
+    data["fields"]["2"]["Longitud"] = 6
+
+
+def _record_length_mismatch(data):
+    data["record_length"] += 1
+
+
+def _unknown_join_key(data):
+    data["join_key_fields"].append(99)
+
+
+def _sum_of_non_amount(data):
+    data["keys_to_sum"].append(5)
+
+
+def _missing_key(data):
+    del data["fields"]["3"]["Longitud"]
+
+
+def _no_fields(data):
+    data["fields"] = {}
+
+
+def _not_a_number(data):
+    data["fields"]["x"] = data["fields"].pop("6")
+
+
+@pytest.mark.parametrize(
+    "corrupt, message",
+    [
+        (_gap, "contiguos"),
+        (_overlap, "contiguos"),
+        (_length_mismatch, "longitud 6"),
+        (_record_length_mismatch, "el registro declara 63"),
+        (_unknown_join_key, "campo de clave 99"),
+        (_sum_of_non_amount, "campo a sumar 5"),
+        (_missing_key, "le falta Longitud"),
+        (_no_fields, "no define campos"),
+        (_not_a_number, "ValueError"),
+    ],
+)
+def test_inconsistent_definition_is_rejected(tmp_path, corrupt, message):
+    data = _alicuota()
+    corrupt(data)
+    path = _write(tmp_path / "libro.json", data)
+    with pytest.raises(ProcessingError, match=message) as error:
+        load_book_definition(path)
+    assert path in error.value.message
+
+
+def test_extra_folder_adds_and_replaces_books(tmp_path, monkeypatch, registry_cache):
+    folder = tmp_path / "libros"
+    folder.mkdir()
+    _write(folder / "prueba.json", TEST_BOOK)
+    replaced = _alicuota()
+    replaced["keys_to_sum"] = [4]
+    _write(folder / "alicuota.json", replaced)
+    monkeypatch.setenv(EXTRA_BOOKS_DIR_VARIABLE, str(folder))
+
+    assert get_book_definition("libro_de_prueba").record_length == 16
+    assert retrieve_keys_to_sum("libro_iva_digital_ventas_alicuota") == [4]
+    # Los libros incluidos que no se reemplazan siguen disponibles
+    assert get_book_definition("libro_iva_digital_ventas_cbte") is not None
+
+    book = tmp_path / "prueba.txt"
+    book.write_bytes(b"01000042" + b"00012345\r\n" + b"02000043" + b"00000000\r\n")
+    records = parse_book_file(str(book), "libro_de_prueba")
+    assert len(records) == 2
+    first = records[0]["1"]
+    assert (first[1], first[2], first[3]) == ("01", "42", 12345)
+    assert first["summed_amounts"]["total"] == 12345
+
+
+def test_invalid_definition_in_extra_folder_is_rejected(
+    tmp_path, monkeypatch, registry_cache
+):
+    data = copy.deepcopy(TEST_BOOK)
+    data["record_length"] = 20
+    _write(tmp_path / "prueba.json", data)
+    monkeypatch.setenv(EXTRA_BOOKS_DIR_VARIABLE, str(tmp_path))
+    with pytest.raises(ProcessingError, match="prueba.json"):
+        get_book_registry()
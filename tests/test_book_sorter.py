@@ -0,0 +1,135 @@
+import random
+
+import pytest
+from conftest import (
+    VENTAS_ALICUOTA,
+    VENTAS_CBTE,
+    alicuota,
+    cbte,
+    parse_records,
+    write_book,
+)
+
+import core.book_sorter as book_sorter
+from core.book_merger import iter_sorted_join, join_and_summarize
+from core.book_parser import parse_book_record
+from core.book_reader import BookBuffer
+from core.book_sorter import is_book_sorted, iter_book_by_key, iter_externally_sorted
+from core.exceptions import UnsortedBookError
+
+
+def _shuffled_cbtes(count=23):
+    rng = random.Random(7)
+    # Claves repetidas y de distinto largo, para probar la estabilidad y el
+    # orden numérico (9 antes que 10)
+    numbers = [rng.randint(1, 12) for _ in range(count)]
+    return [
+        cbte(number, 100 * line, point_of_sale=1 + line % 2)
+        for line, number in enumerate(numbers)
+    ]
+
+
+def _expected_order(records):
+    spans = book_sorter._key_spans(VENTAS_CBTE)
+    return sorted(
+        ((line, record) for line, record in enumerate(records, start=1)),
+        key=lambda item: (book_sorter._record_sort_key(item[1], spans), item[0]),
+    )
+
+
+def test_external_sort_with_several_runs_matches_sorted(tmp_path, monkeypatch):
+    records = _shuffled_cbtes()
+    path = write_book(tmp_path / "cbte.txt", records)
+    runs = []
+    write_run = book_sorter._write_run
+
+    def counting_write_run(*args):
+        runs.append(write_run(*args))
+        return runs[-1]
+
+    monkeypatch.setattr(book_sorter, "_write_run", counting_write_run)
+
+    with BookBuffer(path, VENTAS_CBTE) as buffer:
+        result = list(iter_externally_sorted(buffer, run_lines=4, temp_dir=tmp_path))
+
+    assert len(runs) == 6
+    assert result == _expected_order(records)
+
+
+@pytest.mark.parametrize("run_lines", [1, 5, 1000])
+def test_book_by_key_is_independent_of_run_size(tmp_path, run_lines):
+    records = _shuffled_cbtes()
+    path = write_book(tmp_path / "cbte.txt", records, terminator=b"\n")
+
+    with BookBuffer(path, VENTAS_CBTE) as buffer:
+        assert not is_book_sorted(buffer)
+        result = [
+            (line, record.raw)
+            for line, record in iter_book_by_key(buffer, run_lines, str(tmp_path))
+        ]
+
+    assert result == _expected_order(records)
+
+
+def _numbered(records, name_of_book):
+    return [
+        (line, parse_book_record(record, name_of_book))
+        for line, record in enumerate(records, start=1)
+    ]
+
+
+def _sorted_join(cbtes, alicuotas):
+    orphans = {}
+    entries = dict(
+        iter_sorted_join(
+            _numbered(cbtes, VENTAS_CBTE),
+            _numbered(alicuotas, VENTAS_ALICUOTA),
+            VENTAS_CBTE,
+            VENTAS_ALICUOTA,
+            orphans,
+        )
+    )
+    return entries, orphans
+
+
+def test_sorted_join_matches_hash_join():
+    cbtes = [cbte(1, 1210), cbte(2, 500), cbte(2, 500), cbte(4, 1210), cbte(10, 121)]
+    alicuotas = [
+        alicuota(1, 1000, 210),
+        alicuota(3, 100, 21),
+        alicuota(4, 500, 105),
+        alicuota(4, 500, 105),
+        alicuota(10, 100, 21),
+        alicuota(11, 100, 21),
+    ]
+
+    entries, orphans = _sorted_join(cbtes, alicuotas)
+    expected, expected_orphans = join_and_summarize(
+        parse_records(cbtes, VENTAS_CBTE),
+        parse_records(alicuotas, VENTAS_ALICUOTA),
+        VENTAS_CBTE,
+        VENTAS_ALICUOTA,
+    )
+
+    assert orphans == expected_orphans == {VENTAS_CBTE: [2, 3], VENTAS_ALICUOTA: [2, 6]}
+    assert list(entries) == list(expected)
+    for line, entry in entries.items():
+        assert entry.get(VENTAS_ALICUOTA) == expected[line].get(VENTAS_ALICUOTA)
+
+
+def test_sorted_join_rejects_unsorted_comprobantes():
+    with pytest.raises(UnsortedBookError, match=f"{VENTAS_CBTE}.*línea 2"):
+        _sorted_join([cbte(2, 0), cbte(1, 0)], [alicuota(1, 0, 0)])
+
+
+def test_sorted_join_rejects_unsorted_alicuotas():
+    with pytest.raises(UnsortedBookError, match=VENTAS_ALICUOTA):
+        _sorted_join([cbte(1, 0)], [alicuota(2, 0, 0), alicuota(1, 0, 0)])
+
+
+def test_sorted_join_rejects_non_contiguous_alicuota_group():
+    with pytest.raises(UnsortedBookError, match=f"{VENTAS_ALICUOTA}.*línea 3"):
+        _sorted_join(
+            [cbte(1, 0), cbte(2, 0)],
+            [alicuota(1, 0, 0), alicuota(2, 0, 0), alicuota(1, 0, 0)],
+        )
@@ -0,0 +1,75 @@
+import json
+import time
+
+import pytest
+
+from afip_client.checkpoint import CheckpointJournal
+
+VALID = {"datosGenerales": {"nombre": "X"}}
+NOT_FOUND = {"errorConstancia": {"error": ["No existe persona con ese Id"]}}
+
+
+def _age(path, seconds):
+    """Atrasa la hora de escritura de todas las líneas del checkpoint."""
+    with open(path, encoding="utf-8") as journal_file:
+        entries = [json.loads(line) for line in journal_file]
+    with open(path, "w", encoding="utf-8") as journal_file:
+        for entry in entries:
+            entry["written_at"] -= seconds
+            journal_file.write(json.dumps(entry) + "\n")
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    path = str(tmp_path / "libro.afip_checkpoint.jsonl")
+    with CheckpointJournal(path) as journal:
+        journal.record_chunk("inscription", [1, 2], {"1": VALID, "2": NOT_FOUND})
+        journal.record_chunk("inscription", [3], {})
+    return path
+
+
+def test_recorded_chunks_are_not_queried_again(journal_path):
+    with CheckpointJournal(journal_path) as journal:
+        recorded, pending = journal.split("inscription", [1, 2, 3, 4])
+        assert recorded == {"1": VALID, "2": NOT_FOUND}
+        assert pending == [4]
+        assert journal.split("padron", [1]) == ({}, [1])
+
+
+def test_answers_older_than_the_ttl_of_their_outcome_are_queried_again(journal_path):
+    _age(journal_path, 100)
+
+    def split(**ttls):
+        with CheckpointJournal(journal_path, **ttls) as journal:
+            return journal.split("inscription", [1, 2, 3])
+
+    assert split(ttl_valid=1000, ttl_not_found=1000) == (
+        {"1": VALID, "2": NOT_FOUND},
+        [],
+    )
+    # El ID 3 se respondió sin registro, que cuenta como válido
+    assert split(ttl_valid=1000, ttl_not_found=50) == ({"1": VALID}, [2])
+    assert split(ttl_valid=50, ttl_not_found=1000) == ({"2": NOT_FOUND}, [1, 3])
+
+
+def test_lines_without_write_time_are_not_reused(tmp_path):
+    path = tmp_path / "viejo.afip_checkpoint.jsonl"
+    entry = {"service": "inscription", "person_ids": ["1"], "data": {"1": VALID}}
+    path.write_text(json.dumps(entry) + "\n", encoding="utf-8")
+    with CheckpointJournal(str(path)) as journal:
+        assert journal.split("inscription", [1]) == ({}, [1])
+
+
+def test_truncated_last_line_is_ignored(journal_path):
+    with open(journal_path, "a", encoding="utf-8") as journal_file:
+        journal_file.write('{"service": "inscr')
+    with CheckpointJournal(journal_path) as journal:
+        journal.record_chunk("inscription", [4], {"4": VALID})
+    with CheckpointJournal(journal_path) as journal:
+        assert journal.split("inscription", [1, 4, 5])[1] == [5]
+
+
+def test_written_time_is_recorded(journal_path):
+    with open(journal_path, encoding="utf-8") as journal_file:
+        written = [json.loads(line)["written_at"] for line in journal_file]
+    assert all(0 <= time.time() - written_at < 60 for written_at in written)
@@ -0,0 +1,129 @@
+import datetime
+import os
+
+import pytest
+from conftest import (
+    INVALID_CUIT,
+    VALID_CUIT,
+    VENTAS_ALICUOTA,
+    VENTAS_CBTE,
+    FakeService,
+    alicuota,
+    build_record,
+    cbte,
+    write_book,
+)
+
+from core.book_parser import parse_book_file
+from core.columnar_export import EXPORT_EXTENSIONS, EXPORT_FOLDER
+from core.value_extractor import get_field_names, get_field_scales
+from models.book_utils import retrieve_field_structure
+from orchestrator import run_book_comparison
+
+pa = pytest.importorskip("pyarrow")
+feather = pytest.importorskip("pyarrow.feather")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def _cbte_with(number, values):
+    """Comprobante con valores crudos en campos arbitrarios."""
+    return build_record(
+        VENTAS_CBTE, {2: 1, 3: 1, 4: number, 6: 80, 7: VALID_CUIT, **values}
+    )
+
+
+def _read(path, export_format):
+    if export_format == "parquet":
+        return pq.read_table(path)
+    return feather.read_table(path)
+
+
+def _date(text):
+    if text.strip("0 ") == "":
+        return None
+    return datetime.datetime.strptime(text, "%Y%m%d").date()
+
+
+@pytest.mark.parametrize("export_format", ["parquet", "arrow"])
+def test_exported_book_matches_parsed_book(tmp_path, export_format):
+    book_1 = write_book(
+        tmp_path / "cbte.txt",
+        [
+            cbte(1, 1210),
+            cbte(2, 999, document=INVALID_CUIT),
+            _cbte_with(3, {1: "20231231", 9: -1210, 18: "0001000000"}),
+            _cbte_with(4, {1: "20240229", 9: 10**15 - 1, 22: "00000000"}),
+        ],
+    )
+    book_2 = write_book(
+        tmp_path / "alicuota.txt",
+        [alicuota(1, 1000, 210), alicuota(2, 1000, 210), alicuota(3, -1000, -210)],
+    )
+    output = str(tmp_path / "out")
+    run_book_comparison(
+        book_1,
+        VENTAS_CBTE,
+        book_2,
+        VENTAS_ALICUOTA,
+        output,
+        service=FakeService(),
+        export_format=export_format,
+    )
+
+    extension = EXPORT_EXTENSIONS[export_format]
+    table = _read(
+        os.path.join(output, EXPORT_FOLDER, VENTAS_CBTE + extension), export_format
+    )
+    parsed = parse_book_file(book_1, VENTAS_CBTE)
+    names = get_field_names(VENTAS_CBTE)
+    scales = get_field_scales(VENTAS_CBTE)
+    structure = retrieve_field_structure(VENTAS_CBTE)
+
+    assert table.schema.metadata[b"book"] == VENTAS_CBTE.encode()
+    assert table.column("line").to_pylist() == [1, 2, 3, 4]
+    for field_number, field_info in structure.items():
+        column = table.column(names[field_number])
+        field = table.schema.field(names[field_number])
+        values = [
+            record[str(line)][field_number]
+            for line, record in enumerate(parsed, start=1)
+        ]
+        if field_number in scales:
+            assert column.type == pa.int64()
+            assert field.metadata[b"scale"] == str(scales[field_number]).encode()
+            assert column.to_pylist() == values
+        elif field_info["Observaciones"] == "AAAAMMDD":
+            assert column.type == pa.date32()
+            assert column.to_pylist() == [_date(value) for value in values]
+        else:
+            assert column.type == pa.string()
+
+    assert table.column(names[9]).to_pylist() == [1210, 999, -1210, 10**15 - 1]
+    assert table.column(names[1]).to_pylist()[2:] == [
+        datetime.date(2023, 12, 31),
+        datetime.date(2024, 2, 29),
+    ]
+    assert table.column(names[22]).to_pylist()[3] is None
+    assert table.column(names[18]).to_pylist()[2] == 1_000_000
+
+    totals = _read(
+        os.path.join(output, EXPORT_FOLDER, "merged_totals" + extension), export_format
+    ).to_pydict()
+    assert totals["line"] == [1, 2, 3, 4]
+    assert totals["total_summed_amount"] == [1210, 1210, -1210, 0]
+    assert totals["difference"] == [0, 999 - 1210, 0, 10**15 - 1]
+
+    differences = _read(
+        os.path.join(output, EXPORT_FOLDER, "differences" + extension), export_format
+    ).to_pydict()
+    amounts = {
+        line: (correct, actual)
+        for line, field, correct, actual in zip(
+            differences["line"],
+            differences["field"],
+            differences["correct_amount"],
+            differences["actual_amount"],
+        )
+        if field == 9
+    }
+    assert amounts == {2: (1210, 999), 4: (0, 10**15 - 1)}
@@ -0,0 +1,42 @@
+import pytest
+from conftest import VENTAS_ALICUOTA, VENTAS_CBTE, alicuota, cbte, write_book
+
+from core.book_reader import BookBuffer
+from core.columnar_parser import load_book_columns
+from orchestrator import _plan_columnar_comparison
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("terminator", [b"\r\n", b"\n"])
+def test_columns_from_buffer_match_columns_from_file(tmp_path, terminator):
+    path = write_book(
+        tmp_path / "cbte.txt",
+        [cbte(1, 1210, exempt=5), cbte(2, 999), cbte(3, 0)],
+        terminator,
+    )
+    from_file = load_book_columns(path, VENTAS_CBTE)
+    with BookBuffer(path, VENTAS_CBTE) as buffer:
+        from_buffer = load_book_columns(path, VENTAS_CBTE, buffer)
+        # La matriz de registros es una vista sobre el archivo mapeado
+        assert not from_buffer.records.flags.owndata
+        assert np.array_equal(from_buffer.records, from_file.records)
+        assert from_buffer.amounts.keys() == from_file.amounts.keys()
+        for field_number, amounts in from_file.amounts.items():
+            assert np.array_equal(from_buffer.amounts[field_number], amounts)
+
+
+def test_columnar_plan_reads_both_books_from_their_buffers(tmp_path):
+    book_1 = write_book(tmp_path / "cbte.txt", [cbte(1, 1210), cbte(2, 999)])
+    book_2 = write_book(
+        tmp_path / "alicuota.txt",
+        [alicuota(2, 1000, 210), alicuota(1, 1000, 210), alicuota(9, 1, 1)],
+    )
+    with BookBuffer(book_1, VENTAS_CBTE) as buffer_1, BookBuffer(
+        book_2, VENTAS_ALICUOTA
+    ) as buffer_2:
+        total_diffs, orphans, plan = _plan_columnar_comparison(buffer_1, buffer_2)
+
+    assert [(line, field) for line, _, _, field in total_diffs] == [(2, 9)]
+    assert orphans == {VENTAS_CBTE: [], VENTAS_ALICUOTA: [3]}
+    assert plan.document_ids == [20111111112]
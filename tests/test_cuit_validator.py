@@ -0,0 +1,77 @@
+import random
+
+import pytest
+from conftest import INVALID_CUIT, VALID_CUIT
+
+import core.cuit_validator as cuit_validator
+from core.cuit_validator import is_valid_cuit, partition_cuits, validate_cuits
+
+# CUIT de AFIP (30-50001091-2) y de una persona humana (20-12345678-6)
+KNOWN_CUITS = [30500010912, 20123456786, VALID_CUIT, INVALID_CUIT]
+# 20-00000001-?: el resto da 10, ningún dígito verificador es válido
+CHECK_DIGIT_TEN = [20000000010 + digit for digit in range(10)]
+# 20-00000006-?: el resto da 11, el dígito verificador es 0
+CHECK_DIGIT_ELEVEN = 20000000060
+
+
+@pytest.fixture(params=["numpy", "python"])
+def engine(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(cuit_validator, "np", None)
+    return request.param
+
+
+@pytest.mark.parametrize(
+    "document_id, valid",
+    [
+        *[(cuit, True) for cuit in KNOWN_CUITS],
+        (CHECK_DIGIT_ELEVEN, True),
+        # Dígito verificador incorrecto
+        (30500010913, False),
+        (20123456780, False),
+        # Largo incorrecto
+        (0, False),
+        (30111222, False),
+        (2012345678, False),
+        (201234567866, False),
+        (-20123456786, False),
+        # Prefijo no asignado
+        (21123456786, False),
+        (10123456786, False),
+        (99999999999, False),
+    ],
+)
+def test_single_cuit(engine, document_id, valid):
+    assert is_valid_cuit(document_id) is valid
+    assert validate_cuits([document_id]) == [valid]
+
+
+def test_check_digit_ten_is_never_valid(engine):
+    assert validate_cuits(CHECK_DIGIT_TEN) == [False] * 10
+
+
+def test_numpy_matches_python(monkeypatch):
+    pytest.importorskip("numpy")
+    rng = random.Random(7)
+    prefixes = sorted(cuit_validator.CUIT_PREFIXES) + [21, 10, 99]
+    document_ids = [
+        rng.choice(prefixes) * 10**9 + rng.randrange(10**9) for _ in range(5000)
+    ]
+    document_ids += KNOWN_CUITS + CHECK_DIGIT_TEN + [0, 1, 10**10 - 1, 10**11]
+
+    with_numpy = validate_cuits(document_ids)
+    monkeypatch.setattr(cuit_validator, "np", None)
+    assert validate_cuits(document_ids) == with_numpy
+    # La muestra incluye documentos válidos e inválidos
+    assert 0 < sum(with_numpy) < len(document_ids)
+
+
+def test_partition_keeps_the_original_order(engine):
+    document_ids = [20123456780, VALID_CUIT, 30111222, 30500010912, 21123456786]
+    assert partition_cuits(document_ids) == (
+        [VALID_CUIT, 30500010912],
+        [20123456780, 30111222, 21123456786],
+    )
+    assert partition_cuits([]) == ([], [])
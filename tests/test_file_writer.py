@@ -0,0 +1,100 @@
+import pytest
+from conftest import VENTAS_CBTE, cbte, write_book
+
+from core.file_writer import write_replacements
+
+# Campo 9 (importe total): posiciones 108-122; campo 7 (documento): 58-77
+TOTAL = slice(108, 123)
+DOCUMENT = slice(58, 78)
+
+
+def _book(tmp_path, terminator, final_terminator=True):
+    records = [cbte(number, 1000 * number) for number in range(1, 5)]
+    path = write_book(tmp_path / "cbte.txt", records, terminator)
+    if not final_terminator:
+        with open(path, "rb+") as book_file:
+            book_file.truncate(len(book_file.read()) - len(terminator))
+    return path, records
+
+
+def _patched(records, patches, terminator, final_terminator=True):
+    """Resultado esperado: los registros con los bytes indicados reemplazados."""
+    lines = [bytearray(record) for record in records]
+    for line, field_slice, value in patches:
+        lines[line - 1][field_slice] = value
+    data = terminator.join(bytes(line) for line in lines)
+    return data + terminator if final_terminator else data
+
+
+def _run(path, differences, output_dir):
+    write_replacements(differences, path, str(output_dir), name_of_book=VENTAS_CBTE)
+    return (output_dir / "cbte_modificated.txt").read_bytes()
+
+
+@pytest.mark.parametrize("terminator", [b"\n", b"\r\n"])
+@pytest.mark.parametrize("final_terminator", [True, False])
+def test_patches_only_the_field_bytes(tmp_path, terminator, final_terminator):
+    path, records = _book(tmp_path, terminator, final_terminator)
+    original = open(path, "rb").read()
+
+    result = _run(
+        path,
+        [(4, "000000000009999", "000000000004000", 9)],
+        tmp_path / "out",
+    )
+
+    assert result == _patched(
+        records, [(4, TOTAL, b"000000000009999")], terminator, final_terminator
+    )
+    assert len(result) == len(original)
+    # El archivo original no se modifica
+    assert open(path, "rb").read() == original
+
+
+@pytest.mark.parametrize("terminator", [b"\n", b"\r\n"])
+def test_applies_several_patches_per_line_in_any_order(tmp_path, terminator):
+    path, records = _book(tmp_path, terminator)
+
+    result = _run(
+        path,
+        [
+            (3, "000000000000001", "000000000003000", 9),
+            (1, "00000000020222222223", "00000000020111111112", 7),
+            (1, "000000000000777", "000000000001000", 9),
+        ],
+        tmp_path / "out",
+    )
+
+    assert result == _patched(
+        records,
+        [
+            (1, DOCUMENT, b"00000000020222222223"),
+            (1, TOTAL, b"000000000000777"),
+            (3, TOTAL, b"000000000000001"),
+        ],
+        terminator,
+    )
+
+
+def test_skips_patches_that_do_not_match_the_file(tmp_path, caplog):
+    path, records = _book(tmp_path, b"\r\n")
+
+    result = _run(
+        path,
+        [
+            # El valor original no coincide con los bytes del archivo
+            (2, "000000000000555", "000000000007777", 9),
+            # El valor nuevo no tiene el ancho del campo
+            (3, "555", "000000000003000", 9),
+            # Línea inexistente
+            (9, "000000000000555", "000000000009000", 9),
+            (4, "000000000000555", "000000000004000", 9),
+        ],
+        tmp_path / "out",
+    )
+
+    assert result == _patched(records, [(4, TOTAL, b"000000000000555")], b"\r\n")
+    warnings = [r.getMessage() for r in caplog.records if r.levelname == "WARNING"]
+    assert any("No encontrado en línea 2" in message for message in warnings)
+    assert any("ancho del campo 9" in message for message in warnings)
+    assert any("fuera de rango" in message for message in warnings)
@@ -0,0 +1,147 @@
+import time
+
+import pytest
+from conftest import (
+    INVALID_CUIT,
+    VALID_CUIT,
+    VENTAS_ALICUOTA,
+    VENTAS_CBTE,
+    FakeService,
+    alicuota,
+    cbte,
+    read_outputs,
+    write_book,
+)
+
+from core.incremental import IncrementalState
+from orchestrator import run_book_comparison, run_book_comparison_incremental
+
+NEW_CUIT = 20333333334
+
+
+def _base_books():
+    cbtes = [
+        cbte(1, 1210),
+        cbte(2, 999, document=INVALID_CUIT),
+        cbte(3, 2420),
+        cbte(4, 500),
+    ]
+    alicuotas = [
+        alicuota(1, 1000, 210),
+        alicuota(2, 1000, 210),
+        alicuota(3, 1000, 210),
+        alicuota(3, 1000, 210),
+    ]
+    return cbtes, alicuotas
+
+
+def _insert(cbtes, alicuotas):
+    cbtes.insert(1, cbte(5, 100, document=NEW_CUIT))
+    alicuotas.insert(0, alicuota(5, 1000, 210))
+
+
+def _delete(cbtes, alicuotas):
+    del cbtes[0]
+    del alicuotas[0]
+
+
+def _edit(cbtes, alicuotas):
+    cbtes[2] = cbte(3, 2000)
+    alicuotas[1] = alicuota(2, 800, 168)
+
+
+def _all_changes(cbtes, alicuotas):
+    _insert(cbtes, alicuotas)
+    _delete(cbtes, alicuotas)
+    _edit(cbtes, alicuotas)
+
+
+def _run_incremental(tmp_path, cbtes, alicuotas, output, service):
+    book_1 = write_book(tmp_path / "cbte.txt", cbtes)
+    book_2 = write_book(tmp_path / "alicuota.txt", alicuotas)
+    run_book_comparison_incremental(
+        book_1,
+        VENTAS_CBTE,
+        book_2,
+        VENTAS_ALICUOTA,
+        str(tmp_path / output),
+        "cliente",
+        "202401",
+        state_dir=str(tmp_path / "state"),
+        service=service,
+    )
+    return read_outputs(str(tmp_path / output))
+
+
+def _run_full(tmp_path, cbtes, alicuotas, output):
+    book_1 = write_book(tmp_path / "cbte.txt", cbtes)
+    book_2 = write_book(tmp_path / "alicuota.txt", alicuotas)
+    run_book_comparison(
+        book_1,
+        VENTAS_CBTE,
+        book_2,
+        VENTAS_ALICUOTA,
+        str(tmp_path / output),
+        service=FakeService(),
+    )
+    return read_outputs(str(tmp_path / output))
+
+
+@pytest.mark.parametrize("change", [_insert, _delete, _edit, _all_changes])
+def test_incremental_matches_full_run_after_changes(tmp_path, change):
+    cbtes, alicuotas = _base_books()
+    first = _run_incremental(tmp_path, cbtes, alicuotas, "inc_1", FakeService())
+    assert first == _run_full(tmp_path, cbtes, alicuotas, "full_1")
+
+    change(cbtes, alicuotas)
+    service = FakeService()
+    second = _run_incremental(tmp_path, cbtes, alicuotas, "inc_2", service)
+    assert second == _run_full(tmp_path, cbtes, alicuotas, "full_2")
+    # Los documentos con resultado vigente no se vuelven a consultar
+    assert set(service.queried) <= {NEW_CUIT}
+
+
+def test_incremental_output_flags_invalid_document_and_totals(tmp_path):
+    cbtes, alicuotas = _base_books()
+    report, book = _run_incremental(tmp_path, cbtes, alicuotas, "out", FakeService())
+
+    # Línea 2: total 999 contra 1210 y documento inexistente; línea 4 sin
+    # alícuotas (huérfana del libro 1), con total calculado 0
+    entries = report["differences"]["entries"]
+    assert set(entries) == {"2", "4"}
+    assert set(entries["2"]) == {"7", "9"}
+    assert int(entries["4"]["9"]["correct_value"]) == 0
+    assert report["orphans"][VENTAS_CBTE]["lines"] == [4]
+    assert book is not None
+
+
+def test_expired_verdicts_are_queried_again(tmp_path, monkeypatch):
+    cbtes, alicuotas = _base_books()
+    _run_incremental(tmp_path, cbtes, alicuotas, "inc_1", FakeService())
+
+    service = FakeService()
+    _run_incremental(tmp_path, cbtes, alicuotas, "inc_2", service)
+    assert service.queried == []
+
+    monkeypatch.setenv("AFIP_CACHE_TTL_VALID", "0")
+    service = FakeService()
+    _run_incremental(tmp_path, cbtes, alicuotas, "inc_3", service)
+    assert service.queried == [VALID_CUIT]
+
+
+def test_verdicts_expire_with_the_ttl_of_their_outcome(tmp_path):
+    path = str(tmp_path / "state.json")
+    state = IncrementalState(path)
+    state.record_verdicts([1, 2, 3], error_documents={2}, unverified_documents={3})
+    assert set(state.verdicts) == {1, 2}
+
+    checked_at = time.time() - 100
+    state.verdicts = {1: (False, checked_at), 2: (True, checked_at)}
+    state.save()
+
+    def kept(ttl_valid, ttl_error):
+        return set(IncrementalState(path, ttl_valid, ttl_error).verdicts)
+
+    assert kept(ttl_valid=1000, ttl_error=1000) == {1, 2}
+    assert kept(ttl_valid=1000, ttl_error=50) == {1}
+    assert kept(ttl_valid=50, ttl_error=1000) == {2}
@@ -0,0 +1,107 @@
+import pytest
+from conftest import (
+    INVALID_CUIT,
+    VALID_CUIT,
+    VENTAS_ALICUOTA,
+    VENTAS_CBTE,
+    FakeService,
+    alicuota,
+    build_record,
+    cbte,
+    write_book,
+)
+
+from core.lookup_planner import build_lookup_plan
+from orchestrator import run_book_comparison
+
+DNI = 30111222
+
+
+def test_each_document_is_queried_once():
+    plan = build_lookup_plan(
+        [
+            (1, "80", VALID_CUIT),
+            (2, "80", INVALID_CUIT),
+            (3, "80", VALID_CUIT),
+            (4, "86", INVALID_CUIT),
+        ]
+    )
+    assert plan.document_ids == [VALID_CUIT, INVALID_CUIT]
+    assert plan.lines_by_document == {VALID_CUIT: [1, 3], INVALID_CUIT: [2, 4]}
+
+
+@pytest.mark.parametrize("document_type", ["80", "86", "87", " 80"])
+def test_tax_id_types_are_queried(document_type):
+    plan = build_lookup_plan([(1, document_type, VALID_CUIT)])
+    assert plan.document_ids == [VALID_CUIT]
+
+
+def test_placeholders_and_other_document_types_are_not_queried():
+    plan = build_lookup_plan(
+        [
+            (1, "80", 0),
+            (2, "96", DNI),
+            (3, "99", 0),
+            (4, "99", 99999999),
+            (5, "96", DNI),
+            (6, "", VALID_CUIT),
+        ]
+    )
+    assert plan.document_ids == []
+    assert plan.invalid_count == 2
+    assert plan.skipped_by_type == {"96": 2, "99": 1, "": 1}
+
+
+def test_lines_for_maps_an_error_to_every_line_of_its_document():
+    plan = build_lookup_plan(
+        [
+            (1, "80", INVALID_CUIT),
+            (2, "80", VALID_CUIT),
+            (5, "80", INVALID_CUIT),
+            (3, "87", INVALID_CUIT),
+        ]
+    )
+    # AFIP devuelve los documentos como texto; los desconocidos se ignoran
+    assert plan.lines_for([str(INVALID_CUIT), "20999999998"]) == [
+        (1, INVALID_CUIT),
+        (3, INVALID_CUIT),
+        (5, INVALID_CUIT),
+    ]
+    assert plan.lines_for([]) == []
+
+
+def test_excluding_keeps_the_lines_of_the_other_documents():
+    plan = build_lookup_plan([(1, "80", VALID_CUIT), (2, "80", INVALID_CUIT)])
+    remaining = plan.excluding([VALID_CUIT])
+    assert remaining.document_ids == [INVALID_CUIT]
+    assert remaining.lines_for([INVALID_CUIT]) == [(2, INVALID_CUIT)]
+    assert plan.document_ids == [VALID_CUIT, INVALID_CUIT]
+
+
+def test_comparison_queries_only_distinct_tax_ids(tmp_path):
+    dni_record = build_record(VENTAS_CBTE, {2: 1, 3: 1, 4: 4, 6: 96, 7: DNI, 9: 1210})
+    book_1 = write_book(
+        tmp_path / "cbte.txt",
+        [
+            cbte(1, 1210),
+            cbte(2, 1210, document=INVALID_CUIT),
+            cbte(3, 1210),
+            dni_record,
+            cbte(5, 1210, document=0),
+            cbte(6, 1210, document=INVALID_CUIT),
+        ],
+    )
+    book_2 = write_book(
+        tmp_path / "alicuota.txt",
+        [alicuota(number, 1000, 210) for number in range(1, 7)],
+    )
+    service = FakeService()
+    run_book_comparison(
+        book_1,
+        VENTAS_CBTE,
+        book_2,
+        VENTAS_ALICUOTA,
+        str(tmp_path / "out"),
+        service=service,
+    )
+    assert service.queried == [VALID_CUIT, INVALID_CUIT]
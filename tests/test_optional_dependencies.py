@@ -0,0 +1,35 @@
+import pytest
+
+import afip_client.async_afip_service as async_afip_service
+import core.columnar_export as columnar_export
+import core.columnar_parser as columnar_parser
+import core.report_writer as report_writer
+from core.exceptions import ProcessingError
+
+
+def test_numpy_engine_without_numpy(monkeypatch):
+    monkeypatch.setattr(columnar_parser, "np", None)
+    with pytest.raises(ProcessingError, match="pip install numpy"):
+        columnar_parser.load_book_columns("cbte.txt", "libro_iva_digital_ventas_cbte")
+
+
+def test_zstd_report_without_zstandard(monkeypatch):
+    monkeypatch.setattr(report_writer, "zstandard", None)
+    report_writer.check_report_compression("gzip")
+    with pytest.raises(ProcessingError, match="pip install zstandard"):
+        report_writer.check_report_compression("zstd")
+
+
+def test_columnar_export_without_pyarrow(monkeypatch):
+    monkeypatch.setattr(columnar_export, "pa", None)
+    columnar_export.check_export_format(None)
+    with pytest.raises(ProcessingError, match="pip install pyarrow"):
+        columnar_export.check_export_format("parquet")
+
+
+def test_async_client_without_httpx(monkeypatch):
+    monkeypatch.setattr(async_afip_service, "httpx", None)
+    with pytest.raises(ImportError, match="pip install httpx"):
+        async_afip_service.AsyncAFIPService(
+            "user", "password", "http://afip", 10, 5, 1, 1, 0
+        )
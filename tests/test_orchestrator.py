@@ -0,0 +1,112 @@
+import json
+import os
+
+import pytest
+from conftest import (
+    VALID_CUIT,
+    VENTAS_ALICUOTA,
+    VENTAS_CBTE,
+    FakeService,
+    alicuota,
+    cbte,
+    write_book,
+)
+
+import orchestrator
+from core.exceptions import ProcessingError
+
+
+@pytest.fixture
+def opened_journals(monkeypatch):
+    """Checkpoints abiertos durante la prueba."""
+    journals = []
+    open_checkpoint = orchestrator._open_checkpoint
+
+    def recording_open_checkpoint(book_file_path, output_folder):
+        journal = open_checkpoint(book_file_path, output_folder)
+        journals.append(journal)
+        return journal
+
+    monkeypatch.setattr(orchestrator, "_open_checkpoint", recording_open_checkpoint)
+    return journals
+
+
+def _books(tmp_path, book_1_records):
+    book_1 = write_book(tmp_path / "cbte.txt", book_1_records)
+    book_2 = write_book(tmp_path / "alicuota.txt", [alicuota(1, 1000, 210)])
+    return book_1, VENTAS_CBTE, book_2, VENTAS_ALICUOTA, str(tmp_path / "out")
+
+
+def _fail(*args, **kwargs):
+    raise OSError("disco lleno")
+
+
+def _age(path, seconds):
+    """Atrasa la hora de escritura de todas las líneas del checkpoint."""
+    with open(path, encoding="utf-8") as journal_file:
+        entries = [json.loads(line) for line in journal_file]
+    with open(path, "w", encoding="utf-8") as journal_file:
+        for entry in entries:
+            entry["written_at"] -= seconds
+            journal_file.write(json.dumps(entry) + "\n")
+
+
+@pytest.mark.parametrize(
+    "run",
+    [
+        orchestrator.run_book_comparison,
+        orchestrator.run_book_comparison_streaming,
+        lambda *args, **kwargs: orchestrator.run_book_comparison_incremental(
+            *args, client="cliente", period="202401", **kwargs
+        ),
+    ],
+)
+def test_checkpoint_closed_and_kept_when_report_fails(
+    tmp_path, monkeypatch, opened_journals, run
+):
+    monkeypatch.setattr(orchestrator, "generate_final_report", _fail)
+    with pytest.raises(ProcessingError, match="disco lleno"):
+        run(*_books(tmp_path, [cbte(1, 999)]), service=FakeService())
+
+    (journal,) = opened_journals
+    assert journal._file.closed
+    assert os.path.exists(journal.path)
+
+
+def test_checkpoint_closed_when_parsing_fails(tmp_path, opened_journals):
+    book_1, *rest = _books(tmp_path, [cbte(1, 1210)])
+    with open(book_1, "ab") as book_file:
+        book_file.write(b"corto\r\n")
+
+    with pytest.raises(ProcessingError, match="longitud"):
+        orchestrator.run_book_comparison(book_1, *rest, service=FakeService())
+
+    (journal,) = opened_journals
+    assert journal._file.closed
+
+
+def test_checkpoint_discarded_after_complete_run(tmp_path, opened_journals):
+    orchestrator.run_book_comparison(
+        *_books(tmp_path, [cbte(1, 999)]), service=FakeService()
+    )
+
+    (journal,) = opened_journals
+    assert journal._file.closed
+    assert not os.path.exists(journal.path)
+
+
+@pytest.mark.parametrize("age, queried_again", [(0, []), (7 * 24 * 3600, [VALID_CUIT])])
+def test_checkpoint_of_failed_run_is_reused_only_while_fresh(
+    tmp_path, monkeypatch, opened_journals, age, queried_again
+):
+    books = _books(tmp_path, [cbte(1, 999)])
+    with monkeypatch.context() as patch:
+        patch.setattr(orchestrator, "generate_final_report", _fail)
+        with pytest.raises(ProcessingError):
+            orchestrator.run_book_comparison(*books, service=FakeService())
+    _age(opened_journals[0].path, age)
+
+    monkeypatch.setenv("AFIP_CACHE_TTL_VALID", str(24 * 3600))
+    service = FakeService()
+    orchestrator.run_book_comparison(*books, service=service)
+    assert service.queried == queried_again
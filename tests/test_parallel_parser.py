@@ -0,0 +1,90 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from conftest import INVALID_CUIT, VENTAS_CBTE, cbte, write_book
+
+import core.parallel_parser as parallel_parser
+from core.book_parser import parse_book_file
+from core.exceptions import ProcessingError
+from core.parallel_parser import parse_book_file_parallel
+
+LINES = 10
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # Bloques de 3 líneas: 10 líneas se reparten en 4 bloques y los límites
+    # caen en medio del archivo
+    monkeypatch.setattr(parallel_parser, "MIN_CHUNK_LINES", 3)
+
+
+def _records():
+    return [
+        (
+            cbte(number, 1210 * number, exempt=number % 3, document=INVALID_CUIT)
+            if number % 4 == 0
+            else cbte(number, 1210 * number, exempt=number % 3)
+        )
+        for number in range(1, LINES + 1)
+    ]
+
+
+def _as_dicts(list_of_data):
+    return [
+        {line: dict(record) for line, record in item.items()} for item in list_of_data
+    ]
+
+
+def _assert_same_parse(path):
+    sequential = parse_book_file(path, VENTAS_CBTE)
+    parallel = parse_book_file_parallel(path, VENTAS_CBTE, workers=2)
+    assert len(parallel) == LINES
+    assert _as_dicts(parallel) == _as_dicts(sequential)
+
+
+@pytest.mark.parametrize("terminator", [b"\r\n", b"\n"])
+def test_parallel_parse_matches_sequential(tmp_path, terminator):
+    _assert_same_parse(write_book(tmp_path / "cbte.txt", _records(), terminator))
+
+
+@pytest.mark.parametrize("terminator", [b"\r\n", b"\n"])
+def test_last_line_without_terminator(tmp_path, terminator):
+    path = tmp_path / "cbte.txt"
+    write_book(path, _records(), terminator)
+    path.write_bytes(path.read_bytes()[: -len(terminator)])
+    _assert_same_parse(str(path))
+
+
+def test_chunk_boundaries_fall_mid_file(tmp_path, monkeypatch):
+    ranges = []
+    parse_line_range = parallel_parser._parse_line_range
+
+    def recording_parse_line_range(file_name, name_of_book, first_line, count, *rest):
+        ranges.append((first_line, count))
+        return parse_line_range(file_name, name_of_book, first_line, count, *rest)
+
+    # Con hilos en lugar de procesos se puede observar cada bloque
+    monkeypatch.setattr(parallel_parser, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(
+        parallel_parser, "_parse_line_range", recording_parse_line_range
+    )
+    _assert_same_parse(write_book(tmp_path / "cbte.txt", _records()))
+    assert sorted(ranges) == [(1, 3), (4, 3), (7, 3), (10, 1)]
+
+
+def test_wrong_record_in_a_later_chunk(tmp_path):
+    # El tamaño total cuadra, pero la línea 5 y la 6 están corridas un byte
+    records = _records()
+    records[4] = records[4] + b"X"
+    records[5] = records[5][:-1]
+    path = write_book(tmp_path / "cbte.txt", records)
+    with pytest.raises(ProcessingError, match="línea 5"):
+        parse_book_file_parallel(path, VENTAS_CBTE, workers=2)
+
+
+def test_file_size_not_multiple_of_record_falls_back_to_sequential(tmp_path):
+    path = tmp_path / "cbte.txt"
+    write_book(path, _records())
+    path.write_bytes(path.read_bytes() + b"X")
+    with pytest.raises(ProcessingError, match="longitud"):
+        parse_book_file_parallel(str(path), VENTAS_CBTE, workers=2)
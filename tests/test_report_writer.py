@@ -0,0 +1,169 @@
+import glob
+import gzip
+import io
+import json
+import os
+
+import pytest
+from conftest import (
+    INVALID_CUIT,
+    VENTAS_ALICUOTA,
+    VENTAS_CBTE,
+    FakeService,
+    alicuota,
+    cbte,
+    write_book,
+)
+
+from core.report_writer import REPORT_EXTENSIONS, StreamingReportWriter
+from orchestrator import run_book_comparison_streaming
+
+SUMMARY_KEYS = {
+    "type",
+    "total_records",
+    "records_by_book",
+    "total_summed_amount",
+    "declared_total_amount",
+    "differences",
+    "orphans",
+    "complete",
+    "unverified_documents",
+}
+
+
+@pytest.fixture(params=[None, "gzip", "zstd"])
+def compression(request):
+    if request.param == "zstd":
+        pytest.importorskip("zstandard")
+    return request.param
+
+
+def _read_report(path, compression):
+    """Registros de un reporte JSON Lines, descomprimido según su extensión."""
+    assert path.endswith(REPORT_EXTENSIONS[compression])
+    if compression is None:
+        report_file = open(path, encoding="utf-8")
+    elif compression == "gzip":
+        report_file = gzip.open(path, "rt", encoding="utf-8")
+    else:
+        import zstandard
+
+        raw_file = open(path, "rb")
+        report_file = io.TextIOWrapper(
+            zstandard.ZstdDecompressor().stream_reader(raw_file), encoding="utf-8"
+        )
+    with report_file:
+        return [json.loads(line) for line in report_file]
+
+
+def _merged(first_line, count):
+    """Bloque fusionado como el que arma el sort-merge join."""
+    return {
+        str(line): {
+            VENTAS_CBTE: {9: 1210, 7: "20111111112"},
+            VENTAS_ALICUOTA: {4: 1000, 6: 210},
+            "total_summed_amount": 1210 - (line == 2),
+        }
+        for line in range(first_line, first_line + count)
+    }
+
+
+def test_report_round_trip(tmp_path, compression):
+    with StreamingReportWriter(str(tmp_path), compression) as writer:
+        writer.add_processed(_merged(1, 2), VENTAS_CBTE)
+        writer.write_differences([(2, "000000000001209", "000000000001210", 9)])
+        writer.add_processed(_merged(3, 2), VENTAS_CBTE)
+        writer.write_differences([(2, "20111111112", "20111111112", 7)])
+        writer.write_orphans({VENTAS_CBTE: [7], VENTAS_ALICUOTA: []})
+        writer.write_unverified([5, 6])
+
+    header, *records, summary = _read_report(writer.file_path, compression)
+    assert header["type"] == "header"
+    assert [record["type"] for record in records] == [
+        "difference",
+        "difference",
+        "orphans",
+        "orphans",
+        "unverified_documents",
+    ]
+    assert records[0] == {
+        "type": "difference",
+        "line": 2,
+        "field": 9,
+        "correct_value": "000000000001209",
+        "actual_value": "000000000001210",
+    }
+    assert records[2]["lines"] == [7]
+    assert records[4]["lines"] == [5, 6]
+
+    # El resumen sólo tiene agregados, no los datos de cada línea
+    assert set(summary) == SUMMARY_KEYS
+    assert summary["total_records"] == 4
+    assert summary["records_by_book"] == {VENTAS_CBTE: 4, VENTAS_ALICUOTA: 4}
+    assert summary["total_summed_amount"] == 4 * 1210 - 1
+    assert summary["declared_total_amount"] == 4 * 1210
+    assert summary["differences"] == {
+        "total": 2,
+        "lines": 1,
+        "by_field": {"7": 1, "9": 1},
+    }
+    assert summary["orphans"] == {VENTAS_CBTE: 1, VENTAS_ALICUOTA: 0}
+    assert (summary["complete"], summary["unverified_documents"]) == (False, 2)
+    assert "Reporte incompleto: 2 líneas" in writer.message
+
+
+def test_failed_report_has_no_summary(tmp_path, compression):
+    with pytest.raises(RuntimeError):
+        with StreamingReportWriter(str(tmp_path), compression) as writer:
+            writer.write_differences([(1, "1", "2", 9)])
+            raise RuntimeError("corte")
+    types = [record["type"] for record in _read_report(writer.file_path, compression)]
+    assert types == ["header", "difference"]
+
+
+def test_streaming_comparison_writes_compressed_report(tmp_path, compression):
+    book_1 = write_book(
+        tmp_path / "cbte.txt",
+        [
+            cbte(1, 1210),
+            cbte(2, 999, document=INVALID_CUIT),
+            cbte(3, 121),
+            cbte(4, 500),
+        ],
+    )
+    book_2 = write_book(
+        tmp_path / "alicuota.txt",
+        [
+            alicuota(1, 1000, 210),
+            alicuota(2, 1000, 210),
+            alicuota(3, 100, 21),
+            alicuota(9, 1, 1),
+        ],
+    )
+    output = str(tmp_path / "out")
+    run_book_comparison_streaming(
+        book_1,
+        VENTAS_CBTE,
+        book_2,
+        VENTAS_ALICUOTA,
+        output,
+        chunk_size=2,
+        service=FakeService(),
+        report_format="jsonl",
+        report_compression=compression,
+    )
+
+    (path,) = glob.glob(os.path.join(output, "final_report_*"))
+    header, *records, summary = _read_report(path, compression)
+    differences = [
+        (record["line"], record["field"])
+        for record in records
+        if record["type"] == "difference"
+    ]
+    assert differences == [(2, 9), (2, 7), (4, 9)]
+    assert set(summary) == SUMMARY_KEYS
+    assert summary["total_records"] == 4
+    assert summary["total_summed_amount"] == 1210 + 1210 + 121
+    assert summary["declared_total_amount"] == 1210 + 999 + 121 + 500
+    assert summary["differences"]["lines"] == 2
+    assert summary["complete"] is True
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+import afip_client.response_cache as response_cache
+from afip_client.response_cache import ResponseCache
+
+VALID = {"datosGenerales": {"nombre": "X"}}
+NOT_FOUND = {"errorConstancia": {"error": ["No existe persona con ese Id"]}}
+ERROR = {"errorRegimenGeneral": {"error": ["Servicio no disponible"]}}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(
+        str(tmp_path / "cache" / "afip.sqlite3"),
+        ttl_valid=300,
+        ttl_not_found=200,
+        ttl_error=100,
+    )
+    yield cache
+    cache.close()
+
+
+def _at(monkeypatch, seconds, now=time.time):
+    """Adelanta el reloj de la caché `seconds` segundos desde ahora."""
+    later = now() + seconds
+    monkeypatch.setattr(response_cache.time, "time", lambda: later)
+
+
+def test_records_expire_with_the_ttl_of_their_outcome(cache, monkeypatch):
+    cache.store_many("inscription", {"1": VALID, "2": NOT_FOUND, "3": ERROR})
+    person_ids = [1, 2, 3]
+
+    found, misses = cache.get_many("inscription", person_ids)
+    assert found == {"1": VALID, "2": NOT_FOUND, "3": ERROR}
+    assert misses == []
+
+    _at(monkeypatch, 150)
+    assert cache.get_many("inscription", person_ids) == (
+        {"1": VALID, "2": NOT_FOUND},
+        [3],
+    )
+    _at(monkeypatch, 250)
+    assert cache.get_many("inscription", person_ids) == ({"1": VALID}, [2, 3])
+    _at(monkeypatch, 350)
+    assert cache.get_many("inscription", person_ids) == ({}, [1, 2, 3])
+
+
+def test_records_are_kept_per_service(cache):
+    cache.store_many("inscription", {"1": VALID})
+    assert cache.get_many("padron", [1]) == ({}, [1])
+
+
+def test_expired_records_are_purged(cache, monkeypatch):
+    cache.store_many("inscription", {"1": VALID, "2": NOT_FOUND, "3": ERROR})
+    _at(monkeypatch, 250)
+    assert cache.purge_expired() == 2
+    _at(monkeypatch, 0)
+    assert cache.get_many("inscription", [1, 2, 3]) == ({"1": VALID}, [2, 3])
+
+
+def test_hit_and_miss_counters(cache):
+    cache.store_many("inscription", {"1": VALID, "2": NOT_FOUND})
+    cache.get_many("inscription", [1, 2, 3])
+    assert (cache.hits, cache.misses) == (2, 1)
+    cache.get_many("inscription", [3, 4, 1])
+    assert (cache.hits, cache.misses) == (3, 3)
+
+
+def test_lookups_above_the_query_parameter_limit(cache):
+    count = 2 * response_cache._MAX_QUERY_PARAMS + 7
+    stored = {str(person_id): VALID for person_id in range(0, count, 2)}
+    cache.store_many("inscription", stored)
+
+    person_ids = list(range(count))
+    found, misses = cache.get_many("inscription", person_ids)
+
+    assert found == stored
+    assert misses == list(range(1, count, 2))
+    assert (cache.hits, cache.misses) == (len(stored), len(misses))
+
+
+def test_records_survive_reopening_the_cache(cache):
+    cache.store_many("inscription", {"1": VALID})
+    cache.close()
+    reopened = ResponseCache(cache.path)
+    try:
+        assert reopened.get_many("inscription", ["1"]) == ({"1": VALID}, [])
+    finally:
+        reopened.close()
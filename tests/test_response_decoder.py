@@ -0,0 +1,78 @@
+import json
+import os
+
+import pytest
+
+from afip_client.error_utils import (
+    INSCRIPTION_ERROR_KEYS,
+    INVALID_DOCUMENT_ERROR_MSGS,
+    extract_record_errors,
+    find_invalid_ids,
+)
+from afip_client.response_decoder import decode_response
+from benchmarks.bench_response_decoder import (
+    build_recorded_response,
+    run_decoder_pipeline,
+    run_legacy_pipeline,
+)
+
+RECORDED_RESPONSE = os.path.join(
+    os.path.dirname(__file__), "data", "inscription_response.json"
+)
+
+
+def _load(path):
+    with open(path, encoding="utf-8") as response_file:
+        return json.load(response_file)["data"]
+
+
+@pytest.fixture(params=["grabada", "sintética"])
+def response_data(request, tmp_path):
+    if request.param == "grabada":
+        return _load(RECORDED_RESPONSE)
+    path = str(tmp_path / "inscription.json")
+    build_recorded_response(300, path)
+    return _load(path)
+
+
+def _errors(records):
+    return {
+        person_id: extract_record_errors(record, INSCRIPTION_ERROR_KEYS)
+        for person_id, record in records.items()
+    }
+
+
+def test_single_pass_finds_the_same_documents_and_messages_as_full_clean(
+    response_data,
+):
+    reduced = decode_response(response_data, INSCRIPTION_ERROR_KEYS)
+    full = decode_response(response_data)
+
+    assert reduced.keys() == full.keys()
+    assert _errors(reduced) == _errors(full)
+    invalid = find_invalid_ids(
+        reduced, INSCRIPTION_ERROR_KEYS, INVALID_DOCUMENT_ERROR_MSGS
+    )
+    assert invalid == find_invalid_ids(
+        full, INSCRIPTION_ERROR_KEYS, INVALID_DOCUMENT_ERROR_MSGS
+    )
+    assert invalid == run_legacy_pipeline(response_data)
+    assert invalid == run_decoder_pipeline(response_data)
+
+
+def test_recorded_response_decodes_to_its_error_keys():
+    records = decode_response(_load(RECORDED_RESPONSE), INSCRIPTION_ERROR_KEYS)
+
+    # Los IDs que vuelven vacíos se descartan, como en la limpieza completa
+    assert "20777777778" not in records
+    assert "20888888889" not in records
+    assert records["20111111112"] == {}
+    assert records["20222222223"] == {
+        "errorConstancia": {"error": ["No existe persona con ese Id"]}
+    }
+    assert records["20666666667"] == {
+        "errorMonotributo": "La clave se encuentra inactiva"
+    }
+    assert find_invalid_ids(
+        records, INSCRIPTION_ERROR_KEYS, INVALID_DOCUMENT_ERROR_MSGS
+    ) == ["20222222223", "20333333334", "20555555556", "20666666667"]
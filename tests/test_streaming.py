@@ -0,0 +1,103 @@
+import pytest
+from conftest import (
+    INVALID_CUIT,
+    VENTAS_ALICUOTA,
+    VENTAS_CBTE,
+    FakeService,
+    alicuota,
+    cbte,
+    read_outputs,
+    write_book,
+)
+
+from orchestrator import run_book_comparison, run_book_comparison_streaming
+
+
+def _books():
+    cbtes = [
+        cbte(1, 1210),
+        cbte(2, 999, document=INVALID_CUIT),
+        # Dos alícuotas y un importe exento
+        cbte(3, 2500, exempt=80),
+        cbte(4, 500),
+        cbte(1, 1210, point_of_sale=2),
+        cbte(5, 121, document=INVALID_CUIT),
+        cbte(6, 0),
+    ]
+    alicuotas = [
+        alicuota(1, 1000, 210),
+        alicuota(2, 1000, 210),
+        alicuota(3, 1000, 210),
+        alicuota(3, 1000, 210),
+        alicuota(1, 1000, 200, point_of_sale=2),
+        alicuota(5, 100, 21),
+        alicuota(6, 0, 0),
+        # Sin comprobante en el libro 1
+        alicuota(9, 1, 1),
+    ]
+    return cbtes, alicuotas
+
+
+def _unsorted(cbtes, alicuotas):
+    return cbtes[::-1], alicuotas[3:] + alicuotas[:3]
+
+
+def _run(run, tmp_path, cbtes, alicuotas, output, terminator, **options):
+    book_1 = write_book(tmp_path / f"{output}_cbte.txt", cbtes, terminator)
+    book_2 = write_book(tmp_path / f"{output}_alicuota.txt", alicuotas, terminator)
+    run(
+        book_1,
+        VENTAS_CBTE,
+        book_2,
+        VENTAS_ALICUOTA,
+        str(tmp_path / output),
+        service=FakeService(),
+        **options,
+    )
+    return read_outputs(str(tmp_path / output))
+
+
+@pytest.mark.parametrize("terminator", [b"\r\n", b"\n"])
+@pytest.mark.parametrize("order", [None, _unsorted])
+@pytest.mark.parametrize("chunk_size", [1, 3, 1000])
+def test_streaming_matches_full_run(tmp_path, terminator, order, chunk_size):
+    cbtes, alicuotas = _books()
+    if order is not None:
+        cbtes, alicuotas = order(cbtes, alicuotas)
+
+    full = _run(run_book_comparison, tmp_path, cbtes, alicuotas, "full", terminator)
+    streaming = _run(
+        run_book_comparison_streaming,
+        tmp_path,
+        cbtes,
+        alicuotas,
+        "streaming",
+        terminator,
+        chunk_size=chunk_size,
+        # Corridas chicas para que el orden externo mezcle varios archivos
+        sort_run_lines=2,
+    )
+    assert streaming == full
+
+    report, book = full
+    assert book is not None
+    assert report["differences"]["total"] >= 4
+    assert report["orphans"][VENTAS_ALICUOTA]["total"] == 1
+
+
+def test_streaming_without_differences_writes_no_book(tmp_path):
+    cbtes = [cbte(1, 1210), cbte(2, 121)]
+    alicuotas = [alicuota(1, 1000, 210), alicuota(2, 100, 21)]
+    full = _run(run_book_comparison, tmp_path, cbtes, alicuotas, "full", b"\r\n")
+    streaming = _run(
+        run_book_comparison_streaming,
+        tmp_path,
+        cbtes,
+        alicuotas,
+        "streaming",
+        b"\r\n",
+        chunk_size=1,
+    )
+    assert streaming == full
+    assert full[1] is None
+    assert full[0]["differences"]["total"] == 0